@@ -80,6 +80,29 @@ export const getAnswerFeedback = async (req, res) => {
   }
 };
 
+export const getBatchAnswerFeedback = async (req, res) => {
+  try {
+    // 1. Input validation
+    const { resumeText, jobDescription, answers } = req.body;
+    if (!resumeText || !jobDescription || !Array.isArray(answers) || answers.length === 0) {
+      return res.status(400).json({ error: 'Resume, JD, and a list of answers are required' });
+    }
+
+    // 2. Prepare Data for Python Service
+    const { pythonServiceData, headers } = prepareApiRequest(req);
+
+    // 3. Call Python Service (one request evaluates every answer)
+    const result = await callPythonService('/answer-feedback/batch', pythonServiceData, headers, 180000);
+
+    // 4. Send result to client
+    res.json(result);
+  } catch (err) {
+    const status = err.response?.status || 500;
+    const message = err.response?.data?.error || 'Error during batch feedback';
+    res.status(status).json({ error: message });
+  }
+};
+
 export const getIdealAnswer = async (req, res) => {
   try {
 
@@ -2,6 +2,7 @@ import express from 'express';
 import {
   generateQuestions,
   getAnswerFeedback,
+  getBatchAnswerFeedback,
   getIdealAnswer,
   getInterviewHistory
 } from '../controllers/interview.controller.js';
@@ -19,6 +20,7 @@ router.post('/generate', uploadFile, generateQuestions);
 // Get feedback on an answer
 router.post('/feedback', getAnswerFeedback);
 router.post('/ask', getAnswerFeedback);
+router.post('/feedback/batch', getBatchAnswerFeedback);
 
 // Get ideal answer for a question
 router.post('/ideal-answer', getIdealAnswer);
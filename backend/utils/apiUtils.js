@@ -13,6 +13,9 @@ const PYTHON_SERVICE_URL = process.env.PYTHON_SERVICE_URL;
  */
 
 export const prepareApiRequest = (req) => {
+  // Lets the Python service scope its per-user caches
+  const userHeaders = req.user?.id ? { "X-User-Id": String(req.user.id) } : {};
+
   // Check if there are any files in the request
   const hasFiles = req.files && Object.keys(req.files).length > 0;
 
@@ -40,13 +43,13 @@ export const prepareApiRequest = (req) => {
 
     return {
       pythonServiceData: formData,
-      headers: formData.getHeaders(),
+      headers: { ...formData.getHeaders(), ...userHeaders },
     };
   } else {
     // No files, return raw JSON body and appropriate headers
     return {
       pythonServiceData: req.body,
-      headers: { "Content-Type": "application/json" },
+      headers: { "Content-Type": "application/json", ...userHeaders },
     };
   }
 };
@@ -58,7 +61,9 @@ export const callPythonService = async (
   timeout = 60000
 ) => {
   const response = await axios.post(`${PYTHON_SERVICE_URL}${endpoint}`, data, {
-    headers,
+    // Tells the Python service when to stop working on a response we
+    // will no longer wait for
+    headers: { ...headers, "X-Deadline-Ms": String(timeout) },
     timeout,
   });
   return response.data;
@@ -1,141 +1,192 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
 from functools import wraps
 
 import langchain_helper as lch
+import deadlines
+import doc_pipeline
+import metrics
+import service_stats
+import streaming
+from doc_pipeline import ENDPOINT_PROFILES, question_options
+from llm_client import LLMUnavailableError
 
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
 
-TEMP_FILES = {
-    "resume": "temp_resume.pdf",
-    "job_desc": "temp_job_desc.pdf"
-}
 
-def _cleanup_temp_files():
-    """A simple function to remove temporary files."""
-    for path in TEMP_FILES.values():
-        if os.path.exists(path):
-            try:
-                os.remove(path)
-            except OSError as e:
-                print(f"Failed to remove temp file {path}: {e}")
+@app.before_request
+def start_request_metrics():
+    route = request.url_rule.rule if request.url_rule else "other"
+    metrics.start_request(request.method, route, request.content_length or 0)
 
 
-def extract_resume_and_jd(request, resume_query, jd_query):
+@app.after_request
+def finish_request_metrics(response):
+    current = metrics.current()
+    if current is None:
+        return response
+    # For SSE this covers the work done before the stream starts
+    response.headers["Server-Timing"] = current.server_timing()
+    if not response.is_streamed:
+        current.response_bytes = response.calculate_content_length() or 0
+    response.call_on_close(lambda: metrics.finish_request(current, response.status_code))
+    return response
+
+
+@app.before_request
+def start_request_deadline():
+    # The socket lets checks notice a client that has hung up (gunicorn or the dev server)
+    client_socket = request.environ.get("gunicorn.socket") or request.environ.get("werkzeug.socket")
+    deadlines.start(request.headers.get(deadlines.DEADLINE_HEADER), client_socket)
+
+
+@app.errorhandler(deadlines.DeadlineExceeded)
+def handle_deadline_exceeded(exc):
+    return jsonify({"error": str(exc)}), exc.status
+
+
+@app.errorhandler(LLMUnavailableError)
+def handle_llm_unavailable(exc):
+    # Circuit open or rate limited: tell the caller when to come back
+    return jsonify({"error": str(exc)}), 503, {"Retry-After": str(exc.retry_after)}
+
+
+@app.teardown_request
+def abandon_request_metrics(exc):
+    # after_request doesn't run when a view raises; a client closing a
+    # stream early (GeneratorExit) is finished by call_on_close instead
+    current = metrics.current()
+    if isinstance(exc, Exception) and current is not None:
+        metrics.finish_request(current, 500)
+
+
+def extract_resume_and_jd(request, resume_profile, jd_profile):
     """
     Parse a Flask request that may contain PDF files or plain‑text fields
-    for a resume and a job description, build vector DBs for each, and
-    return (resume_info, jd_info, None) on success or
+    for a resume and a job description, build vector DBs for both
+    concurrently, and return (resume_info, jd_info, None) on success or
     (None, None, flask_response_tuple) on failure.
     """
     is_multipart = "multipart/form-data" in (request.content_type or "")
     try:
-        # ---------- Resume ----------
-        resume_db = None
-        if is_multipart and "resume" in request.files and request.files["resume"].filename:
-            file = request.files["resume"]
-            if not file.filename.lower().endswith(".pdf"):
-                return None, None, (jsonify({"error": "Resume must be a PDF"}), 400)
-
-            # If lch supports file‑like objects, pass the stream directly.
-            # Otherwise, save to a temp path.
-            file.save(TEMP_FILES["resume"])
-            resume_db = lch.create_vectorDB_from_pdf(TEMP_FILES["resume"])
-        else:
-            resume_text = (
-                request.form.get("resumeText") if is_multipart
-                else (request.get_json(silent=True) or {}).get("resumeText", "")
-            ).strip()
-            if resume_text:
-                resume_db = lch.create_vectorDB_from_text(resume_text)
-
-        if resume_db is None:
-            return None, None, (jsonify({"error": "Missing resume file or text"}), 400)
-
-        resume_info = lch.extract_info(resume_db, resume_query)
-
-        # ---------- Job description ----------
-        jd_db = None
-        if is_multipart and "jobDescriptionFile" in request.files and request.files["jobDescriptionFile"].filename:
-            file = request.files["jobDescriptionFile"]
-            if not file.filename.lower().endswith(".pdf"):
-                return None, None, (jsonify({"error": "Job description must be a PDF"}), 400)
-
-            file.save(TEMP_FILES["job_desc"])
-            jd_db = lch.create_vectorDB_from_pdf(TEMP_FILES["job_desc"])
-        else:
-            jd_text = (
-                request.form.get("jobDescription") if is_multipart
-                else (request.get_json(silent=True) or {}).get("jobDescription", "")
-            ).strip()
-            if jd_text:
-                jd_db = lch.create_vectorDB_from_text(jd_text)
-
-        if jd_db is None:
-            return None, None, (jsonify({"error": "Missing job description file or text"}), 400)
-
-        jd_info = lch.extract_info(jd_db, jd_query)
-
+        with metrics.span("documents"):
+            if is_multipart:
+                resume_source, jd_source = doc_pipeline.read_documents(request.form, request.files)
+            else:
+                resume_source, jd_source = doc_pipeline.read_documents(request.get_json(silent=True) or {}, {})
+
+            resume_info, jd_info = doc_pipeline.process_documents(
+                resume_source, jd_source, resume_profile, jd_profile
+            )
         return resume_info, jd_info, None
 
     except Exception as exc:
         # Optional: app.logger.exception("Document processing failed")
-        return None, None, (jsonify({"error": f"Document processing failed: {exc}"}), 500)
+        payload, status = doc_pipeline.error_response(exc)
+        return None, None, (jsonify(payload), status)
+
+
+def sse_response(events):
+    """Stream lch (event, data) pairs as Server-Sent Events."""
+    def generate():
+        current = metrics.current()
+        deadline = deadlines.current()
+        finished = False
+        try:
+            for event, data in events:
+                payload = streaming.sse_event(event, data)
+                if current is not None:
+                    current.response_bytes += len(payload.encode())
+                yield payload
+            finished = True
+        finally:
+            if not finished:
+                # The client went away mid-stream; stop the LLM stream too
+                events.close()
+                if deadline is not None:
+                    deadline.cancel("disconnected", "stream")
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers=streaming.SSE_HEADERS)
 
 
 @app.route('/health', methods=['GET'])
+@app.route('/health/live', methods=['GET'])
 def health_check():
     return jsonify({"status": "OK", "message": "AI service running"})
 
 
+@app.route('/health/ready', methods=['GET'])
+def readiness_check():
+    if not lch.models_ready:
+        return jsonify({"status": "WARMING_UP", "message": "Models are still loading"}), 503
+    return jsonify({"status": "READY", "message": "Models loaded and warm"})
+
+
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    return jsonify(service_stats.collect())
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+
 @app.route('/resume/analyze', methods=['POST'])
 def analyze_resume():
-    print("Content‑Type ->", request.content_type)
-    print("Raw data len ->", len(request.data)) 
     try:
-        resume_query = "Extract skills, education, work experience, and projects from resume."
-        jd_query = "Extract required skills and technologies from job description."
+        resume_profile, jd_profile = ENDPOINT_PROFILES["resume_analysis"]
 
-        resume_text, jd_text, error_response = extract_resume_and_jd(request, resume_query, jd_query)
+        resume_text, jd_text, error_response = extract_resume_and_jd(request, resume_profile, jd_profile)
         if error_response:
             return error_response
 
         analysis = lch.resume_analysis(resume_text, jd_text)
         return jsonify(analysis) if not analysis.get("error") else (jsonify(analysis), 500)
     
+    except (LLMUnavailableError, deadlines.DeadlineExceeded):
+        raise
     except Exception as e:
         return jsonify({"error": f"Unexpected server error: {str(e)}"}), 500
-    finally:
-        _cleanup_temp_files()
+
+
+@app.route('/resume/ats-score', methods=['POST'])
+def ats_score():
+    # Local keyword/skill scoring only; no retrieval or LLM call
+    is_multipart = "multipart/form-data" in (request.content_type or "")
+    try:
+        if is_multipart:
+            resume_source, jd_source = doc_pipeline.read_documents(request.form, request.files)
+        else:
+            resume_source, jd_source = doc_pipeline.read_documents(request.get_json(silent=True) or {}, {})
+        scores = lch.ats_scorer.score(
+            doc_pipeline.document_text(resume_source), doc_pipeline.document_text(jd_source)
+        )
+    except Exception as exc:
+        payload, status = doc_pipeline.error_response(exc)
+        return jsonify(payload), status
+    return jsonify(scores)
 
 
 @app.route('/interview/generate', methods=['POST'])
 def generate_mock_questions():
     try:
-        resume_query = "Extract skills, experience, and projects from resume for mock questions."
-        jd_query = "Extract responsibilities and requirements from job description."
+        resume_profile, jd_profile = ENDPOINT_PROFILES["interview_questions"]
 
-        resume_text, jd_text, error_response = extract_resume_and_jd(request, resume_query, jd_query)
+        resume_text, jd_text, error_response = extract_resume_and_jd(request, resume_profile, jd_profile)
         if error_response:
             return error_response
 
         data = request.form if 'multipart/form-data' in request.content_type else request.get_json()
 
         questions = lch.generate_interview_questions(
-            resume_content=resume_text,
-            jd_content=jd_text,
-            num_questions=int(data.get('numQuestions', 5)),
-            skill_focus=data.get('skillFocus', "As per JD"),
-            question_type=data.get('questionType', "Technical, Behavioral"),
-            question_difficulty=data.get('questionDifficulty', "Medium"),
-            experience_level=data.get('experienceLevel', "1-2 years"),
-            round_type=data.get('roundType', "Technical"),
-            target_job_role=data.get('targetJobRole', "Software Engineer")
+            resume_content=resume_text, jd_content=jd_text, **question_options(data)
         )
 
         if isinstance(questions, dict) and questions.get("error"):
@@ -143,19 +194,39 @@ def generate_mock_questions():
         
         return jsonify(questions)
     
+    except (LLMUnavailableError, deadlines.DeadlineExceeded):
+        raise
+    except Exception as e:
+        return jsonify({"error": f"Unexpected server error: {str(e)}"}), 500
+
+
+@app.route('/interview/generate/stream', methods=['POST'])
+def stream_mock_questions():
+    try:
+        resume_profile, jd_profile = ENDPOINT_PROFILES["interview_questions"]
+
+        resume_text, jd_text, error_response = extract_resume_and_jd(request, resume_profile, jd_profile)
+        if error_response:
+            return error_response
+
+        data = request.form if 'multipart/form-data' in request.content_type else request.get_json()
+
+        return sse_response(lch.stream_interview_questions(
+            resume_content=resume_text, jd_content=jd_text, **question_options(data)
+        ))
+
+    except (LLMUnavailableError, deadlines.DeadlineExceeded):
+        raise
     except Exception as e:
         return jsonify({"error": f"Unexpected server error: {str(e)}"}), 500
-    finally:
-        _cleanup_temp_files()
 
 
 @app.route('/answer-feedback', methods=['POST'])
 def feedback_on_answer():
     try:
-        resume_query = "Extract relevant resume details for answer evaluation."
-        jd_query = "Extract job requirements for answer evaluation."
+        resume_profile, jd_profile = ENDPOINT_PROFILES["answer_feedback"]
 
-        resume_text, jd_text, error_response = extract_resume_and_jd(request, resume_query, jd_query)
+        resume_text, jd_text, error_response = extract_resume_and_jd(request, resume_profile, jd_profile)
         if error_response:
             return error_response
 
@@ -167,22 +238,47 @@ def feedback_on_answer():
         if not data.get("question") or not data.get("answer"):
             return jsonify({"error": "Missing question or answer"}), 400
 
-        feedback = lch.answer_feedback(resume_text, jd_text, data["question"], data["answer"])
+        feedback = lch.answer_feedback(
+            resume_text, jd_text, data["question"], data["answer"], user_id=request.headers.get("X-User-Id")
+        )
         return jsonify(feedback)
     
+    except (LLMUnavailableError, deadlines.DeadlineExceeded):
+        raise
+    except Exception as e:
+        return jsonify({"error": f"Unexpected server error: {str(e)}"}), 500
+
+
+@app.route('/answer-feedback/batch', methods=['POST'])
+def batch_feedback_on_answers():
+    try:
+        data = request.form if 'multipart/form-data' in (request.content_type or "") else request.get_json(silent=True)
+        try:
+            items = doc_pipeline.answer_items(data or {})
+        except doc_pipeline.DocumentRequestError as exc:
+            return jsonify({"error": exc.message}), exc.status
+
+        resume_profile, jd_profile = ENDPOINT_PROFILES["answer_feedback"]
+
+        resume_text, jd_text, error_response = extract_resume_and_jd(request, resume_profile, jd_profile)
+        if error_response:
+            return error_response
+
+        feedback = lch.answer_feedback_batch(resume_text, jd_text, items, user_id=request.headers.get("X-User-Id"))
+        return jsonify(feedback)
+
+    except (LLMUnavailableError, deadlines.DeadlineExceeded):
+        raise
     except Exception as e:
         return jsonify({"error": f"Unexpected server error: {str(e)}"}), 500
-    finally:
-        _cleanup_temp_files()
 
 
 @app.route('/ideal-answer', methods=['POST'])
 def generate_ideal_response():
     try:
-        resume_query = "Extract candidate strengths and experiences for ideal response."
-        jd_query = "Extract job expectations for crafting ideal answer."
+        resume_profile, jd_profile = ENDPOINT_PROFILES["ideal_answer"]
 
-        resume_text, jd_text, error_response = extract_resume_and_jd(request, resume_query, jd_query)
+        resume_text, jd_text, error_response = extract_resume_and_jd(request, resume_profile, jd_profile)
         if error_response:
             return error_response
 
@@ -195,15 +291,46 @@ def generate_ideal_response():
         if not question:
             return jsonify({"error": "Missing interview question"}), 400
 
-        ideal_response = lch.generate_ideal_answer(resume_text, jd_text, question)
+        ideal_response = lch.generate_ideal_answer(
+            resume_text, jd_text, question, user_id=request.headers.get("X-User-Id")
+        )
         return jsonify(ideal_response)
     
+    except (LLMUnavailableError, deadlines.DeadlineExceeded):
+        raise
+    except Exception as e:
+        return jsonify({"error": f"Unexpected server error: {str(e)}"}), 500
+
+
+@app.route('/ideal-answer/stream', methods=['POST'])
+def stream_ideal_response():
+    try:
+        resume_profile, jd_profile = ENDPOINT_PROFILES["ideal_answer"]
+
+        resume_text, jd_text, error_response = extract_resume_and_jd(request, resume_profile, jd_profile)
+        if error_response:
+            return error_response
+
+        data = request.form if 'multipart/form-data' in (request.content_type or "") else request.get_json()
+        if data is None:
+            data = {}
+
+        question = data.get("question")
+        if not question:
+            return jsonify({"error": "Missing interview question"}), 400
+
+        return sse_response(lch.stream_ideal_answer(
+            resume_text, jd_text, question, user_id=request.headers.get("X-User-Id")
+        ))
+
+    except (LLMUnavailableError, deadlines.DeadlineExceeded):
+        raise
     except Exception as e:
         return jsonify({"error": f"Unexpected server error: {str(e)}"}), 500
-    finally:
-        _cleanup_temp_files()
 
 
 if __name__ == '__main__':
+    # Development server; production runs gunicorn -c gunicorn.conf.py
+    lch.warm_up()
     port = int(os.environ.get('PORT', 5001))
     app.run(host='0.0.0.0', port=port, debug=False)
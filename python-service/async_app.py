@@ -0,0 +1,424 @@
+"""
+Async serving mode.
+
+Same routes and JSON contracts as app.py, served from an event loop so one
+process can keep dozens of requests in flight: LLM calls use ainvoke and CPU
+work (PDF parsing, embeddings, FAISS) runs on the shared document pool. LLM
+concurrency is capped by lch.llm_limiter; once its queue is full the service
+answers 503 with Retry-After instead of piling up more work, as it does
+when llm_client fails fast (circuit open or rate limited). A request whose
+client disconnects or whose deadline passes is cancelled (see deadlines.py).
+
+Run with:  python async_app.py, uvicorn async_app:app, or in production
+SERVE_MODE=async gunicorn -c gunicorn.conf.py
+"""
+from contextlib import asynccontextmanager
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from dotenv import load_dotenv
+import asyncio
+import os
+
+import langchain_helper as lch
+import deadlines
+import doc_pipeline
+import metrics
+import service_stats
+import streaming
+from doc_pipeline import ENDPOINT_PROFILES, question_options
+from llm_client import LLMUnavailableError
+from llm_limiter import LLMOverloadedError
+
+load_dotenv()
+
+
+async def _request_data(request):
+    """Return (fields, files) for either a multipart or a JSON request."""
+    if "multipart/form-data" in request.headers.get("content-type", ""):
+        form = await request.form()
+        return form, form
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    return data if isinstance(data, dict) else {}, {}
+
+
+async def extract_resume_and_jd(fields, files, resume_profile, jd_profile):
+    """Async counterpart of app.extract_resume_and_jd."""
+    try:
+        with metrics.span("documents"):
+            resume_source, jd_source = doc_pipeline.read_documents(fields, files)
+            resume_info, jd_info = await doc_pipeline.aprocess_documents(
+                resume_source, jd_source, resume_profile, jd_profile
+            )
+        return resume_info, jd_info, None
+
+    except Exception as exc:
+        payload, status = doc_pipeline.error_response(exc)
+        return None, None, JSONResponse(payload, status_code=status)
+
+
+class MetricsMiddleware:
+    """Per-request metrics (see metrics.py) and the Server-Timing header."""
+
+    def __init__(self, app):
+        self.app = app
+        self.paths = None
+
+    def _route(self, scope) -> str:
+        if self.paths is None:
+            self.paths = {route.path for route in scope["app"].routes}
+        return scope["path"] if scope["path"] in self.paths else "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        current = metrics.start_request(
+            scope["method"], self._route(scope), int(headers.get(b"content-length") or 0)
+        )
+        status = 500
+
+        async def send_with_metrics(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # For SSE this covers the work done before the stream starts
+                timing = (b"server-timing", current.server_timing().encode())
+                message = {**message, "headers": [*message.get("headers", []), timing]}
+            elif message["type"] == "http.response.body":
+                current.response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            metrics.finish_request(current, status)
+
+
+class DeadlineMiddleware:
+    """
+    Runs each request as its own task and cancels it when the client
+    disconnects or the request's deadline (see deadlines.py) passes. A
+    stream past its deadline is left to finish with an error event.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = dict(scope["headers"]).get(deadlines.DEADLINE_HEADER.lower().encode())
+        deadline = deadlines.start(header.decode() if header else None)
+        body_read = asyncio.Event()
+        disconnected = asyncio.Event()
+        response_started = False
+
+        async def receive_request():
+            if body_read.is_set():
+                # Once the body is in, watch_disconnect owns the channel
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body"):
+                body_read.set()
+            return message
+
+        async def send_response(message):
+            nonlocal response_started
+            response_started = response_started or message["type"] == "http.response.start"
+            await send(message)
+
+        async def watch_disconnect():
+            await body_read.wait()
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        handler = asyncio.ensure_future(self.app(scope, receive_request, send_response))
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            timeout = deadline.remaining()
+            while True:
+                done, _ = await asyncio.wait({handler, watcher}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if handler in done:
+                    handler.result()
+                    return
+                if watcher in done or not response_started:
+                    break
+                # Mid-stream: the stream's own deadline checks end it with an error event
+                deadline.cancel("deadline")
+                timeout = None
+            deadline.cancel("disconnected" if watcher in done else "deadline")
+            handler.cancel()
+            await asyncio.gather(handler, return_exceptions=True)
+            if not response_started:
+                # A disconnected client never sees this; it labels the request in metrics
+                exc = deadlines.DeadlineExceeded(deadline.reason, deadline.stage)
+                response = await handle_deadline_exceeded(None, exc)
+                await response(scope, receive_request, send)
+        finally:
+            handler.cancel()
+            watcher.cancel()
+
+
+async def handle_deadline_exceeded(request, exc):
+    return JSONResponse({"error": str(exc)}, status_code=exc.status)
+
+
+async def handle_overloaded(request, exc):
+    return JSONResponse(
+        {"error": str(exc)}, status_code=503, headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+def sse_response(events):
+    """Stream lch (event, data) pairs as Server-Sent Events."""
+    async def generate():
+        async for event, data in events:
+            yield streaming.sse_event(event, data)
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=streaming.SSE_HEADERS)
+
+
+async def health_check(request):
+    return JSONResponse({"status": "OK", "message": "AI service running"})
+
+
+async def readiness_check(request):
+    if not lch.models_ready:
+        return JSONResponse({"status": "WARMING_UP", "message": "Models are still loading"}, status_code=503)
+    return JSONResponse({"status": "READY", "message": "Models loaded and warm"})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Already warm when gunicorn preloaded the app in the master process
+    if not lch.models_ready:
+        await asyncio.get_running_loop().run_in_executor(None, lch.warm_up)
+    yield
+
+
+async def get_stats(request):
+    return JSONResponse(service_stats.collect())
+
+
+async def get_metrics(request):
+    body, content_type = metrics.render()
+    return Response(body, headers={"Content-Type": content_type})
+
+
+async def analyze_resume(request):
+    try:
+        data, files = await _request_data(request)
+        resume_text, jd_text, error_response = await extract_resume_and_jd(
+            data, files, *ENDPOINT_PROFILES["resume_analysis"]
+        )
+        if error_response:
+            return error_response
+
+        analysis = await lch.aresume_analysis(resume_text, jd_text)
+        return JSONResponse(analysis, status_code=500 if analysis.get("error") else 200)
+
+    except (LLMOverloadedError, LLMUnavailableError, deadlines.DeadlineExceeded):
+        raise
+    except Exception as e:
+        return JSONResponse({"error": f"Unexpected server error: {str(e)}"}, status_code=500)
+
+
+async def ats_score(request):
+    # Local keyword/skill scoring only; no retrieval or LLM call
+    data, files = await _request_data(request)
+    try:
+        resume_source, jd_source = doc_pipeline.read_documents(data, files)
+        loop = asyncio.get_running_loop()
+        executor = doc_pipeline.get_executor()
+        resume_text, jd_text = await asyncio.gather(
+            loop.run_in_executor(executor, doc_pipeline.document_text, resume_source),
+            loop.run_in_executor(executor, doc_pipeline.document_text, jd_source),
+        )
+        scores = lch.ats_scorer.score(resume_text, jd_text)
+    except Exception as exc:
+        payload, status = doc_pipeline.error_response(exc)
+        return JSONResponse(payload, status_code=status)
+    return JSONResponse(scores)
+
+
+async def generate_mock_questions(request):
+    try:
+        data, files = await _request_data(request)
+        resume_text, jd_text, error_response = await extract_resume_and_jd(
+            data, files, *ENDPOINT_PROFILES["interview_questions"]
+        )
+        if error_response:
+            return error_response
+
+        questions = await lch.agenerate_interview_questions(
+            resume_content=resume_text, jd_content=jd_text, **question_options(data)
+        )
+
+        if isinstance(questions, dict) and questions.get("error"):
+            return JSONResponse(questions, status_code=500)
+
+        return JSONResponse(questions)
+
+    except (LLMOverloadedError, LLMUnavailableError, deadlines.DeadlineExceeded):
+        raise
+    except Exception as e:
+        return JSONResponse({"error": f"Unexpected server error: {str(e)}"}, status_code=500)
+
+
+async def stream_mock_questions(request):
+    try:
+        data, files = await _request_data(request)
+        resume_text, jd_text, error_response = await extract_resume_and_jd(
+            data, files, *ENDPOINT_PROFILES["interview_questions"]
+        )
+        if error_response:
+            return error_response
+
+        return sse_response(lch.astream_interview_questions(
+            resume_content=resume_text, jd_content=jd_text, **question_options(data)
+        ))
+
+    except Exception as e:
+        return JSONResponse({"error": f"Unexpected server error: {str(e)}"}, status_code=500)
+
+
+async def feedback_on_answer(request):
+    try:
+        data, files = await _request_data(request)
+        resume_text, jd_text, error_response = await extract_resume_and_jd(
+            data, files, *ENDPOINT_PROFILES["answer_feedback"]
+        )
+        if error_response:
+            return error_response
+
+        if not data.get("question") or not data.get("answer"):
+            return JSONResponse({"error": "Missing question or answer"}, status_code=400)
+
+        feedback = await lch.aanswer_feedback(
+            resume_text, jd_text, data["question"], data["answer"], user_id=request.headers.get("X-User-Id")
+        )
+        return JSONResponse(feedback)
+
+    except (LLMOverloadedError, LLMUnavailableError, deadlines.DeadlineExceeded):
+        raise
+    except Exception as e:
+        return JSONResponse({"error": f"Unexpected server error: {str(e)}"}, status_code=500)
+
+
+async def batch_feedback_on_answers(request):
+    try:
+        data, files = await _request_data(request)
+        try:
+            items = doc_pipeline.answer_items(data)
+        except doc_pipeline.DocumentRequestError as exc:
+            return JSONResponse({"error": exc.message}, status_code=exc.status)
+
+        resume_text, jd_text, error_response = await extract_resume_and_jd(
+            data, files, *ENDPOINT_PROFILES["answer_feedback"]
+        )
+        if error_response:
+            return error_response
+
+        feedback = await lch.aanswer_feedback_batch(
+            resume_text, jd_text, items, user_id=request.headers.get("X-User-Id")
+        )
+        return JSONResponse(feedback)
+
+    except (LLMOverloadedError, LLMUnavailableError, deadlines.DeadlineExceeded):
+        raise
+    except Exception as e:
+        return JSONResponse({"error": f"Unexpected server error: {str(e)}"}, status_code=500)
+
+
+async def generate_ideal_response(request):
+    try:
+        data, files = await _request_data(request)
+        resume_text, jd_text, error_response = await extract_resume_and_jd(
+            data, files, *ENDPOINT_PROFILES["ideal_answer"]
+        )
+        if error_response:
+            return error_response
+
+        question = data.get("question")
+        if not question:
+            return JSONResponse({"error": "Missing interview question"}, status_code=400)
+
+        ideal_response = await lch.agenerate_ideal_answer(
+            resume_text, jd_text, question, user_id=request.headers.get("X-User-Id")
+        )
+        return JSONResponse(ideal_response)
+
+    except (LLMOverloadedError, LLMUnavailableError, deadlines.DeadlineExceeded):
+        raise
+    except Exception as e:
+        return JSONResponse({"error": f"Unexpected server error: {str(e)}"}, status_code=500)
+
+
+async def stream_ideal_response(request):
+    try:
+        data, files = await _request_data(request)
+        resume_text, jd_text, error_response = await extract_resume_and_jd(
+            data, files, *ENDPOINT_PROFILES["ideal_answer"]
+        )
+        if error_response:
+            return error_response
+
+        question = data.get("question")
+        if not question:
+            return JSONResponse({"error": "Missing interview question"}, status_code=400)
+
+        return sse_response(lch.astream_ideal_answer(
+            resume_text, jd_text, question, user_id=request.headers.get("X-User-Id")
+        ))
+
+    except Exception as e:
+        return JSONResponse({"error": f"Unexpected server error: {str(e)}"}, status_code=500)
+
+
+app = Starlette(
+    routes=[
+        Route('/health', health_check, methods=['GET']),
+        Route('/health/live', health_check, methods=['GET']),
+        Route('/health/ready', readiness_check, methods=['GET']),
+        Route('/stats', get_stats, methods=['GET']),
+        Route('/metrics', get_metrics, methods=['GET']),
+        Route('/resume/analyze', analyze_resume, methods=['POST']),
+        Route('/resume/ats-score', ats_score, methods=['POST']),
+        Route('/interview/generate', generate_mock_questions, methods=['POST']),
+        Route('/interview/generate/stream', stream_mock_questions, methods=['POST']),
+        Route('/answer-feedback', feedback_on_answer, methods=['POST']),
+        Route('/answer-feedback/batch', batch_feedback_on_answers, methods=['POST']),
+        Route('/ideal-answer', generate_ideal_response, methods=['POST']),
+        Route('/ideal-answer/stream', stream_ideal_response, methods=['POST']),
+    ],
+    middleware=[
+        Middleware(MetricsMiddleware),
+        Middleware(DeadlineMiddleware),
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]),
+    ],
+    exception_handlers={
+        LLMOverloadedError: handle_overloaded,
+        LLMUnavailableError: handle_overloaded,
+        deadlines.DeadlineExceeded: handle_deadline_exceeded,
+    },
+    lifespan=lifespan,
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.environ.get('PORT', 5001))
+    uvicorn.run(app, host='0.0.0.0', port=port)
@@ -0,0 +1,195 @@
+"""
+Deterministic ATS-style scoring of a resume against a job description.
+
+  skills_match   share of the JD's skills the resume covers. Skills come
+                 from a fixed vocabulary (SKILLS plus ATS_SKILLS_FILE, with
+                 ALIASES normalized away). A JD skill counts fully when the
+                 resume names it, and by its cosine similarity when the
+                 closest resume skill is at least ATS_SKILL_SIMILARITY
+                 (e.g. PostgreSQL vs MySQL). All pairs are scored in one
+                 matrix product over vectors embedded once at warm-up.
+  keyword_match  share of the JD's most frequent non-stopword terms that
+                 appear (stemmed) in the resume.
+
+No LLM is involved, so the same inputs always give the same scores.
+"""
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+SKILL_SIMILARITY = float(os.getenv("ATS_SKILL_SIMILARITY", "0.8"))
+TOP_KEYWORDS = int(os.getenv("ATS_TOP_KEYWORDS", "25"))
+
+SKILLS = [
+    # Languages
+    "python", "java", "javascript", "typescript", "c++", "c#", "golang", "rust", "kotlin", "swift",
+    "scala", "ruby", "php", "sql", "bash", "matlab", "dart", "perl", "haskell", "elixir",
+    # Web and mobile
+    "html", "css", "react", "angular", "vue", "next.js", "node.js", "express", "django", "flask",
+    "fastapi", "spring boot", "asp.net", "graphql", "rest api", "redux", "tailwind", "bootstrap",
+    "jquery", "react native", "flutter", "android", "ios", "webpack", "vite",
+    # Data and ML
+    "machine learning", "deep learning", "nlp", "computer vision", "pytorch", "tensorflow", "keras",
+    "scikit-learn", "pandas", "numpy", "spark", "hadoop", "airflow", "kafka", "data analysis",
+    "data engineering", "statistics", "tableau", "power bi", "excel", "langchain", "llm",
+    "generative ai", "opencv", "hugging face", "mlops", "etl",
+    # Databases
+    "postgresql", "mysql", "mongodb", "redis", "elasticsearch", "cassandra", "dynamodb", "sqlite",
+    "oracle", "firebase", "snowflake", "bigquery",
+    # Cloud and infrastructure
+    "aws", "azure", "gcp", "docker", "kubernetes", "terraform", "ansible", "jenkins", "ci/cd",
+    "github actions", "linux", "nginx", "microservices", "serverless", "git", "prometheus", "grafana",
+    # Practices and fundamentals
+    "data structures", "algorithms", "system design", "object oriented programming",
+    "distributed systems", "unit testing", "agile", "scrum", "jira", "operating systems",
+    "computer networks", "dbms", "design patterns", "multithreading", "security", "oauth",
+    "websockets", "rabbitmq", "selenium", "jest", "pytest", "figma",
+]
+
+ALIASES = {
+    "js": "javascript", "ts": "typescript", "cpp": "c++", "csharp": "c#",
+    "reactjs": "react", "react.js": "react", "vuejs": "vue", "vue.js": "vue", "angularjs": "angular",
+    "nextjs": "next.js", "nodejs": "node.js", "expressjs": "express",
+    "express.js": "express", "springboot": "spring boot", "restful": "rest api", "rest apis": "rest api",
+    "ml": "machine learning", "natural language processing": "nlp",
+    "sklearn": "scikit-learn", "postgres": "postgresql", "mongo": "mongodb", "k8s": "kubernetes",
+    "amazon web services": "aws", "google cloud": "gcp", "google cloud platform": "gcp",
+    "microsoft azure": "azure", "ci cd": "ci/cd", "cicd": "ci/cd", "continuous integration": "ci/cd",
+    "dsa": "data structures", "oop": "object oriented programming", "oops": "object oriented programming",
+    "object-oriented programming": "object oriented programming", "large language models": "llm",
+    "llms": "llm", "genai": "generative ai", "gen ai": "generative ai", "powerbi": "power bi",
+    "huggingface": "hugging face", "tailwindcss": "tailwind",
+}
+
+STOPWORDS = set("""
+a about above after again against all also an and any are as at be because been before being below
+between both but by can could did do does doing down during each etc few for from further had has
+have having he her here hers him his how i if in into is it its itself just like may me more most
+must my no nor not now of off on once only or other our ours out over own per plus same she should
+so some such than that the their theirs them then there these they this those through to too under
+until up us very via was we well were what when where which while who whom why will with within
+without would you your yours
+ability able across candidate candidates company day degree etc excellent experience experienced
+good great help including job join knowledge looking new opportunity plus preferred proven related
+required requirement requirements responsibilities responsible role skill skills strong team teams
+understanding using work working year years
+""".split())
+
+_TOKEN = re.compile(r"[a-z][a-z0-9+#./-]*[a-z0-9+#]|[a-z]")
+
+
+def _normalize(text: str) -> str:
+    text = text.lower().replace("’", "'")
+    return re.sub(r"\s+", " ", text)
+
+
+def _stem(word: str) -> str:
+    if word.endswith(("sses", "xes", "ches", "shes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")) and len(word) > 4:
+        return word[:-1]
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def _load_extra_skills() -> list:
+    path = os.getenv("ATS_SKILLS_FILE")
+    if not path:
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [line.strip().lower() for line in f if line.strip() and not line.startswith("#")]
+
+
+class AtsScorer:
+    def __init__(self, embeddings, skills: list, aliases: dict, similarity_threshold: float,
+                 top_keywords: int):
+        self.embeddings = embeddings
+        self.skills = list(dict.fromkeys(skills))
+        self.aliases = aliases
+        self.similarity_threshold = similarity_threshold
+        self.top_keywords = top_keywords
+        self._index = {skill: i for i, skill in enumerate(self.skills)}
+        forms = sorted(set(self.skills) | set(aliases), key=len, reverse=True)
+        self._pattern = re.compile(
+            r"(?<![a-z0-9+#])(" + "|".join(re.escape(form) for form in forms) + r")(?![a-z0-9+#])"
+        )
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        """Embed the skill vocabulary once; rows are L2-normalized."""
+        with self._lock:
+            if self._matrix is not None:
+                return
+            vectors = np.asarray(self.embeddings.embed_documents(self.skills), dtype=np.float32)
+            self._matrix = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+    def extract_skills(self, text: str) -> list:
+        """Canonical skills named in text, in order of first mention."""
+        found = (self.aliases.get(match, match) for match in self._pattern.findall(_normalize(text)))
+        return list(dict.fromkeys(skill for skill in found if skill in self._index))
+
+    def extract_keywords(self, text: str) -> dict:
+        """
+        The top_keywords most frequent terms (ties by first use), as
+        {stem: first surface form}.
+        """
+        words = [word for word in _TOKEN.findall(_normalize(text)) if len(word) > 2]
+        stems = [_stem(word) for word in words]
+        counts = Counter(stem for stem in stems if stem not in STOPWORDS)
+        surface = {}
+        for word, stem in zip(words, stems):
+            if stem in counts:
+                surface.setdefault(stem, word)
+        first_use = {stem: position for position, stem in enumerate(surface)}
+        top = sorted(counts, key=lambda stem: (-counts[stem], first_use[stem]))[:self.top_keywords]
+        return {stem: surface[stem] for stem in top}
+
+    def score(self, resume_text: str, jd_text: str) -> dict:
+        started = time.perf_counter()
+        self.warm_up()
+        resume_skills = self.extract_skills(resume_text)
+        jd_skills = self.extract_skills(jd_text)
+
+        # One (JD skills x resume skills) similarity matrix
+        credit = np.zeros(len(jd_skills), dtype=np.float32)
+        if jd_skills and resume_skills:
+            jd_vectors = self._matrix[[self._index[skill] for skill in jd_skills]]
+            resume_vectors = self._matrix[[self._index[skill] for skill in resume_skills]]
+            best = (jd_vectors @ resume_vectors.T).max(axis=1)
+            credit = np.where(best >= self.similarity_threshold, np.minimum(best, 1.0), 0.0)
+            resume_set = set(resume_skills)
+            credit[[i for i, skill in enumerate(jd_skills) if skill in resume_set]] = 1.0
+
+        resume_terms = {_stem(token) for token in _TOKEN.findall(_normalize(resume_text))}
+        jd_keywords = self.extract_keywords(jd_text)
+        matched_keywords = [stem for stem in jd_keywords if stem in resume_terms]
+
+        result = {
+            "skills_match": int(round(100 * float(credit.mean()))) if jd_skills else 0,
+            "keyword_match": int(round(100 * len(matched_keywords) / len(jd_keywords))) if jd_keywords else 0,
+            "matched_skills": [skill for skill, c in zip(jd_skills, credit) if c >= 1.0],
+            "related_skills": [skill for skill, c in zip(jd_skills, credit) if 0 < c < 1.0],
+            "missing_skills": [skill for skill, c in zip(jd_skills, credit) if c == 0],
+            "matched_keywords": [jd_keywords[stem] for stem in matched_keywords],
+            "missing_keywords": [word for stem, word in jd_keywords.items() if stem not in resume_terms],
+        }
+        print(f"[ATS] scored {len(jd_skills)} JD skills x {len(resume_skills)} resume skills "
+              f"in {(time.perf_counter() - started) * 1000:.1f}ms")
+        return result
+
+
+def create_scorer(embeddings) -> AtsScorer:
+    return AtsScorer(
+        embeddings,
+        skills=SKILLS + _load_extra_skills(),
+        aliases=ALIASES,
+        similarity_threshold=SKILL_SIMILARITY,
+        top_keywords=TOP_KEYWORDS,
+    )
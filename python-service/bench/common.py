@@ -0,0 +1,161 @@
+"""
+Shared setup for the offline benchmarks: import path and environment,
+fixtures, latency summaries and saved baselines.
+
+Import this before langchain_helper: it disables the response caches
+(unless the caller opts back in) so every run measures the same work.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+BASELINES_DIR = os.path.join(BENCH_DIR, "baselines")
+
+SIZES = ("small", "medium", "large", "xlarge", "max")
+
+# Sizes built from the large fixtures when loaded instead of checked in, in
+# characters: xlarge is past retrieval.SMALL_DOC_MAX_TOKENS (numpy store), max
+# is a full pdf_ingest.MAX_DOC_CHARS document (FAISS store)
+GENERATED_CHARS = {"xlarge": 32000, "max": None}
+
+# Changes smaller than this are timer noise, whatever the percentage
+MIN_REGRESSION_MS = 0.1
+
+sys.path.insert(0, SERVICE_DIR)
+os.environ.setdefault("GROQ_API_KEY", "unused-for-benchmarks")
+for _name in ("LLM_CACHE_ENDPOINTS", "SEMANTIC_CACHE_ENDPOINTS"):
+    os.environ.setdefault(_name, "")
+os.environ.setdefault("DOC_CACHE_DIR", "")
+os.environ.setdefault("METRICS_SLOW_REQUEST_SECONDS", "3600")
+
+
+def _generated(name: str):
+    kind, _, size = name.rpartition("_")
+    if size not in GENERATED_CHARS:
+        return None
+    import pdf_ingest
+
+    with open(os.path.join(FIXTURES_DIR, f"{kind}_large.txt"), encoding="utf-8") as f:
+        base = f.read()
+    target = GENERATED_CHARS[size] or pdf_ingest.MAX_DOC_CHARS
+    # Number the copies so no two chunks are identical
+    parts, total, i = [], 0, 0
+    while total < target:
+        i += 1
+        parts.append(f"PART {i}\n{base}")
+        total += len(parts[-1]) + 2
+    return "\n\n".join(parts)[:target]
+
+
+def fixture_text(name: str) -> str:
+    text = _generated(name)
+    if text is not None:
+        return text
+    with open(os.path.join(FIXTURES_DIR, f"{name}.txt"), encoding="utf-8") as f:
+        return f.read()
+
+
+def fixture_pdf(name: str) -> bytes:
+    text = _generated(name)
+    if text is not None:
+        import make_fixtures
+        return make_fixtures.render_pdf(text, make_fixtures.DENSE_LINES_PER_PAGE)
+    path = os.path.join(FIXTURES_DIR, f"{name}.pdf")
+    if not os.path.exists(path):
+        raise SystemExit(f"{path} is missing; run bench/make_fixtures.py first")
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def percentile(values: list, q: float) -> float:
+    """Linear-interpolated percentile (q in 0..100) of values."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(seconds: list) -> dict:
+    ms = [s * 1000 for s in seconds]
+    return {
+        "n": len(ms),
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def baseline_path(name: str) -> str:
+    return name if os.sep in name or name.endswith(".json") else os.path.join(BASELINES_DIR, f"{name}.json")
+
+
+def save_baseline(name: str, settings: dict, results: dict) -> str:
+    path = baseline_path(name)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "settings": settings, "results": results}, f, indent=2,
+                  sort_keys=True)
+        f.write("\n")
+    return path
+
+
+def compare_baseline(name: str, settings: dict, results: dict, metric: str, tolerance: float) -> list:
+    """
+    Print current vs baseline `metric` for every shared result and return
+    the names that got slower by more than `tolerance` (0.25 = 25%) and
+    MIN_REGRESSION_MS.
+    """
+    with open(baseline_path(name), encoding="utf-8") as f:
+        baseline = json.load(f)
+    differing = {
+        key: (baseline["settings"].get(key), value)
+        for key, value in settings.items()
+        if baseline["settings"].get(key) != value
+    }
+    if differing:
+        print(f"Warning: settings differ from the baseline, results are not comparable: {differing}")
+
+    regressions = []
+    print(f"\n{'benchmark':<44} {'baseline':>10} {'current':>10} {'change':>8}")
+    for key in sorted(results):
+        if key not in baseline["results"]:
+            continue
+        before, after = baseline["results"][key][metric], results[key][metric]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > tolerance and after - before > MIN_REGRESSION_MS:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:<44} {before:>10.2f} {after:>10.2f} {change:>+7.0%}{flag}")
+    missing = sorted(set(baseline["results"]) - set(results))
+    if missing:
+        print(f"{len(missing)} baseline benchmark(s) not run this time")
+    print(f"\n{len(regressions)} regression(s) over {tolerance:.0%} in {metric}"
+          f" against {baseline_path(name)} ({baseline['environment'].get('commit') or 'unknown commit'})")
+    return regressions
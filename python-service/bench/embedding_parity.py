@@ -0,0 +1,92 @@
+"""
+Compare embedding backends (see embedding_backends.py) on the fixture
+documents: retrieval parity of extract_info and embedding throughput.
+
+    python bench/embedding_parity.py [--backends huggingface onnx] [--top-k 3]
+
+For every fixture document and every endpoint query it reports whether
+extract_info returns identical content, the overlap of the top-k chunks,
+and the mean cosine similarity between the two backends' chunk vectors.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "unused-for-benchmarks")
+
+from langchain_community.vectorstores import FAISS  # noqa: E402
+
+import langchain_helper as lch  # noqa: E402
+from extraction_profiles import DEFAULT_PROFILES  # noqa: E402
+from embedding_backends import create_embeddings  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixtures() -> dict:
+    documents = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            documents[os.path.basename(path)] = f.read()
+    return documents
+
+
+def throughput(embeddings, texts: list, rounds: int = 3) -> float:
+    embeddings.embed_documents(texts[:1])
+    start = time.perf_counter()
+    for _ in range(rounds):
+        embeddings.embed_documents(texts)
+    return rounds * len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs=2, default=["huggingface", "onnx"])
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    reference_name, candidate_name = args.backends
+    reference = create_embeddings(lch.EMBEDDING_MODEL, backend=reference_name)
+    candidate = create_embeddings(lch.EMBEDDING_MODEL, backend=candidate_name)
+
+    documents = load_fixtures()
+    queries = sorted(DEFAULT_PROFILES.values())
+    all_chunks = []
+    identical = total = 0
+    overlaps, cosines = [], []
+
+    for name, text in documents.items():
+        chunks = [doc.page_content for doc in lch.text_splitter.create_documents([text])]
+        all_chunks.extend(chunks)
+        ref_vectors = np.asarray(reference.embed_documents(chunks), dtype=np.float32)
+        cand_vectors = np.asarray(candidate.embed_documents(chunks), dtype=np.float32)
+        cosines.extend(
+            np.sum(ref_vectors * cand_vectors, axis=1)
+            / (np.linalg.norm(ref_vectors, axis=1) * np.linalg.norm(cand_vectors, axis=1))
+        )
+
+        ref_db = FAISS.from_embeddings(list(zip(chunks, ref_vectors.tolist())), reference)
+        cand_db = FAISS.from_embeddings(list(zip(chunks, cand_vectors.tolist())), candidate)
+        for query in queries:
+            total += 1
+            identical += lch.extract_info(ref_db, query) == lch.extract_info(cand_db, query)
+            ref_top = {doc.page_content for doc in ref_db.similarity_search(query, k=args.top_k)}
+            cand_top = {doc.page_content for doc in cand_db.similarity_search(query, k=args.top_k)}
+            overlaps.append(len(ref_top & cand_top) / len(ref_top))
+
+    print(f"Documents: {len(documents)}  chunks: {len(all_chunks)}  queries: {len(queries)}")
+    print(f"extract_info identical: {identical}/{total}")
+    print(f"top-{args.top_k} overlap: mean {np.mean(overlaps):.3f}  min {np.min(overlaps):.3f}")
+    print(f"chunk vector cosine ({reference_name} vs {candidate_name}): "
+          f"mean {np.mean(cosines):.4f}  min {np.min(cosines):.4f}")
+    for label, embeddings in ((reference_name, reference), (candidate_name, candidate)):
+        print(f"throughput {label}: {throughput(embeddings, all_chunks):.1f} chunks/s")
+
+
+if __name__ == "__main__":
+    main()
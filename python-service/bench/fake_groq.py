@@ -0,0 +1,267 @@
+"""
+A fake Groq API that injects failures and latency, for exercising
+llm_client over real HTTP.
+
+    python bench/fake_groq.py --port 8099 --error-rate 0.1 --rate-limit-rate 0.05 --slow-rate 0.05
+    GROQ_BASE_URL=http://127.0.0.1:8099 python app.py
+
+It serves POST /openai/v1/chat/completions, plain or streamed, answering
+with bench/stub_llm.py's canned completions at the stub's pacing, and:
+
+- fails --error-rate of calls with a 500 or 503;
+- rejects --rate-limit-rate of calls with a 429 and Retry-After, and every
+  call over --rpm in the last minute, like Groq's own limit;
+- delays --slow-rate of calls by --slow-seconds, a latency tail to hedge;
+- ends --stream-error-rate of streams with an error event after their first
+  chunk, like a generation failing upstream once the response has started.
+
+GET /faults shows the settings and what was served; POST /faults with a
+JSON object changes settings while it runs, e.g. {"error_rate": 1} for an
+outage and {"error_rate": 0} to recover; --models limits the faults to
+some models, so a fallback model can stay healthy. load_test.py --fake-groq runs one
+in-process.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import common
+import stub_llm
+
+import context_packer
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+
+class Faults:
+    def __init__(self, latency=0.5, tokens_per_second=250, jitter=0.1, error_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=1.0, slow_rate=0.0, slow_seconds=5.0, stream_error_rate=0.0, rpm=0, models=None,
+                 seed=None):
+        self.settings = {
+            "latency": latency,
+            "tokens_per_second": tokens_per_second,
+            "jitter": jitter,
+            "error_rate": error_rate,
+            "rate_limit_rate": rate_limit_rate,
+            "retry_after": retry_after,
+            "slow_rate": slow_rate,
+            "slow_seconds": slow_seconds,
+            "stream_error_rate": stream_error_rate,
+            "rpm": rpm,
+            # Inject faults only into calls for these models (empty = all), e.g.
+            # to fail the primary while the fallback model stays healthy
+            "models": list(models or ()),
+        }
+        self.served = {"ok": 0, "server_error": 0, "rate_limited": 0, "slow": 0, "stream_error": 0}
+        self.rng = random.Random(seed)
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def update(self, changes: dict):
+        with self._lock:
+            unknown = set(changes) - set(self.settings)
+            if unknown:
+                raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+            self.settings.update(changes)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"settings": dict(self.settings), "served": dict(self.served)}
+
+    def decide(self, model: str):
+        """(status, retry_after, extra delay) for the next call."""
+        with self._lock:
+            settings, now = self.settings, time.monotonic()
+            if settings["models"] and model not in settings["models"]:
+                self.served["ok"] += 1
+                return 200, None, 0
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            if settings["rpm"] and len(self._recent) >= settings["rpm"]:
+                self.served["rate_limited"] += 1
+                return 429, 60 - (now - self._recent[0]), 0
+            self._recent.append(now)
+            roll = self.rng.random()
+            if roll < settings["rate_limit_rate"]:
+                self.served["rate_limited"] += 1
+                return 429, settings["retry_after"], 0
+            if roll < settings["rate_limit_rate"] + settings["error_rate"]:
+                self.served["server_error"] += 1
+                return self.rng.choice((500, 503)), None, 0
+            self.served["ok"] += 1
+            if self.rng.random() < settings["slow_rate"]:
+                self.served["slow"] += 1
+                return 200, None, settings["slow_seconds"]
+            return 200, None, 0
+
+    def break_stream(self, model: str) -> bool:
+        with self._lock:
+            settings = self.settings
+            if settings["models"] and model not in settings["models"]:
+                return False
+            if self.rng.random() < settings["stream_error_rate"]:
+                self.served["stream_error"] += 1
+                return True
+            return False
+
+    def pacing(self, text: str, completion_tokens: int):
+        # (first-token delay, seconds per character), like StubChatModel
+        with self._lock:
+            settings = dict(self.settings)
+            scale = 1 + self.rng.uniform(-settings["jitter"], settings["jitter"]) if settings["jitter"] else 1
+        per_char = scale / (settings["tokens_per_second"] * len(text) / max(completion_tokens, 1)) if text else 0
+        return settings["latency"] * scale, per_char
+
+
+def _completion(text: str, model: str, usage: dict) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": usage,
+    }
+
+
+def _chunk(completion_id: str, piece: str, model: str, usage: dict = None) -> dict:
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": "stop" if usage else None}],
+    }
+    if usage:
+        chunk["x_groq"] = {"id": completion_id, "usage": usage}
+    return chunk
+
+
+def make_handler(faults: Faults):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _json(self, status: int, body: dict, headers: dict = None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            if self.path == "/faults":
+                return self._json(200, faults.snapshot())
+            self._json(404, {"error": {"message": "Not found"}})
+
+        def do_POST(self):
+            if self.path == "/faults":
+                try:
+                    faults.update(self._body())
+                except ValueError as e:
+                    return self._json(400, {"error": {"message": str(e)}})
+                return self._json(200, faults.snapshot())
+            if self.path != COMPLETIONS_PATH:
+                return self._json(404, {"error": {"message": "Not found"}})
+            try:
+                self._complete(self._body())
+            except (BrokenPipeError, ConnectionResetError):
+                # The client timed out or cancelled the call (e.g. a hedge that lost)
+                pass
+
+        def _complete(self, request: dict):
+            model = request.get("model", "fake")
+            status, retry_after, extra_delay = faults.decide(model)
+            if status == 429:
+                return self._json(429, {"error": {"message": "Rate limit reached (fake)", "type": "requests",
+                                                  "code": "rate_limit_exceeded"}},
+                                  {"retry-after": f"{retry_after:.3f}"})
+            if status != 200:
+                return self._json(status, {"error": {"message": "Service unavailable (fake)",
+                                                     "type": "internal_server_error"}})
+
+            prompt = "\n".join(str(message.get("content", "")) for message in request.get("messages", []))
+            text = stub_llm.canned_response(prompt)
+            prompt_tokens, completion_tokens = context_packer.count_tokens(prompt), context_packer.count_tokens(text)
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                     "total_tokens": prompt_tokens + completion_tokens}
+            first, per_char = faults.pacing(text, completion_tokens)
+            time.sleep(first + extra_delay)
+
+            if not request.get("stream"):
+                time.sleep(per_char * len(text))
+                return self._json(200, _completion(text, model, usage))
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            pieces = [text[i:i + stub_llm.STREAM_CHUNK_CHARS] for i in range(0, len(text), stub_llm.STREAM_CHUNK_CHARS)]
+            if faults.break_stream(model):
+                error = {"error": {"message": "Generation failed (fake)", "type": "internal_server_error"}}
+                for data in (_chunk(completion_id, pieces[0] if pieces else "", model), error):
+                    self.wfile.write(f"data: {json.dumps(data)}\n\n".encode())
+                return
+            for i, piece in enumerate(pieces):
+                time.sleep(per_char * len(piece))
+                chunk = _chunk(completion_id, piece, model, usage if i == len(pieces) - 1 else None)
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+
+    return Handler
+
+
+def start(host: str = "127.0.0.1", port: int = 0, **settings):
+    """Serve in a background thread; returns (base URL, Faults)."""
+    faults = Faults(**settings)
+    server = ThreadingHTTPServer((host, port), make_handler(faults))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://{host}:{server.server_address[1]}", faults
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--tps", type=float, default=250, help="completion tokens per second")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered 500/503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of calls answered 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on injected 429s")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of calls delayed by --slow-seconds")
+    parser.add_argument("--slow-seconds", type=float, default=5.0)
+    parser.add_argument("--stream-error-rate", type=float, default=0.0,
+                        help="share of streams that fail after their first chunk")
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute before 429s (0 = unlimited)")
+    parser.add_argument("--models", nargs="+", help="inject faults only for these models")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    url, _ = start(args.host, args.port, latency=args.latency, tokens_per_second=args.tps, jitter=args.jitter,
+                   error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+                   slow_rate=args.slow_rate, slow_seconds=args.slow_seconds, stream_error_rate=args.stream_error_rate,
+                   rpm=args.rpm, models=args.models, seed=args.seed)
+    print(f"Fake Groq API on {url} (GROQ_BASE_URL={url}); Ctrl-C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
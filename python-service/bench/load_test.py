@@ -0,0 +1,332 @@
+"""
+Concurrent load driver for the HTTP routes, offline.
+
+    python bench/load_test.py [--app sync|async] [--concurrency 8] [--requests 200]
+    python bench/load_test.py --duration 60 --mix analyze=1,feedback=4 --save load
+    python bench/load_test.py --compare load
+
+By default it starts the Flask app (or the Starlette app with --app async)
+in-process on a free port with bench/stub_llm.py in place of ChatGroq,
+then runs --concurrency closed-loop clients that pick routes at random by
+--mix weight. Each request carries a unique resume (so the document cache
+misses, as it would across users) unless --reuse-docs is given; --pdf
+uploads the documents as PDFs instead of text fields. --fake-groq serves
+the LLM from bench/fake_groq.py over HTTP instead, through the real Groq
+client and llm_client, with its injected 429s, errors and slow calls.
+
+It reports p50/p95/p99 latency, errors and throughput per route, plus the
+mean Server-Timing stage breakdown the service reported. --url drives an
+already-running service instead; its LLM is whatever it is configured with.
+--save/--compare work like run_benchmarks.py, on p95 (or --metric) and on
+overall throughput.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import common
+import fake_groq
+import make_fixtures
+import stub_llm
+
+QUESTION = "Tell me about a system you designed and the trade-offs you made."
+ANSWER = ("I built an event pipeline on Kafka. We chose at-least-once delivery with idempotent consumers "
+          "because exactly-once was too expensive for our volume, and it cut duplicate orders to zero.")
+
+# name -> (path, extra fields)
+ROUTES = {
+    "analyze": ("/resume/analyze", {}),
+    "ats": ("/resume/ats-score", {}),
+    "questions": ("/interview/generate", {"numQuestions": 5}),
+    "questions_stream": ("/interview/generate/stream", {"numQuestions": 5}),
+    "feedback": ("/answer-feedback", {"question": QUESTION, "answer": ANSWER}),
+    "feedback_batch": ("/answer-feedback/batch", {
+        "answers": [{"question": f"{QUESTION} ({i + 1})", "answer": ANSWER} for i in range(5)],
+    }),
+    "ideal": ("/ideal-answer", {"question": QUESTION}),
+    "ideal_stream": ("/ideal-answer/stream", {"question": QUESTION}),
+}
+
+# Roughly one interview session: an analysis, a question set, several answers
+DEFAULT_MIX = "analyze=1,ats=1,questions=1,questions_stream=1,feedback=3,feedback_batch=1,ideal=2,ideal_stream=1"
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ROUTES:
+            raise SystemExit(f"Unknown route {name.strip()!r}; choose from {', '.join(ROUTES)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app_kind: str, stub_settings: dict, fake_groq_settings: dict = None) -> str:
+    """
+    Run the app in a background thread with the stub LLM, or with the real
+    Groq client pointed at an in-process fake_groq server; returns its base URL.
+    """
+    if fake_groq_settings is not None:
+        # Must be set before langchain_helper builds its Groq clients
+        os.environ["GROQ_BASE_URL"], _ = fake_groq.start(**stub_settings, **fake_groq_settings)
+    import langchain_helper as lch
+
+    if fake_groq_settings is None:
+        stub_llm.install(lch, **stub_settings)
+    port = _free_port()
+    if app_kind == "async":
+        import uvicorn
+
+        import async_app
+
+        server = uvicorn.Server(uvicorn.Config(async_app.app, host="127.0.0.1", port=port, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+    else:
+        from werkzeug.serving import make_server
+
+        import app
+
+        lch.warm_up()
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        server = make_server("127.0.0.1", port, app.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}"
+
+
+class RequestFactory:
+    def __init__(self, size: str, pdf: bool, reuse_docs: bool):
+        self.resume = common.fixture_text(f"resume_{size}")
+        self.jd = common.fixture_text(f"jd_{size}")
+        self.jd_pdf = common.fixture_pdf(f"jd_{size}") if pdf else None
+        self.pdf = pdf
+        self.reuse_docs = reuse_docs
+
+    def build(self, route: str):
+        """(path, body bytes, content type) for one request."""
+        path, extra = ROUTES[route]
+        resume = self.resume if self.reuse_docs else f"{self.resume}\nReference: {uuid.uuid4().hex}\n"
+        if not self.pdf:
+            body = {"resumeText": resume, "jobDescription": self.jd, **extra}
+            return path, json.dumps(body).encode(), "application/json"
+
+        boundary = uuid.uuid4().hex
+        parts = []
+        for name, value in extra.items():
+            value = json.dumps(value) if isinstance(value, (list, dict)) else str(value)
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+        for field, filename, data in (("resume", "resume.pdf", make_fixtures.render_pdf(resume)),
+                                      ("jobDescriptionFile", "jd.pdf", self.jd_pdf)):
+            parts.append(
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+                f"Content-Type: application/pdf\r\n\r\n".encode() + data + b"\r\n"
+            )
+        parts.append(f"--{boundary}--\r\n".encode())
+        return path, b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def _server_timing(header: str) -> dict:
+    stages = {}
+    for part in (header or "").split(","):
+        fields = dict(
+            (item.split("=", 1) + [""])[:2] for item in (piece.strip() for piece in part.split(";")[1:])
+        )
+        name = part.split(";")[0].strip()
+        if name and name != "total" and "dur" in fields:
+            stages[name] = float(fields["dur"])
+    return stages
+
+
+def send(base_url: str, factory: RequestFactory, route: str, timeout: float) -> dict:
+    path, body, content_type = factory.build(route)
+    request = urllib.request.Request(base_url + path, data=body, headers={"Content-Type": content_type})
+    start = time.perf_counter()
+    first_byte = None
+    status, error, stages = 0, None, {}
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status = response.status
+            stages = _server_timing(response.headers.get("Server-Timing"))
+            content = b""
+            while True:
+                chunk = response.read1(65536)
+                if not chunk:
+                    break
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                content += chunk
+        if b"event: error" in content or (content.startswith(b"{") and b'"error"' in content[:200]):
+            error = "error payload"
+    except urllib.error.HTTPError as e:
+        status, error = e.code, f"HTTP {e.code}"
+    except (OSError, urllib.error.URLError) as e:
+        error = type(e).__name__
+    return {
+        "route": route,
+        "seconds": time.perf_counter() - start,
+        "first_byte": first_byte,
+        "status": status,
+        "error": error,
+        "stages": stages,
+    }
+
+
+def run_load(base_url: str, factory: RequestFactory, mix: dict, concurrency: int, total: int, duration: float,
+             timeout: float, seed: int) -> tuple:
+    names, weights = list(mix), list(mix.values())
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    issued = [0]
+    samples = []
+    deadline = time.perf_counter() + duration if duration else None
+
+    def next_route():
+        with lock:
+            if (deadline is None and issued[0] >= total) or (deadline and time.perf_counter() >= deadline):
+                return None
+            issued[0] += 1
+            return rng.choices(names, weights)[0]
+
+    def client():
+        while True:
+            route = next_route()
+            if route is None:
+                return
+            sample = send(base_url, factory, route, timeout)
+            with lock:
+                samples.append(sample)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(client) for _ in range(concurrency)]:
+            future.result()
+    return samples, time.perf_counter() - started
+
+
+def report(samples: list, elapsed: float) -> dict:
+    results = {}
+    print(f"\n{'route':<18} {'n':>5} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ttfb p50':>9}")
+    for route in sorted({sample["route"] for sample in samples}) + ["all"]:
+        chosen = [s for s in samples if route in ("all", s["route"])]
+        summary = common.summarize([s["seconds"] for s in chosen])
+        first_bytes = [s["first_byte"] for s in chosen if s["first_byte"] is not None]
+        summary["ttfb_p50_ms"] = round(common.percentile(first_bytes, 50) * 1000, 3)
+        summary["errors"] = sum(1 for s in chosen if s["error"])
+        stage_totals = {}
+        for sample in chosen:
+            for stage, ms in sample["stages"].items():
+                stage_totals[stage] = stage_totals.get(stage, 0.0) + ms
+        summary["stages_ms"] = {stage: round(ms / len(chosen), 1) for stage, ms in sorted(stage_totals.items())}
+        results[route] = summary
+        print(f"{route:<18} {summary['n']:>5} {summary['errors']:>6} {summary['p50_ms']:>9.1f} "
+              f"{summary['p95_ms']:>9.1f} {summary['p99_ms']:>9.1f} {summary['ttfb_p50_ms']:>9.1f}")
+
+    ok = sum(1 for s in samples if not s["error"])
+    results["all"]["throughput_rps"] = round(len(samples) / elapsed, 3)
+    results["all"]["goodput_rps"] = round(ok / elapsed, 3)
+    print(f"\n{len(samples)} requests in {elapsed:.1f}s: {results['all']['throughput_rps']:.2f} req/s, "
+          f"{results['all']['goodput_rps']:.2f} successful req/s")
+    print("\nMean server-side stage time per request (ms, from Server-Timing):")
+    for route, summary in results.items():
+        if summary["stages_ms"]:
+            print(f"  {route:<18} " + "  ".join(f"{stage}={ms}" for stage, ms in summary["stages_ms"].items()))
+    errors = sorted({(s["route"], s["error"]) for s in samples if s["error"]})
+    for route, error in errors[:10]:
+        print(f"  error: {route}: {error}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", choices=["sync", "async"], default="sync")
+    parser.add_argument("--url", help="drive a running service instead of an in-process one")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--duration", type=float, help="run for this many seconds instead of --requests")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed requests per route before the run")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="route=weight,... from: " + ", ".join(ROUTES))
+    parser.add_argument("--size", default="medium", choices=common.SIZES)
+    parser.add_argument("--pdf", action="store_true", help="upload the documents as PDFs")
+    parser.add_argument("--reuse-docs", action="store_true", help="send the same resume every time")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="stub seconds before the first token")
+    parser.add_argument("--llm-tps", type=float, default=250, help="stub completion tokens per second")
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--fake-groq", action="store_true",
+                        help="serve the LLM from bench/fake_groq.py over HTTP instead of the in-process stub")
+    parser.add_argument("--llm-rate-limit-rate", type=float, default=0.0, help="--fake-groq share of 429s")
+    parser.add_argument("--llm-slow-rate", type=float, default=0.0, help="--fake-groq share of slow calls")
+    parser.add_argument("--llm-slow-seconds", type=float, default=5.0)
+    parser.add_argument("--llm-rpm", type=int, default=0, help="--fake-groq requests per minute before 429s")
+    parser.add_argument("--save", metavar="NAME", help="save results as bench/baselines/NAME.json (or a path)")
+    parser.add_argument("--compare", metavar="NAME", help="compare against a saved baseline")
+    parser.add_argument("--metric", default="p95_ms", choices=["mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--verbose", action="store_true", help="keep the service's log lines")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    stub_settings = {"latency": args.llm_latency, "tokens_per_second": args.llm_tps, "jitter": args.llm_jitter,
+                     "error_rate": args.llm_error_rate, "seed": args.seed}
+    fake_groq_settings = {"rate_limit_rate": args.llm_rate_limit_rate, "slow_rate": args.llm_slow_rate,
+                          "slow_seconds": args.llm_slow_seconds, "rpm": args.llm_rpm} if args.fake_groq else None
+    settings = {
+        "target": args.url or f"in-process {args.app}" + (" via fake_groq" if args.fake_groq else ""),
+        "concurrency": args.concurrency,
+        "mix": mix,
+        "size": args.size,
+        "pdf": args.pdf,
+        "reuse_docs": args.reuse_docs,
+        **({} if args.url else {f"llm_{key}": value for key, value in stub_settings.items()}),
+        **({f"llm_{key}": value for key, value in fake_groq_settings.items()} if fake_groq_settings and not args.url
+           else {}),
+    }
+
+    # The in-process service logs every request; keep that out of the report
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+        base_url = args.url.rstrip("/") if args.url else start_server(args.app, stub_settings, fake_groq_settings)
+        factory = RequestFactory(args.size, args.pdf, args.reuse_docs)
+        for route in mix:
+            for _ in range(args.warmup):
+                send(base_url, factory, route, args.timeout)
+        samples, elapsed = run_load(base_url, factory, mix, args.concurrency, args.requests, args.duration,
+                                    args.timeout, args.seed)
+    results = report(samples, elapsed)
+
+    if args.save:
+        print(f"\nSaved {common.save_baseline(args.save, settings, results)}")
+    if args.compare:
+        regressions = common.compare_baseline(args.compare, settings, results, args.metric, args.tolerance)
+        with open(common.baseline_path(args.compare), encoding="utf-8") as f:
+            before = json.load(f)["results"]["all"]["throughput_rps"]
+        after = results["all"]["throughput_rps"]
+        print(f"throughput: {before:.2f} -> {after:.2f} req/s ({(after - before) / before:+.0%})")
+        if after < before * (1 - args.tolerance):
+            regressions.append("throughput")
+            print("  REGRESSION")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
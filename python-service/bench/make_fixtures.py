@@ -0,0 +1,84 @@
+"""
+Render the text fixtures to PDFs for the benchmarks.
+
+    python bench/make_fixtures.py
+
+Writes bench/fixtures/<name>.pdf for every fixture .txt, plus
+resume_long.pdf (resume_large repeated over enough pages to take
+pdf_ingest's parallel page path). The PDFs are plain Helvetica text, so
+pypdf extracts them the same way on every machine; no PDF library is
+needed to build them. The generated xlarge and max sizes (see
+common.GENERATED_CHARS) are rendered when a benchmark loads them.
+"""
+import glob
+import os
+import textwrap
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+LINE_WIDTH = 95
+LINES_PER_PAGE = 60
+# Smaller type for the generated sizes, so a MAX_DOC_CHARS document stays
+# under pdf_ingest.MAX_PDF_PAGES
+DENSE_LINES_PER_PAGE = 90
+LONG_RESUME_COPIES = 4
+
+
+def _escape(line: str) -> str:
+    line = line.encode("latin-1", "replace").decode("latin-1")
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _pages(text: str, lines_per_page: int = LINES_PER_PAGE) -> list:
+    lines = []
+    for paragraph in text.splitlines():
+        lines.extend(textwrap.wrap(paragraph, LINE_WIDTH, subsequent_indent="  ") or [""])
+    return [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+
+def render_pdf(text: str, lines_per_page: int = LINES_PER_PAGE) -> bytes:
+    """A minimal PDF 1.4 file with one text stream per page."""
+    pages = _pages(text, lines_per_page)
+    leading = 720 / lines_per_page
+    font_id = 3 + 2 * len(pages)
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{3 + 2 * i} 0 R" for i in range(len(pages))), len(pages)),
+    ]
+    for i, lines in enumerate(pages):
+        body = f"BT /F1 {leading - 2:g} Tf 50 760 Td {leading:g} TL " + " ".join(f"({_escape(line)}) '" for line in lines) + " ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(body.encode('latin-1'))} >>\nstream\n{body}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out, offsets = b"%PDF-1.4\n", []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return out
+
+
+def main():
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        target = path[:-4] + ".pdf"
+        with open(target, "wb") as f:
+            f.write(render_pdf(text))
+        print(f"{os.path.basename(target)}: {len(_pages(text))} page(s)")
+        if os.path.basename(path) == "resume_large.txt":
+            long_text = "\n\n".join([text] * LONG_RESUME_COPIES)
+            with open(os.path.join(FIXTURES_DIR, "resume_long.pdf"), "wb") as f:
+                f.write(render_pdf(long_text))
+            print(f"resume_long.pdf: {len(_pages(long_text))} page(s)")
+
+
+if __name__ == "__main__":
+    main()
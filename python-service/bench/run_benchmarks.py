@@ -0,0 +1,216 @@
+"""
+Microbenchmarks for each langchain_helper stage, offline.
+
+    python bench/run_benchmarks.py [--rounds 20] [--only embed ingest] [--save micro]
+    python bench/run_benchmarks.py --compare micro [--tolerance 0.25]
+
+The local stages (pdf_parse, split, embed, index, ingest, extract_profile,
+pack_context, ats_score, parse_output, the concurrent document pair) run
+on each fixture size with the real embedding model: small, medium and
+large fit the passthrough store, while xlarge and max are generated from
+the large fixtures to reach the numpy and FAISS stores, and the run stops
+if a fixture lands in a different store than EXPECTED_STORE says. The LLM
+helpers run end to end against bench/stub_llm.py, so their numbers are the
+service's own overhead plus the stub's fixed, configurable latency.
+
+--save writes bench/baselines/<name>.json; --compare prints p50 (or
+--metric) against a saved baseline and exits 1 if anything regressed by
+more than --tolerance. Baselines are only comparable on the same machine
+with the same settings.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+import common
+import stub_llm
+
+import doc_pipeline
+import langchain_helper as lch
+import pdf_ingest
+import retrieval
+import schemas
+from doc_cache import CachedDocument
+
+FEEDBACK_BATCH_SIZE = 6
+
+# The retrieval store each fixture size must be indexed into
+EXPECTED_STORE = {"small": "passthrough", "medium": "passthrough", "large": "passthrough",
+                  "xlarge": "numpy", "max": "faiss"}
+
+
+def _question_options(num_questions: int) -> dict:
+    return dict(
+        num_questions=num_questions,
+        skill_focus="As per JD",
+        question_type="Technical, Behavioral",
+        question_difficulty="Medium",
+        experience_level="1-2 years",
+        round_type="Technical",
+        target_job_role="Software Engineer",
+    )
+
+
+def _index(text: str, chunks: list, metadatas: list, vectors):
+    kind = retrieval.choose_store_kind(text, len(chunks), lch.EXTRACT_TOP_K)
+    db = retrieval.build_store(kind, chunks, metadatas, vectors if kind != "passthrough" else None, lch.embeddings)
+    entry = CachedDocument("bench", text, chunks, metadatas, vectors if kind != "passthrough" else None, db)
+    lch._rank_profiles(entry)
+    return entry
+
+
+def _cold(fn, *args):
+    def run():
+        lch.doc_cache.clear()
+        return fn(*args)
+    return run
+
+
+def stage_benchmarks(sizes: list) -> list:
+    """(name, callable) for the local, CPU-bound stages."""
+    benchmarks = []
+    for size in sizes:
+        resume, jd = common.fixture_text(f"resume_{size}"), common.fixture_text(f"jd_{size}")
+        resume_pdf = common.fixture_pdf(f"resume_{size}")
+        documents = lch.text_splitter.create_documents([resume])
+        chunks = [doc.page_content for doc in documents]
+        metadatas = [{**doc.metadata, "chunk": i} for i, doc in enumerate(documents)]
+        vectors = np.asarray(lch.embeddings.embed_documents(chunks), dtype=np.float32)
+        resume_entry, jd_entry = lch.ingest_text(resume), lch.ingest_text(jd)
+        for name, entry in ((f"resume_{size}", resume_entry), (f"jd_{size}", jd_entry)):
+            kind = retrieval.store_kind(entry.db)
+            if kind != EXPECTED_STORE[size]:
+                raise SystemExit(f"{name} ({len(entry.text)} chars, {len(entry.chunks)} chunks) uses the {kind} "
+                                 f"store, expected {EXPECTED_STORE[size]}; check the retrieval thresholds")
+        resume_info = lch.extract_profile(resume_entry, "resume_analysis.resume")
+        jd_info = lch.extract_profile(jd_entry, "resume_analysis.jd")
+        profiles = ("resume_analysis.resume", "resume_analysis.jd")
+
+        benchmarks += [
+            (f"pdf_parse[{size}]", lambda data=resume_pdf: pdf_ingest.extract_pages(data)),
+            (f"split[{size}]", lambda text=resume: lch.text_splitter.create_documents([text])),
+            (f"embed[{size}]", lambda chunks=chunks: lch.embeddings.embed_documents(chunks)),
+            (f"index[{size}]", lambda args=(resume, chunks, metadatas, vectors): _index(*args)),
+            (f"ingest_text_cold[{size}]", _cold(lch.ingest_text, resume)),
+            (f"ingest_text_warm[{size}]", lambda text=resume: lch.ingest_text(text)),
+            (f"ingest_pdf_cold[{size}]", _cold(lch.ingest_pdf, resume_pdf)),
+            (f"documents_cold[{size}]", _cold(doc_pipeline.process_documents, ("text", resume), ("text", jd), *profiles)),
+            (f"extract_profile[{size}]", lambda entry=resume_entry: lch.extract_profile(entry, profiles[0])),
+            (f"pack_context[{size}]", lambda pair=(resume_info, jd_info): lch._pack_context("resume_analysis", *pair)),
+            (f"ats_score[{size}]", lambda pair=(resume, jd): lch.ats_scorer.score(*pair)),
+        ]
+
+    long_pdf = common.fixture_pdf("resume_long")
+    benchmarks.append(("pdf_parse[long]", lambda: pdf_ingest.extract_pages(long_pdf)))
+
+    analysis = stub_llm.canned_response(lch.RESUME_ANALYSIS_PROMPT.template)
+    inputs = {"resume_content": "", "jd_content": ""}
+
+    def parse(text: str):
+        # Local repair only, so the stage never waits on the stub
+        mode, schemas.JSON_REPAIR_MODE = schemas.JSON_REPAIR_MODE, "local"
+        try:
+            return lch._parse_llm_output(text, "resume_analysis", lch.RESUME_ANALYSIS_PROMPT, inputs)
+        finally:
+            schemas.JSON_REPAIR_MODE = mode
+
+    benchmarks += [
+        ("parse_output[clean]", lambda: parse(analysis)),
+        ("parse_output[truncated]", lambda: parse(analysis[:int(len(analysis) * 0.8)])),
+    ]
+    return benchmarks
+
+
+def llm_benchmarks() -> list:
+    """(name, callable) for the LLM helpers, end to end against the stub."""
+    resume, jd = common.fixture_text("resume_medium"), common.fixture_text("jd_medium")
+    question = "Tell me about a system you designed and the trade-offs you made."
+    answer = ("I built an event pipeline on Kafka. We chose at-least-once delivery with idempotent consumers "
+              "because exactly-once was too expensive for our volume, and it cut duplicate orders to zero.")
+    items = [{"question": f"{question} ({i + 1})", "answer": answer} for i in range(FEEDBACK_BATCH_SIZE)]
+    return [
+        ("resume_analysis[single]", lambda: lch.resume_analysis(resume, jd, mode="single")),
+        ("resume_analysis[fanout]", lambda: lch.resume_analysis(resume, jd, mode="fanout")),
+        ("aresume_analysis[fanout]", lambda: asyncio.run(lch.aresume_analysis(resume, jd, mode="fanout"))),
+        ("interview_questions[5]",
+         lambda: lch.generate_interview_questions(resume_content=resume, jd_content=jd, **_question_options(5))),
+        ("interview_questions[20]",
+         lambda: lch.generate_interview_questions(resume_content=resume, jd_content=jd, **_question_options(20))),
+        ("answer_feedback", lambda: lch.answer_feedback(resume, jd, question, answer)),
+        (f"answer_feedback_batch[{FEEDBACK_BATCH_SIZE}]", lambda: lch.answer_feedback_batch(resume, jd, items)),
+        ("ideal_answer", lambda: lch.generate_ideal_answer(resume, jd, question)),
+        ("ideal_answer_stream", lambda: list(lch.stream_ideal_answer(resume, jd, question))),
+    ]
+
+
+def measure(fn, rounds: int, warmup: int, quiet: bool) -> dict:
+    # The service logs a line or two per call; keep them out of the report
+    output = io.StringIO() if quiet else sys.stdout
+    samples = []
+    with contextlib.redirect_stdout(output):
+        for _ in range(warmup):
+            fn()
+        for _ in range(rounds):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+    return common.summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20, help="timed runs per local stage")
+    parser.add_argument("--llm-rounds", type=int, default=5, help="timed runs per LLM helper")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--sizes", nargs="+", default=list(common.SIZES), choices=common.SIZES)
+    parser.add_argument("--only", nargs="+", help="run benchmarks whose name contains any of these")
+    parser.add_argument("--skip-llm", action="store_true", help="local stages only")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="stub seconds before the first token")
+    parser.add_argument("--llm-tps", type=float, default=2000, help="stub completion tokens per second")
+    parser.add_argument("--save", metavar="NAME", help="save results as bench/baselines/NAME.json (or a path)")
+    parser.add_argument("--compare", metavar="NAME", help="compare against a saved baseline")
+    parser.add_argument("--metric", default="p50_ms", choices=["mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--verbose", action="store_true", help="keep the service's log lines")
+    args = parser.parse_args()
+
+    stub_llm.install(lch, latency=args.llm_latency, tokens_per_second=args.llm_tps, jitter=0, seed=0)
+    lch.warm_up()
+    settings = {
+        "llm_latency": args.llm_latency,
+        "llm_tokens_per_second": args.llm_tps,
+        "embedding_backend": lch.EMBEDDING_BACKEND,
+        "embed_batching": os.getenv("EMBED_BATCHING", "1"),
+        "resume_analysis_mode": lch.RESUME_ANALYSIS_MODE,
+    }
+
+    with contextlib.redirect_stdout(io.StringIO() if not args.verbose else sys.stdout):
+        benchmarks = [(name, fn, args.rounds) for name, fn in stage_benchmarks(args.sizes)]
+    if not args.skip_llm:
+        benchmarks += [(name, fn, args.llm_rounds) for name, fn in llm_benchmarks()]
+    if args.only:
+        benchmarks = [entry for entry in benchmarks if any(part in entry[0] for part in args.only)]
+
+    results = {}
+    print(f"{'benchmark':<36} {'n':>4} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for name, fn, rounds in benchmarks:
+        result = measure(fn, rounds, args.warmup, quiet=not args.verbose)
+        results[name] = result
+        print(f"{name:<36} {result['n']:>4} {result['mean_ms']:>10.2f} {result['p50_ms']:>10.2f} "
+              f"{result['p95_ms']:>10.2f} {result['p99_ms']:>10.2f}")
+
+    if args.save:
+        print(f"\nSaved {common.save_baseline(args.save, settings, results)}")
+    if args.compare:
+        regressions = common.compare_baseline(args.compare, settings, results, args.metric, args.tolerance)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+A local stand-in for ChatGroq so the benchmarks run with no network.
+
+StubChatModel answers every PrepMate prompt with canned JSON of the right
+shape (full or per-branch resume analysis, N interview questions, answer
+feedback, ideal answers, JSON repair) after a simulated latency:
+
+    latency + completion_tokens / tokens_per_second   (x jitter)
+
+Streams wait `latency` before the first chunk and then pace the rest at
+tokens_per_second. error_rate fails a share of calls (as connection
+errors, which llm_client retries) and malformed_rate cuts a share of
+completions short, to exercise the error and JSON repair paths. A
+per-call `timeout` (bound by the request deadline) is honoured like
+Groq's client does. usage_metadata is filled in like Groq's, so
+token metrics work.
+
+    import stub_llm
+    stub_llm.install(lch, latency=0.5, tokens_per_second=250)
+"""
+import asyncio
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+import context_packer
+import schemas
+
+STREAM_CHUNK_CHARS = 16
+
+ANALYSIS = {
+    "resume_summary": "Backend engineer with strong Python and distributed systems experience, "
+                      "recent work on data pipelines and service reliability.",
+    "jd_summary": "Engineering role building and operating scalable backend and data platform services.",
+    "ats_score": {
+        "total_score": 78,
+        "format_penalty": 4,
+        "final_assessment": "Strong technical match; quantify impact more consistently and surface cloud skills.",
+    },
+    "sections": {
+        "basic_info": {"name": "Candidate", "email": "candidate@example.com", "phone": "+91 90000 00000"},
+        "education": [
+            {"degree": "B.Tech Computer Science", "institute": "Example Institute of Technology",
+             "cgpa": "8.6", "years": "2016 - 2020"},
+        ],
+        "work_experience": [
+            {"title": "Software Engineer", "company": "Example Corp", "duration": "2021 - Present",
+             "tech_stack": ["Python", "Kafka", "PostgreSQL", "Kubernetes"]},
+            {"title": "Software Engineer Intern", "company": "Sample Labs", "duration": "2020",
+             "tech_stack": ["Java", "Spring Boot"]},
+        ],
+        "projects": [
+            {"name": "Order Pipeline", "description": "Event-driven order processing service",
+             "tech_stack": ["Python", "Kafka", "Redis"], "impact": "Cut end-to-end latency by 40%"},
+        ],
+        "skills": ["Python", "Go", "SQL", "Kafka", "PostgreSQL", "Redis", "Docker", "Kubernetes", "AWS"],
+        "certifications": ["AWS Certified Developer - Associate"],
+    },
+    "strengths": {
+        "technical": ["Hands-on distributed systems work", "Production experience with Kafka and PostgreSQL"],
+        "resume_quality": ["Clear structure", "Most bullets describe outcomes"],
+        "alignment_with_jd": ["Backend stack matches the role", "Has operated services on Kubernetes"],
+    },
+    "weaknesses": {
+        "missing_skills": ["Terraform", "Flink"],
+        "weak_phrasing": {"verbs": ["worked on", "helped"], "examples": ["Worked on the payments service"]},
+        "format_issues": {"layout": ["Skills section is long"], "technical": ["Dates use mixed formats"]},
+        "content_gaps": ["No mention of on-call or incident handling"],
+    },
+    "suggestions": {
+        "formatting": {"high_priority": ["Use one date format"], "low_priority": ["Group skills by category"]},
+        "keyword_optimization": {"missing_keywords": ["Terraform", "SLOs"], "overused_words": ["responsible"]},
+        "content_improvements": ["Quantify the impact of each role", "Add a line on system design ownership"],
+        "rewrite_examples": [
+            {"current": "Worked on the payments service",
+             "suggested": "Owned the payments service, cutting failed transactions by 30%"},
+        ],
+    },
+    "red_flags": ["Short gap between internship and first role"],
+    "suggested_resume_title": "Backend Software Engineer - Distributed Systems",
+}
+
+QUESTIONS = [
+    "Walk me through the architecture of the most complex system you have built end to end.",
+    "How would you design a rate limiter that works across several application servers?",
+    "Explain how you would find and fix a memory leak in a long-running Python service.",
+    "Tell me about a time you disagreed with a technical decision. What did you do?",
+    "What happens, step by step, when a Kafka consumer in a group crashes mid-batch?",
+    "How do you decide between a relational database and a document store for a new feature?",
+    "Describe an incident you were on call for and what changed afterwards.",
+    "Given an array of integers, return the length of the longest strictly increasing subsequence.",
+    "How does PostgreSQL use indexes, and when would it ignore one you expected it to use?",
+    "How would you roll out a breaking API change to clients you do not control?",
+    "Describe a project where you had to learn an unfamiliar technology quickly.",
+    "Design a URL shortener that handles a hundred million redirects a day.",
+    "What trade-offs does eventual consistency introduce, and how do you hide them from users?",
+    "How would you make a flaky integration test suite reliable again?",
+    "Tell me about a time you had to deliver under a tight deadline with incomplete requirements.",
+    "Explain the difference between processes, threads and coroutines, with a use case for each.",
+    "How would you detect and handle duplicate messages in an at-least-once pipeline?",
+    "Merge k sorted linked lists and analyse the time complexity of your approach.",
+    "What metrics and alerts would you set up for a new customer-facing service?",
+    "How have you mentored a less experienced engineer, and what did you learn from it?",
+    "How would you cache an expensive read path without serving stale data for too long?",
+    "Describe how you would migrate a live table to a new schema with no downtime.",
+    "What is your approach to code review, both as an author and as a reviewer?",
+    "Design the backend for a collaborative document editor with real-time updates.",
+    "How do container resource limits interact with a JVM or Python process inside Kubernetes?",
+    "Tell me about a decision you made with incomplete data that turned out to be wrong.",
+    "Find the k most frequent words in a stream that is too large to fit in memory.",
+    "How would you profile a slow HTTP endpoint and decide what to optimise first?",
+    "Explain how TLS establishes a secure connection and where it can fail in production.",
+    "How do you balance new feature work against paying down technical debt?",
+    "Design a notification service that fans out to email, SMS and push with retries.",
+    "What would you check first if p99 latency doubled after a deploy but p50 did not move?",
+    "How would you partition a multi-tenant database as the largest tenants keep growing?",
+    "Describe a time you improved a process for your whole team, not just your own work.",
+    "Implement an LRU cache with O(1) get and put operations.",
+    "How would you evaluate whether a machine learning model is ready for production traffic?",
+    "Explain idempotency keys and how you would implement them for a payments API.",
+    "What would make you push back on a product requirement, and how would you do it?",
+    "How do you keep a service correct when the clock on different machines disagrees?",
+    "Design a job scheduler that runs millions of delayed tasks with at-least-once execution.",
+]
+
+_question_cursor = itertools.count()
+_question_lock = threading.Lock()
+
+
+def _questions(prompt: str) -> list:
+    count = int((re.search(r"generate (\d+) highly", prompt) or [0, 5])[1])
+    question_type = (re.search(r"Question Type: (.+?) \(", prompt) or [0, "Technical"])[1]
+    difficulty = (re.search(r"Question Difficulty: (.+?) \(", prompt) or [0, "Medium"])[1]
+    with _question_lock:
+        start = next(_question_cursor) * count
+    return [
+        {
+            "question_type": question_type,
+            "question_difficulty": difficulty,
+            "question_num": i + 1,
+            "question": QUESTIONS[(start + i) % len(QUESTIONS)],
+        }
+        for i in range(count)
+    ]
+
+
+def _feedback(prompt: str) -> dict:
+    answer = prompt.split("Candidate's Answer:", 1)[1].split("Your output MUST", 1)[0]
+    return {
+        "strengths": ["Clear structure", "Mentions concrete trade-offs"],
+        "areas_to_improve": ["Quantify the impact", "Cover failure handling"],
+        "score_out_of_10": 4 + len(answer.split()) % 6,
+        "improvement_suggestions": ["Open with the outcome, then the approach", "Give one metric"],
+        "follow_up_questions": ["How would this change at ten times the load?"],
+        "overall_feedback": "A solid answer that would be stronger with measurable results.",
+    }
+
+
+IDEAL_ANSWER = {
+    "ideal_answer": "• Start with the context: the system, its scale and the constraint that mattered\n\n"
+                    "• Explain the approach and the alternatives you rejected, with the trade-offs\n\n"
+                    "• Close with the measurable result and what you would do differently",
+    "explanation": "• Leads with context so the interviewer can follow the rest\n\n"
+                   "• Shows judgement by naming trade-offs, not just the final choice\n\n"
+                   "• Ends on impact, which is what the role is evaluated on",
+}
+
+
+def canned_response(prompt: str) -> str:
+    """The JSON completion the stub returns for a formatted prompt."""
+    if "is malformed or cut off" in prompt:
+        # Close the fragment the way a model would
+        fragment = prompt.split("where it stops.", 1)[1].rsplit("Guidelines:", 1)[0].strip().rstrip(",")
+        return schemas._balance(fragment if "an array element" in prompt else "{" + fragment)
+    if "mock interview questions" in prompt:
+        return json.dumps(_questions(prompt), indent=2)
+    if "Candidate's Answer:" in prompt:
+        return json.dumps(_feedback(prompt), indent=2)
+    if "generate an ideal answer" in prompt:
+        return json.dumps(IDEAL_ANSWER, indent=2)
+    if "resume analyst" in prompt:
+        # Only the keys this prompt's schema asks for (fan-out branches ask for a subset)
+        keys = [key for key in ANALYSIS if f'"{key}":' in prompt]
+        return json.dumps({key: ANALYSIS[key] for key in keys}, indent=2)
+    return "{}"
+
+
+class StubChatModel(BaseChatModel):
+    model_name: str = "stub-llm"
+    temperature: float = 0.85
+    latency: float = 0.5
+    tokens_per_second: float = 250.0
+    jitter: float = 0.1
+    error_rate: float = 0.0
+    malformed_rate: float = 0.0
+    seed: Optional[int] = None
+    rng: Any = None
+
+    def model_post_init(self, __context):
+        self.rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "prepmate-stub"
+
+    def _prepare(self, messages: List[BaseMessage]):
+        # (completion, usage, first-token delay, per-chunk delay)
+        prompt = "\n".join(str(message.content) for message in messages)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise ConnectionError("Stub LLM error (simulated)")
+        text = canned_response(prompt)
+        if self.malformed_rate and self.rng.random() < self.malformed_rate:
+            text = text[:int(len(text) * 0.8)]
+        completion = context_packer.count_tokens(text)
+        usage = {"input_tokens": context_packer.count_tokens(prompt), "output_tokens": completion,
+                 "total_tokens": 0}
+        usage["total_tokens"] = usage["input_tokens"] + completion
+        scale = 1 + self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 1
+        per_char = scale / (self.tokens_per_second * len(text) / max(completion, 1)) if text else 0
+        return text, usage, self.latency * scale, per_char
+
+    def _wait(self, seconds: float, started: float, timeout):
+        # How long to sleep before the next step, raising like an HTTP client once past `timeout`
+        if timeout is not None and time.perf_counter() - started + seconds > timeout:
+            return max(timeout - (time.perf_counter() - started), 0), TimeoutError("Stub LLM request timed out")
+        return seconds, None
+
+    def _chunks(self, text: str) -> list:
+        return [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or [""]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        started = time.perf_counter()
+        text, usage, first, per_char = self._prepare(messages)
+        delay, error = self._wait(first + per_char * len(text), started, kwargs.get("timeout"))
+        time.sleep(delay)
+        if error:
+            raise error
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        started = time.perf_counter()
+        text, usage, first, per_char = self._prepare(messages)
+        delay, error = self._wait(first + per_char * len(text), started, kwargs.get("timeout"))
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        started = time.perf_counter()
+        text, usage, first, per_char = self._prepare(messages)
+        chunks = self._chunks(text)
+        for i, piece in enumerate(chunks):
+            delay, error = self._wait((first if i == 0 else 0) + per_char * len(piece), started, kwargs.get("timeout"))
+            time.sleep(delay)
+            if error:
+                raise error
+            last = i == len(chunks) - 1
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece, usage_metadata=usage if last else None))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        started = time.perf_counter()
+        text, usage, first, per_char = self._prepare(messages)
+        chunks = self._chunks(text)
+        for i, piece in enumerate(chunks):
+            delay, error = self._wait((first if i == 0 else 0) + per_char * len(piece), started, kwargs.get("timeout"))
+            await asyncio.sleep(delay)
+            if error:
+                raise error
+            last = i == len(chunks) - 1
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece, usage_metadata=usage if last else None))
+
+
+def install(lch, **settings) -> StubChatModel:
+    """
+    Swap langchain_helper's ChatGroq for a StubChatModel with these
+    settings, behind the same llm_client retries and breaker. A configured
+    fallback model is replaced by a stub too.
+    """
+    stub = StubChatModel(**settings)
+    lch.llm.primary = stub
+    if lch.llm.fallback is not None:
+        lch.llm.fallback = StubChatModel(**{**settings, "model_name": "prepmate-stub-fallback", "error_rate": 0})
+    return stub
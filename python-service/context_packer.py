@@ -0,0 +1,155 @@
+"""
+Token-aware packing of retrieved chunks into prompts.
+
+Retrieval returns chunks best-first and, because the splitter overlaps
+neighbouring chunks by CHUNK_OVERLAP characters, adjacent chunks repeat
+text. The packer keeps the best chunks that fit a per-prompt token budget,
+puts them back in document order, strips the overlap shared with the
+preceding chunk, and reports how many tokens that saved.
+
+Tokens are counted with CONTEXT_TOKENIZER (a tokenizer.json path or a
+Hugging Face repo id for the LLM's tokenizer) when available, otherwise
+estimated at ~4 characters per token.
+"""
+import os
+import threading
+
+MIN_OVERLAP_CHARS = 20
+
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+class RetrievedText(str):
+    """
+    The joined retrieval result (so it still works anywhere a str does),
+    carrying the chunks it was built from as (order, text) pairs, best first,
+    and the full text of the document they came from when it is known.
+    """
+
+    def __new__(cls, chunks: list, document: str = None):
+        obj = super().__new__(cls, " ".join(text for _, text in chunks))
+        obj.chunks = chunks
+        obj.document = document
+        return obj
+
+
+def _get_tokenizer():
+    global _tokenizer, _tokenizer_loaded
+    with _tokenizer_lock:
+        if not _tokenizer_loaded:
+            _tokenizer_loaded = True
+            name = os.getenv("CONTEXT_TOKENIZER")
+            if name:
+                try:
+                    from tokenizers import Tokenizer
+
+                    if os.path.exists(name):
+                        _tokenizer = Tokenizer.from_file(name)
+                    else:
+                        _tokenizer = Tokenizer.from_pretrained(name)
+                except Exception as e:
+                    print(f"[Context] Could not load tokenizer {name}, estimating instead: {e}")
+        return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    tokenizer = _get_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    return (len(text) + 3) // 4
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    tokenizer = _get_tokenizer()
+    if tokenizer is not None:
+        encoding = tokenizer.encode(text, add_special_tokens=False)
+        if len(encoding.ids) <= max_tokens:
+            return text
+        return text[:encoding.offsets[max_tokens - 1][1]] if max_tokens > 0 else ""
+    return text[:max_tokens * 4]
+
+
+def _strip_overlap(previous: str, current: str) -> str:
+    """Drop the prefix of current that repeats the end of previous."""
+    for size in range(min(len(previous), len(current)), MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(current[:size]):
+            return current[size:].lstrip()
+    return current
+
+
+def _as_chunks(content) -> list:
+    if isinstance(content, RetrievedText):
+        return content.chunks
+    return [(0, str(content))]
+
+
+def _dedupe(chunks: list) -> list:
+    """Document order, with overlap between consecutive chunks removed."""
+    ordered = sorted(chunks, key=lambda chunk: chunk[0])
+    result = []
+    for i, (order, text) in enumerate(ordered):
+        if i > 0 and isinstance(order, int) and ordered[i - 1][0] == order - 1:
+            text = _strip_overlap(ordered[i - 1][1], text)
+        if text:
+            result.append((order, text))
+    return result
+
+
+def _pack(content, budget: int = None) -> str:
+    # Keep the best-ranked chunks that fit, then restore document order.
+    # Chunks are costed before overlap removal, so this errs on the safe side.
+    kept, used = [], 0
+    for order, text in _as_chunks(content):
+        tokens = count_tokens(text)
+        if budget is not None and used + tokens > budget:
+            remaining = budget - used
+            if remaining > 0 and not kept:
+                kept.append((order, _truncate(text, remaining)))
+            break
+        kept.append((order, text))
+        used += tokens
+    return " ".join(text for _, text in _dedupe(kept))
+
+
+def _needed(content) -> int:
+    return count_tokens(" ".join(text for _, text in _dedupe(_as_chunks(content))))
+
+
+def pack_pair(name: str, resume_content, jd_content, budget: int):
+    """
+    Pack resume and JD context into `budget` tokens for the prompt `name`.
+    If both don't fit, each side gets at least half the budget and whatever
+    the other side leaves unused.
+    """
+    resume_needed, jd_needed = _needed(resume_content), _needed(jd_content)
+    if resume_needed + jd_needed <= budget:
+        resume_budget = jd_budget = None
+    else:
+        jd_budget = min(jd_needed, max(budget // 2, budget - resume_needed))
+        resume_budget = budget - jd_budget
+
+    packed_resume = _pack(resume_content, resume_budget)
+    packed_jd = _pack(jd_content, jd_budget)
+
+    before = count_tokens(str(resume_content)) + count_tokens(str(jd_content))
+    after = count_tokens(packed_resume) + count_tokens(packed_jd)
+    with _stats_lock:
+        stats = _stats.setdefault(name, {"calls": 0, "tokens_before": 0, "tokens_after": 0})
+        stats["calls"] += 1
+        stats["tokens_before"] += before
+        stats["tokens_after"] += after
+    print(f"[Context] {name}: {before} -> {after} tokens (saved {before - after}, budget {budget})")
+    return packed_resume, packed_jd
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return {
+            name: {**values, "tokens_saved": values["tokens_before"] - values["tokens_after"]}
+            for name, values in _stats.items()
+        }
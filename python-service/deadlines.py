@@ -0,0 +1,147 @@
+"""
+Request deadlines and cancellation of abandoned work.
+
+The caller sends the time it is willing to wait in X-Deadline-Ms (the
+Node backend sends its axios timeout; relative, so the two hosts' clocks
+need not agree). The service stops REQUEST_DEADLINE_MARGIN_MS earlier, so
+its own 504 can still reach the caller. Requests without the header get
+REQUEST_DEADLINE_SECONDS (0 = no deadline).
+
+The deadline travels in a contextvar, like metrics.current(), and thread
+pool work sees it when submitted through metrics.bind(). Code calls
+check(stage) between stages; it raises DeadlineExceeded once the deadline
+has passed or the client is known to have gone away. LLM calls get the
+remaining time as their timeout (llm_timeout()).
+
+The async app cancels a request's task outright when the client
+disconnects or the deadline passes. The sync app cannot interrupt a
+thread, so it stops at the next check; a disconnect is noticed there by
+peeking at the client socket.
+
+Every request abandoned this way is counted once, by reason and by the
+stage it was stopped in (prepmate_abandoned_requests, /stats).
+"""
+import contextvars
+import os
+import selectors
+import socket
+import threading
+import time
+
+from prometheus_client import Counter
+
+DEADLINE_HEADER = "X-Deadline-Ms"
+DEFAULT_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "0"))
+DEADLINE_MARGIN_SECONDS = float(os.getenv("REQUEST_DEADLINE_MARGIN_MS", "500")) / 1000
+
+ABANDONED = Counter(
+    "prepmate_abandoned_requests", "Requests stopped early because the caller gave up", ["reason", "stage"]
+)
+
+_current = contextvars.ContextVar("prepmate_request_deadline", default=None)
+_stats_lock = threading.Lock()
+_stats = {"requests_with_deadline": 0, "deadline": 0, "disconnected": 0, "stages": {}}
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed or its client disconnected; nobody will read the response."""
+
+    def __init__(self, reason: str, stage: str):
+        message = "Request deadline exceeded" if reason == "deadline" else "Client disconnected"
+        super().__init__(f"{message} (during {stage})")
+        self.reason = reason
+        self.stage = stage
+        # 499 is nginx's "client closed request"; only logs ever see it
+        self.status = 504 if reason == "deadline" else 499
+
+
+def _peer_closed(sock) -> bool:
+    # Readable with nothing to read means the client sent FIN. A selector,
+    # unlike select.select, works for fds above FD_SETSIZE; a failed probe
+    # proves nothing, so the request carries on.
+    try:
+        with selectors.DefaultSelector() as selector:
+            selector.register(sock, selectors.EVENT_READ)
+            if not selector.select(0):
+                return False
+        return sock.recv(1, socket.MSG_PEEK) == b""
+    except Exception:
+        return False
+
+
+class Deadline:
+    def __init__(self, seconds: float = None, client_socket=None):
+        self.expires = time.monotonic() + seconds if seconds else None
+        self.client_socket = client_socket
+        # The last stage boundary passed, for work cancelled between checks
+        self.last_stage = "request"
+        self.reason = None
+        self.stage = None
+
+    def remaining(self):
+        """Seconds left, or None without a deadline."""
+        if self.expires is None:
+            return None
+        return max(self.expires - time.monotonic(), 0.0)
+
+    def cancel(self, reason: str, stage: str = None):
+        """Mark the request abandoned; counted once, whoever notices first."""
+        stage = stage or self.last_stage
+        with _stats_lock:
+            if self.reason is not None:
+                return
+            self.reason, self.stage = reason, stage
+            _stats[reason] += 1
+            _stats["stages"][stage] = _stats["stages"].get(stage, 0) + 1
+        ABANDONED.labels(reason, stage).inc()
+        print(f"[Deadline] Abandoned request: {reason} during {stage}")
+
+    def check(self, stage: str):
+        self.last_stage = stage
+        if self.reason is None:
+            if self.expires is not None and time.monotonic() >= self.expires:
+                self.cancel("deadline", stage)
+            elif self.client_socket is not None and _peer_closed(self.client_socket):
+                self.cancel("disconnected", stage)
+        if self.reason is not None:
+            raise DeadlineExceeded(self.reason, self.stage)
+
+
+def timeout_from_header(value) -> float:
+    """The request's time budget in seconds, or None for no deadline."""
+    try:
+        seconds = float(value) / 1000 - DEADLINE_MARGIN_SECONDS
+    except (TypeError, ValueError):
+        return DEFAULT_DEADLINE_SECONDS or None
+    return max(seconds, 0.001)
+
+
+def start(header_value, client_socket=None) -> Deadline:
+    deadline = Deadline(timeout_from_header(header_value), client_socket)
+    if deadline.expires is not None:
+        with _stats_lock:
+            _stats["requests_with_deadline"] += 1
+    _current.set(deadline)
+    return deadline
+
+
+def current() -> Deadline:
+    return _current.get()
+
+
+def check(stage: str):
+    """Raise DeadlineExceeded if the current request has been abandoned."""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def llm_timeout():
+    """Seconds an LLM call may take in the current request, or None for the client default."""
+    deadline = _current.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return {**_stats, "stages": dict(_stats["stages"])}
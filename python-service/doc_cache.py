@@ -0,0 +1,184 @@
+"""
+Content-addressed cache for ingested documents.
+
+Entries are keyed by a hash of the raw PDF bytes or text (plus the chunking
+and embedding settings) and hold everything derived from the document: the
+extracted text, the chunks, the embedding matrix and the vector store (see
+retrieval.py; large documents get a FAISS index). The in-memory tier is an
+LRU bounded by an approximate byte budget; an optional on-disk tier keeps
+evicted entries around, writing FAISS indexes with FAISS.save_local.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+import retrieval
+
+
+class CachedDocument:
+    """Everything derived from one ingested document."""
+
+    def __init__(self, key: str, text: str, chunks: list, metadatas: list, vectors, db):
+        self.key = key
+        self.text = text
+        self.chunks = chunks
+        self.metadatas = metadatas
+        self.vectors = vectors
+        self.db = db
+        # Top-k chunk indices per extraction profile (see extraction_profiles)
+        self.profile_hits = None
+        self.profile_version = None
+
+    def nbytes(self) -> int:
+        # Text and chunks as UTF-8, the embedding matrix, and the store's
+        # own copy of the vectors (normalized matrix or flat FAISS index).
+        size = len(self.text.encode("utf-8"))
+        size += sum(len(chunk.encode("utf-8")) for chunk in self.chunks)
+        if self.vectors is not None:
+            size += 2 * self.vectors.nbytes
+        return size
+
+
+class DocumentCache:
+    def __init__(self, max_bytes: int, disk_dir: str = None, embeddings=None, fingerprint: str = ""):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.embeddings = embeddings
+        self.fingerprint = fingerprint
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "disk_writes": 0,
+        }
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def key_for(self, data, kind: str) -> str:
+        """Hash PDF bytes or document text together with the ingestion settings."""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = hashlib.sha256()
+        digest.update(f"{kind}|{self.fingerprint}|".encode("utf-8"))
+        digest.update(data)
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry
+
+        entry = self._load_from_disk(key)
+        with self._lock:
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["disk_hits"] += 1
+        self._insert(entry)
+        return entry
+
+    def put(self, entry: CachedDocument):
+        self._insert(entry)
+        self._save_to_disk(entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["disk_hits"] + self._counters["misses"]
+            hits = self._counters["hits"] + self._counters["disk_hits"]
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "disk_tier": bool(self.disk_dir),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _insert(self, entry: CachedDocument):
+        size = entry.nbytes()
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(entry.key, None)
+            if previous is not None:
+                self._size -= previous.nbytes()
+            self._entries[entry.key] = entry
+            self._size += size
+            while self._size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.nbytes()
+                self._counters["evictions"] += 1
+
+    # ---------- Disk tier ----------
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key)
+
+    def _save_to_disk(self, entry: CachedDocument):
+        if not self.disk_dir:
+            return
+        folder = self._entry_dir(entry.key)
+        if os.path.exists(folder):
+            return
+        tmp_folder = f"{folder}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.makedirs(tmp_folder, exist_ok=True)
+            kind = retrieval.store_kind(entry.db)
+            if kind == "faiss":
+                entry.db.save_local(tmp_folder)
+            if entry.vectors is not None:
+                np.save(os.path.join(tmp_folder, "vectors.npy"), entry.vectors)
+            with open(os.path.join(tmp_folder, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({
+                    "store": kind,
+                    "text": entry.text,
+                    "chunks": entry.chunks,
+                    "metadatas": entry.metadatas,
+                }, f)
+            os.replace(tmp_folder, folder)
+            with self._lock:
+                self._counters["disk_writes"] += 1
+        except OSError as e:
+            print(f"[DocCache] Failed to write {folder}: {e}")
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+
+    def _load_from_disk(self, key: str):
+        if not self.disk_dir:
+            return None
+        folder = self._entry_dir(key)
+        if not os.path.isdir(folder):
+            return None
+        try:
+            with open(os.path.join(folder, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            kind = meta.get("store", "faiss")
+            vectors = None
+            if kind != "passthrough":
+                vectors = np.load(os.path.join(folder, "vectors.npy"))
+            if kind == "faiss":
+                # We wrote this pickle ourselves, so loading it is safe.
+                db = FAISS.load_local(folder, self.embeddings, allow_dangerous_deserialization=True)
+            else:
+                db = retrieval.build_store(kind, meta["chunks"], meta["metadatas"], vectors, self.embeddings)
+        except (OSError, ValueError) as e:
+            print(f"[DocCache] Failed to read {folder}: {e}")
+            return None
+        return CachedDocument(key, meta["text"], meta["chunks"], meta["metadatas"], vectors, db)
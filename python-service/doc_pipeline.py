@@ -0,0 +1,248 @@
+"""
+Runs the resume and job-description pipelines (parse, split, embed, index,
+retrieve) at the same time on a shared bounded thread pool.
+
+Set DOC_PIPELINE_MODE=serial to process them one after the other; the
+per-document and wall-clock timings collected here show the difference on
+the real endpoints (see /stats).
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import deadlines
+import langchain_helper as lch
+import metrics
+import pdf_ingest
+from pdf_ingest import DocumentTooLargeError, read_pdf_bytes
+
+
+DOC_PIPELINE_MODE = os.getenv("DOC_PIPELINE_MODE", "parallel")
+DOC_PIPELINE_WORKERS = int(os.getenv("DOC_PIPELINE_WORKERS", "4"))
+ANSWER_FEEDBACK_BATCH_MAX = int(os.getenv("ANSWER_FEEDBACK_BATCH_MAX", "30"))
+
+# Extraction profiles (resume, job description) used by each endpoint;
+# the queries themselves are registered in extraction_profiles.
+ENDPOINT_PROFILES = {
+    "resume_analysis": ("resume_analysis.resume", "resume_analysis.jd"),
+    "interview_questions": ("interview_questions.resume", "interview_questions.jd"),
+    "answer_feedback": ("answer_feedback.resume", "answer_feedback.jd"),
+    "ideal_answer": ("ideal_answer.resume", "ideal_answer.jd"),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {
+    "requests": 0,
+    "document_ms_total": 0.0,
+    "wall_ms_total": 0.0,
+}
+
+
+class DocumentRequestError(Exception):
+    """A missing or invalid document in the request (reported as-is to the client)."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class DocumentProcessingError(Exception):
+    """Wraps a failure in one document's pipeline with the document's name."""
+
+    def __init__(self, document: str, cause: Exception):
+        super().__init__(f"{document}: {cause}")
+        self.document = document
+        self.cause = cause
+
+
+def get_executor() -> ThreadPoolExecutor:
+    # Created lazily so worker threads are never forked along with a preloaded app.
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DOC_PIPELINE_WORKERS, thread_name_prefix="doc-pipeline")
+        return _executor
+
+
+def _read_document(fields, files, file_field: str, text_field: str, label: str) -> tuple:
+    file = files.get(file_field)
+    if getattr(file, "filename", None):
+        if not file.filename.lower().endswith(".pdf"):
+            raise DocumentRequestError(f"{label} must be a PDF")
+        # Flask's FileStorage exposes .stream, Starlette's UploadFile .file
+        return ("pdf", read_pdf_bytes(getattr(file, "stream", None) or file.file))
+
+    text = fields.get(text_field) or ""
+    text = text.strip() if isinstance(text, str) else ""
+    if text:
+        return ("text", text)
+    raise DocumentRequestError(f"Missing {label.lower()} file or text")
+
+
+def read_documents(fields, files) -> tuple:
+    """
+    Pull the resume and job description out of a request's form/JSON fields
+    and uploaded files as ("pdf", bytes) or ("text", str) sources. Works with
+    both Flask and Starlette (async mode) request data.
+    """
+    resume_source = _read_document(fields, files, "resume", "resumeText", "Resume")
+    jd_source = _read_document(fields, files, "jobDescriptionFile", "jobDescription", "Job description")
+    return resume_source, jd_source
+
+
+def question_options(data):
+    """Interview question settings from the request fields, with the defaults."""
+    return dict(
+        num_questions=int(data.get('numQuestions', 5)),
+        skill_focus=data.get('skillFocus', "As per JD"),
+        question_type=data.get('questionType', "Technical, Behavioral"),
+        question_difficulty=data.get('questionDifficulty', "Medium"),
+        experience_level=data.get('experienceLevel', "1-2 years"),
+        round_type=data.get('roundType', "Technical"),
+        target_job_role=data.get('targetJobRole', "Software Engineer"),
+    )
+
+
+def answer_items(data) -> list:
+    """
+    The (question, answer) pairs of a batch feedback request: an "answers"
+    list of {"question", "answer"} objects (a JSON string in multipart forms).
+    """
+    answers = data.get("answers")
+    if isinstance(answers, str):
+        try:
+            answers = json.loads(answers)
+        except ValueError:
+            raise DocumentRequestError("answers must be a JSON list")
+    if not isinstance(answers, list) or not answers:
+        raise DocumentRequestError("Missing answers list")
+    if len(answers) > ANSWER_FEEDBACK_BATCH_MAX:
+        raise DocumentRequestError(f"At most {ANSWER_FEEDBACK_BATCH_MAX} answers per batch")
+    items = []
+    for i, item in enumerate(answers):
+        if not isinstance(item, dict) or not item.get("question") or not item.get("answer"):
+            raise DocumentRequestError(f"Missing question or answer in answers[{i}]")
+        items.append({"question": str(item["question"]), "answer": str(item["answer"])})
+    return items
+
+
+def error_response(exc: Exception) -> tuple:
+    """Map a document reading/processing failure to (json_payload, status)."""
+    if isinstance(exc, deadlines.DeadlineExceeded):
+        return {"error": str(exc)}, exc.status
+    if isinstance(exc, DocumentRequestError):
+        return {"error": exc.message}, exc.status
+    if isinstance(exc, DocumentTooLargeError):
+        return {"error": str(exc)}, 413
+    if isinstance(exc, DocumentProcessingError):
+        if isinstance(exc.cause, DocumentTooLargeError):
+            return {"error": f"{exc.document.capitalize()}: {exc.cause}"}, 413
+        return {"error": f"Document processing failed ({exc.document}): {exc.cause}"}, 500
+    return {"error": f"Document processing failed: {exc}"}, 500
+
+
+def process_document(source: tuple, profile: str) -> str:
+    """Ingest one ("pdf", bytes) or ("text", str) source and retrieve content for a profile."""
+    kind, payload = source
+    deadlines.check("documents")
+    if kind == "pdf":
+        entry = lch.ingest_pdf(payload)
+    else:
+        entry = lch.ingest_text(payload)
+    return lch.extract_profile(entry, profile)
+
+
+def document_text(source: tuple) -> str:
+    """Full text of a ("pdf", bytes) or ("text", str) source, without chunking or embedding."""
+    kind, payload = source
+    if kind == "pdf":
+        return "\n".join(pdf_ingest.extract_pages(payload))
+    return payload[:pdf_ingest.MAX_DOC_CHARS]
+
+
+def _timed(name: str, source: tuple, profile: str):
+    start = time.perf_counter()
+    try:
+        result = process_document(source, profile)
+    except deadlines.DeadlineExceeded:
+        raise
+    except Exception as exc:
+        raise DocumentProcessingError(name, exc) from exc
+    return result, (time.perf_counter() - start) * 1000
+
+
+def _record(resume_ms: float, jd_ms: float, wall_ms: float):
+    with _stats_lock:
+        _stats["requests"] += 1
+        _stats["document_ms_total"] += resume_ms + jd_ms
+        _stats["wall_ms_total"] += wall_ms
+    print(f"[Docs] mode={DOC_PIPELINE_MODE} resume={resume_ms:.0f}ms jd={jd_ms:.0f}ms "
+          f"wall={wall_ms:.0f}ms saved={max(resume_ms + jd_ms - wall_ms, 0):.0f}ms")
+
+
+def _unwrap(results: list):
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    (resume_info, resume_ms), (jd_info, jd_ms) = results
+    return resume_info, resume_ms, jd_info, jd_ms
+
+
+def process_documents(resume_source: tuple, jd_source: tuple, resume_profile: str, jd_profile: str):
+    """Return (resume_info, jd_info), raising DocumentProcessingError on failure."""
+    start = time.perf_counter()
+    if DOC_PIPELINE_MODE == "serial":
+        resume_info, resume_ms = _timed("resume", resume_source, resume_profile)
+        jd_info, jd_ms = _timed("job description", jd_source, jd_profile)
+    else:
+        executor = get_executor()
+        resume_future = executor.submit(metrics.bind(_timed), "resume", resume_source, resume_profile)
+        jd_future = executor.submit(metrics.bind(_timed), "job description", jd_source, jd_profile)
+        # Collect both so a failure in one doesn't leave the other running unobserved
+        results = []
+        for future in (resume_future, jd_future):
+            try:
+                results.append(future.result())
+            except (DocumentProcessingError, deadlines.DeadlineExceeded) as exc:
+                results.append(exc)
+        resume_info, resume_ms, jd_info, jd_ms = _unwrap(results)
+
+    _record(resume_ms, jd_ms, (time.perf_counter() - start) * 1000)
+    return resume_info, jd_info
+
+
+async def aprocess_documents(resume_source: tuple, jd_source: tuple, resume_profile: str, jd_profile: str):
+    """Async variant of process_documents; the CPU work runs on the shared pool, off the event loop."""
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        loop.run_in_executor(executor, metrics.bind(_timed), "resume", resume_source, resume_profile),
+        loop.run_in_executor(executor, metrics.bind(_timed), "job description", jd_source, jd_profile),
+        return_exceptions=True,
+    )
+    resume_info, resume_ms, jd_info, jd_ms = _unwrap(results)
+
+    _record(resume_ms, jd_ms, (time.perf_counter() - start) * 1000)
+    return resume_info, jd_info
+
+
+def stats() -> dict:
+    with _stats_lock:
+        requests = _stats["requests"]
+        saved = max(_stats["document_ms_total"] - _stats["wall_ms_total"], 0.0)
+        return {
+            "mode": DOC_PIPELINE_MODE,
+            "workers": DOC_PIPELINE_WORKERS,
+            "requests": requests,
+            "avg_wall_ms": round(_stats["wall_ms_total"] / requests, 1) if requests else 0.0,
+            "avg_serial_equivalent_ms": round(_stats["document_ms_total"] / requests, 1) if requests else 0.0,
+            "saved_ms_total": round(saved, 1),
+        }
@@ -0,0 +1,80 @@
+"""
+Pluggable embedding backends, chosen with EMBEDDING_BACKEND:
+
+  huggingface  sentence-transformers on PyTorch (default)
+  onnx         the same model exported to ONNX (optionally int8-quantized)
+               and run with ONNX Runtime + tokenizers; torch isn't imported.
+
+Export the ONNX model once with export_onnx_model.py. Check retrieval parity
+and throughput between backends with bench/embedding_parity.py.
+"""
+import os
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "models/paraphrase-MiniLM-L3-v2-onnx")
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence-transformer inference with ONNX Runtime: tokenize, run the
+    encoder, mean-pool over the attention mask (as paraphrase-MiniLM does).
+    Uses model_quantized.onnx when present, else model.onnx.
+    """
+
+    def __init__(self, model_dir: str, batch_size: int = 32, max_length: int = 128):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        model_path = os.path.join(model_dir, "model_quantized.onnx")
+        if not os.path.exists(model_path):
+            model_path = os.path.join(model_dir, "model.onnx")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if os.getenv("ONNX_NUM_THREADS"):
+            options.intra_op_num_threads = int(os.getenv("ONNX_NUM_THREADS"))
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.model_path = model_path
+        self._input_names = {node.name for node in self.session.get_inputs()}
+
+    def _encode(self, texts: list) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            inputs["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, inputs)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        return (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def embed_documents(self, texts: list) -> list:
+        vectors = [
+            self._encode(texts[i:i + self.batch_size])
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        return np.concatenate(vectors).tolist() if vectors else []
+
+    def embed_query(self, text: str) -> list:
+        return self._encode([text])[0].tolist()
+
+
+def create_embeddings(model_name: str, backend: str = None) -> Embeddings:
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "onnx":
+        return OnnxEmbeddings(ONNX_MODEL_DIR)
+    if backend == "huggingface":
+        # Imported here so the onnx backend can run without torch installed
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        return HuggingFaceEmbeddings(model_name=model_name)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
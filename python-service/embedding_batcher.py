@@ -0,0 +1,123 @@
+"""
+Cross-request embedding micro-batcher.
+
+Wraps an Embeddings model so that chunk texts from concurrent requests are
+gathered for up to EMBED_BATCH_WINDOW_MS (or until EMBED_MAX_BATCH texts are
+waiting) and embedded in one forward pass. Each caller gets back only its
+own vectors. Batch-size and queue-wait histograms are kept so the window
+and size can be tuned against the latency they add.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from langchain_core.embeddings import Embeddings
+
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+WAIT_MS_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+
+def _observe(histogram: list, buckets: tuple, value: float):
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            histogram[i] += 1
+            return
+    histogram[-1] += 1
+
+
+def _format(histogram: list, buckets: tuple) -> dict:
+    labels = [f"<={bound}" for bound in buckets] + [f">{buckets[-1]}"]
+    return dict(zip(labels, histogram))
+
+
+class BatchingEmbeddings(Embeddings):
+    def __init__(self, inner: Embeddings, window_ms: float, max_batch_size: int):
+        self.inner = inner
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._batch_sizes = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._requests_per_batch = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._wait_ms = [0] * (len(WAIT_MS_BUCKETS) + 1)
+        self._batches = 0
+        self._texts = 0
+
+    def embed_documents(self, texts: list) -> list:
+        if not texts:
+            return []
+        future = Future()
+        self._get_queue().put((list(texts), future, time.perf_counter()))
+        return future.result()
+
+    def embed_query(self, text: str) -> list:
+        # Queries are one short text on the request's critical path; batching
+        # them would only add the window as latency.
+        return self.inner.embed_query(text)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "window_ms": self.window * 1000,
+                "max_batch_size": self.max_batch_size,
+                "batches": self._batches,
+                "texts": self._texts,
+                "avg_batch_size": round(self._texts / self._batches, 2) if self._batches else 0.0,
+                "batch_size_histogram": _format(self._batch_sizes, BATCH_SIZE_BUCKETS),
+                "requests_per_batch_histogram": _format(self._requests_per_batch, BATCH_SIZE_BUCKETS),
+                "queue_wait_ms_histogram": _format(self._wait_ms, WAIT_MS_BUCKETS),
+            }
+
+    def _get_queue(self) -> queue.Queue:
+        # (Re)start the worker thread lazily and after a fork, since threads
+        # don't survive into gunicorn workers.
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, args=(self._queue,), name="embedding-batcher", daemon=True).start()
+            return self._queue
+
+    def _run(self, pending: queue.Queue):
+        while True:
+            batch = [pending.get()]
+            size = len(batch[0][0])
+            deadline = time.perf_counter() + self.window
+            while size < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self._embed_batch(batch)
+
+    def _embed_batch(self, batch: list):
+        started = time.perf_counter()
+        texts = [text for item_texts, _, _ in batch for text in item_texts]
+        try:
+            vectors = self.inner.embed_documents(texts)
+        except Exception as exc:
+            for _, future, _ in batch:
+                future.set_exception(exc)
+            return
+
+        with self._lock:
+            self._batches += 1
+            self._texts += len(texts)
+            _observe(self._batch_sizes, BATCH_SIZE_BUCKETS, len(texts))
+            _observe(self._requests_per_batch, BATCH_SIZE_BUCKETS, len(batch))
+            for _, _, enqueued in batch:
+                _observe(self._wait_ms, WAIT_MS_BUCKETS, (started - enqueued) * 1000)
+
+        offset = 0
+        for item_texts, future, _ in batch:
+            future.set_result(vectors[offset:offset + len(item_texts)])
+            offset += len(item_texts)
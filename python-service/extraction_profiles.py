@@ -0,0 +1,82 @@
+"""
+Named extraction profiles.
+
+Each endpoint retrieves resume/JD content with a fixed query. Those queries
+are registered here as profiles and embedded once (at warm-up). When a
+document is ingested its chunk matrix is scored against every profile in a
+single matrix multiply and each profile's top-k chunk indices are kept with
+the cached document, so later requests for any endpoint are a lookup.
+"""
+import threading
+
+import numpy as np
+
+
+class ProfileRegistry:
+    def __init__(self):
+        self._queries = {}
+        self._names = []
+        self._matrix = None
+        self._lock = threading.Lock()
+        # Bumped whenever the set of profiles changes, so stale per-document
+        # rankings get recomputed.
+        self.version = 0
+        self.lookups = 0
+        self.fallbacks = 0
+
+    def register(self, name: str, query: str):
+        with self._lock:
+            self._queries[name] = query
+            self._names = list(self._queries)
+            self._matrix = None
+            self.version += 1
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._queries
+
+    def query(self, name: str) -> str:
+        return self._queries[name]
+
+    def compile(self, embeddings):
+        """Embed every profile query once; rows are L2-normalized."""
+        with self._lock:
+            if self._matrix is not None or not self._names:
+                return
+            vectors = np.asarray(
+                embeddings.embed_documents([self._queries[name] for name in self._names]), dtype=np.float32
+            )
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            self._matrix = np.ascontiguousarray(vectors / np.clip(norms, 1e-12, None))
+
+    def rank(self, vectors: np.ndarray, top_k: int, embeddings) -> dict:
+        """Return {profile name: indices of the top_k chunks, best first} for a chunk matrix."""
+        self.compile(embeddings)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        scores = (vectors / np.clip(norms, 1e-12, None)) @ self._matrix.T  # chunks x profiles
+        order = np.argsort(-scores, axis=0)[:top_k]
+        return {name: order[:, i].tolist() for i, name in enumerate(self._names)}
+
+    def stats(self) -> dict:
+        return {
+            "profiles": len(self._names),
+            "compiled": self._matrix is not None,
+            "lookups": self.lookups,
+            "fallbacks": self.fallbacks,
+        }
+
+
+registry = ProfileRegistry()
+
+DEFAULT_PROFILES = {
+    "resume_analysis.resume": "Extract skills, education, work experience, and projects from resume.",
+    "resume_analysis.jd": "Extract required skills and technologies from job description.",
+    "interview_questions.resume": "Extract skills, experience, and projects from resume for mock questions.",
+    "interview_questions.jd": "Extract responsibilities and requirements from job description.",
+    "answer_feedback.resume": "Extract relevant resume details for answer evaluation.",
+    "answer_feedback.jd": "Extract job requirements for answer evaluation.",
+    "ideal_answer.resume": "Extract candidate strengths and experiences for ideal response.",
+    "ideal_answer.jd": "Extract job expectations for crafting ideal answer.",
+}
+
+for _name, _query in DEFAULT_PROFILES.items():
+    registry.register(_name, _query)
@@ -0,0 +1,71 @@
+"""
+Production server configuration.
+
+    gunicorn -c gunicorn.conf.py
+
+The app (and with it the embedding model, torch and the LLM client) is
+imported once in the master process, warmed up with a dummy embedding and
+then frozen out of the garbage collector's reach before workers are forked,
+so every worker shares the same model memory copy-on-write instead of
+loading its own. SERVE_MODE=async serves async_app through uvicorn workers.
+
+With more than one worker, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory so /metrics reports all workers rather than whichever answered.
+"""
+import gc
+import os
+
+# Tokenizer thread pools don't survive fork; keep them off in the master.
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+SERVE_MODE = os.getenv("SERVE_MODE", "sync")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+accesslog = "-"
+
+if SERVE_MODE == "async":
+    wsgi_app = "async_app:app"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "app:app"
+    worker_class = "gthread"
+    threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+
+def _torch():
+    # None with the onnx embedding backend, which runs without torch installed
+    try:
+        import torch
+    except ImportError:
+        return None
+    return torch
+
+
+def on_starting(server):
+    # Runs in the master after the preloaded app has been imported.
+    import langchain_helper as lch
+
+    # Warm up single-threaded so torch never starts its intra-op (OpenMP)
+    # thread pool in the master; forking with that pool running can hang a
+    # worker on its first inference. post_fork sets each worker's count.
+    torch = _torch()
+    if torch is not None:
+        torch.set_num_threads(1)
+    lch.warm_up()
+    server.log.info("Models warm; freezing heap before forking workers")
+    # Move everything allocated so far into the permanent generation so GC
+    # passes in the workers don't touch (and un-share) those pages.
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    torch = _torch()
+    if torch is not None:
+        # TORCH_NUM_THREADS, or this worker's share of the CPUs
+        default = max(1, (os.cpu_count() or 1) // max(workers, 1))
+        torch.set_num_threads(int(os.getenv("TORCH_NUM_THREADS", str(default))))
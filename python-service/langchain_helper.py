@@ -1,105 +1,690 @@
-from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import Runnable
 from langchain_groq import ChatGroq
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.documents import Document
 from dotenv import load_dotenv
+import numpy as np
+import asyncio
 import os
 import json
-import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from doc_cache import CachedDocument, DocumentCache
+import pdf_ingest
+import retrieval
+import context_packer
+from context_packer import RetrievedText
+from extraction_profiles import registry as profile_registry
+from llm_limiter import LLMLimiter, LLMOverloadedError
+from llm_client import LLMUnavailableError, ResilientChatModel
+import streaming
+import llm_cache
+import metrics
+import deadlines
+import schemas
+from semantic_cache import SemanticCache
+from embedding_batcher import BatchingEmbeddings
+from embedding_backends import EMBEDDING_BACKEND, create_embeddings
+from ats_scorer import create_scorer
 
 
 
 load_dotenv()
 
-llm = ChatGroq(
-  api_key=os.getenv("GROQ_API_KEY"),
-  model= "llama-3.3-70b-versatile",
-  temperature= 0.85,
+EMBEDDING_MODEL = "sentence-transformers/paraphrase-MiniLM-L3-v2"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+EXTRACT_TOP_K = 10
+
+# Token budget for the resume + JD context of each prompt (see context_packer)
+CONTEXT_BUDGETS = {
+  "resume_analysis": int(os.getenv("CONTEXT_BUDGET_RESUME_ANALYSIS", "6000")),
+  "generate_interview_questions": int(os.getenv("CONTEXT_BUDGET_INTERVIEW_QUESTIONS", "5000")),
+  "answer_feedback": int(os.getenv("CONTEXT_BUDGET_ANSWER_FEEDBACK", "4000")),
+  "generate_ideal_answer": int(os.getenv("CONTEXT_BUDGET_IDEAL_ANSWER", "4000")),
+}
+
+# single: one prompt for the whole analysis; fanout: four concurrent
+# sub-prompts merged into the same schema (see RESUME_ANALYSIS_BRANCHES)
+RESUME_ANALYSIS_MODE = os.getenv("RESUME_ANALYSIS_MODE", "single")
+
+# Retries with backoff, rate pacing, hedging, circuit breaking and an optional
+# smaller fallback model around every LLM call (see llm_client). The Groq
+# clients' own retries are off so failures are only retried there.
+llm = ResilientChatModel(
+  primary=ChatGroq(
+    api_key=os.getenv("GROQ_API_KEY"),
+    model= "llama-3.3-70b-versatile",
+    temperature= 0.85,
+    max_retries=0,
+  ),
+  fallback=ChatGroq(
+    api_key=os.getenv("GROQ_API_KEY"),
+    model=os.getenv("LLM_FALLBACK_MODEL"),
+    temperature=0.85,
+    max_retries=0,
+  ) if os.getenv("LLM_FALLBACK_MODEL") else None,
+  max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+  backoff_base=float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5")),
+  backoff_max=float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8")),
+  # Groq's per-model limits for the account's tier; 0 = don't pace
+  requests_per_minute=float(os.getenv("LLM_RATE_LIMIT_RPM", "0")),
+  tokens_per_minute=float(os.getenv("LLM_RATE_LIMIT_TPM", "0")),
+  # e.g. 95 to hedge calls still running after the endpoint's p95; 0 = off
+  hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "0")),
+  breaker_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+  breaker_reset_seconds=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
 )
 
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/paraphrase-MiniLM-L3-v2");
+# Caps concurrent LLM calls in the async serving mode; extra callers wait in a
+# bounded queue and are rejected with LLMOverloadedError once it is full.
+llm_limiter = LLMLimiter(
+  max_concurrent=int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+  max_queue=int(os.getenv("LLM_MAX_QUEUE", "64")),
+)
 
+# Exact-match response cache, only for the endpoints listed (comma-separated)
+# in LLM_CACHE_ENDPOINTS; set it to an empty string to disable.
+response_cache = llm_cache.create_cache(
+  backend=os.getenv("LLM_CACHE_BACKEND", "memory"),
+  path=os.getenv("LLM_CACHE_PATH", "cache/llm_responses.sqlite3"),
+  max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000")),
+  ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400")),
+  endpoints=[
+    name.strip()
+    for name in os.getenv("LLM_CACHE_ENDPOINTS", "generate_ideal_answer,generate_interview_questions").split(",")
+    if name.strip()
+  ],
+)
 
-def create_vectorDB_from_pdf(pdf_path: str):
-    # Step 1: Load the PDF
-    loader = PyPDFLoader(pdf_path)
-    documents = loader.load()
+# huggingface (PyTorch) or onnx (ONNX Runtime, optionally int8), see embedding_backends
+base_embeddings = create_embeddings(EMBEDDING_MODEL)
 
-    # Step 2: Split the text
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    docs = text_splitter.split_documents(documents)
+# Chunk embeddings from concurrent requests are coalesced into shared
+# forward passes unless EMBED_BATCHING=0.
+if os.getenv("EMBED_BATCHING", "1") == "1":
+  embeddings = BatchingEmbeddings(
+    base_embeddings,
+    window_ms=float(os.getenv("EMBED_BATCH_WINDOW_MS", "5")),
+    max_batch_size=int(os.getenv("EMBED_MAX_BATCH", "64")),
+  )
+else:
+  embeddings = base_embeddings
 
-    # Step 3: Create embeddings
+# skills_match / keyword_match are computed locally, not by the LLM
+ats_scorer = create_scorer(embeddings)
 
-    # Step 4: Create FAISS vector store
-    db = FAISS.from_documents(docs, embeddings)
-    return db
+text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
 
+# The largest accepted document must be able to reach the FAISS store
+if retrieval.FAISS_MIN_CHUNKS > pdf_ingest.MAX_DOC_CHARS // CHUNK_SIZE:
+  print(f"[Retrieval] FAISS_MIN_CHUNKS={retrieval.FAISS_MIN_CHUNKS} is above the "
+        f"{pdf_ingest.MAX_DOC_CHARS // CHUNK_SIZE} chunks of a MAX_DOC_CHARS document; FAISS will never be used")
 
-def create_vectorDB_from_text(text: str):
+# Serves answer feedback / ideal answers for near-identical requests, keyed
+# on (question, answer) and (question,) respectively, within the exact
+# packed resume and JD (SEMANTIC_CONTEXT_INPUTS) they were generated for.
+SEMANTIC_CONTEXT_INPUTS = ("resume_content", "jd_content")
+semantic_cache = SemanticCache(
+  embeddings,
+  threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+  scope=os.getenv("SEMANTIC_CACHE_SCOPE", "user"),
+  max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000")),
+  ttl_seconds=float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "604800")),
+  endpoints=[
+    name.strip()
+    for name in os.getenv("SEMANTIC_CACHE_ENDPOINTS", "answer_feedback,generate_ideal_answer").split(",")
+    if name.strip()
+  ],
+)
+
+# Parsed documents, chunks, embeddings and FAISS indexes, keyed by content hash.
+doc_cache = DocumentCache(
+  max_bytes=int(os.getenv("DOC_CACHE_MAX_MB", "256")) * 1024 * 1024,
+  disk_dir=os.getenv("DOC_CACHE_DIR") or None,
+  embeddings=embeddings,
+  fingerprint=f"{EMBEDDING_BACKEND}|{EMBEDDING_MODEL}|{CHUNK_SIZE}|{CHUNK_OVERLAP}",
+)
+
+
+# Set once warm_up() has pushed a dummy input through the embedding model;
+# the readiness probe reports 503 until then.
+models_ready = False
+
+
+def warm_up():
+    """Load and exercise the embedding model before the service takes traffic."""
+    global models_ready
+    embeddings.embed_documents(["PrepMate warm-up"])
+    embeddings.embed_query("PrepMate warm-up")
+    profile_registry.compile(embeddings)
+    ats_scorer.warm_up()
+    models_ready = True
+
+
+def _build_document(key: str, text: str, documents: list) -> CachedDocument:
     # Step 1: Split the text
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    docs = text_splitter.create_documents([text])
+    deadlines.check("split")
+    with metrics.span("split"):
+        docs = text_splitter.split_documents(documents)
+    chunks = [doc.page_content for doc in docs]
+    # The chunk's position lets the context packer restore document order
+    metadatas = [{**doc.metadata, "chunk": i} for i, doc in enumerate(docs)]
+
+    # Step 2: Pick a store by size; small documents skip embedding entirely
+    kind = retrieval.choose_store_kind(text, len(chunks), EXTRACT_TOP_K)
+
+    # Step 3: Create embeddings (kept so repeat requests never hit the model)
+    vectors = None
+    if kind != "passthrough":
+        deadlines.check("embed")
+        with metrics.span("embed"):
+            vectors = np.asarray(embeddings.embed_documents(chunks), dtype=np.float32)
+
+    deadlines.check("index")
+    with metrics.span("index"):
+        # Step 4: Create the vector store from the precomputed embeddings
+        db = retrieval.build_store(kind, chunks, metadatas, vectors, embeddings)
+
+        entry = CachedDocument(key, text, chunks, metadatas, vectors, db)
+
+        # Step 5: Rank chunks for every extraction profile in one matrix multiply
+        _rank_profiles(entry)
+
+    doc_cache.put(entry)
+    return entry
+
+
+def _rank_profiles(entry: CachedDocument):
+    if entry.vectors is None or entry.profile_version == profile_registry.version:
+        return
+    entry.profile_hits = profile_registry.rank(entry.vectors, EXTRACT_TOP_K, embeddings)
+    entry.profile_version = profile_registry.version
+
+
+def ingest_pdf(pdf) -> CachedDocument:
+    """Build (or fetch from cache) a document from PDF bytes or a file-like stream."""
+    data = pdf_ingest.read_pdf_bytes(pdf)
+    key = doc_cache.key_for(data, kind="pdf")
+
+    entry = doc_cache.get(key)
+    if entry is None:
+        # Parse the PDF in memory only on a cache miss
+        deadlines.check("pdf_parse")
+        with metrics.span("pdf_parse"):
+            pages = pdf_ingest.extract_pages(data)
+        documents = [Document(page_content=text, metadata={"page": i}) for i, text in enumerate(pages)]
+        entry = _build_document(key, "\n".join(pages), documents)
+    return entry
 
-    # Step 2: Create embeddings
 
-    # Step 3: Create FAISS vector store
-    db = FAISS.from_documents(docs, embeddings)
-    return db
+def ingest_text(text: str) -> CachedDocument:
+    text = text[:pdf_ingest.MAX_DOC_CHARS]
+    key = doc_cache.key_for(text, kind="text")
 
+    entry = doc_cache.get(key)
+    if entry is None:
+        entry = _build_document(key, text, text_splitter.create_documents([text]))
+    return entry
 
-def extract_info(db, query):
-    docs = db.similarity_search(query, k=10)
-    content = " ".join([doc.page_content for doc in docs])
+
+def create_vectorDB_from_pdf(pdf):
+    return ingest_pdf(pdf).db
+
+
+def create_vectorDB_from_text(text: str):
+    return ingest_text(text).db
+
+
+def extract_info(db, query, document: str = None):
+    with metrics.span("retrieval"):
+        docs = db.similarity_search(query, k=EXTRACT_TOP_K)
+    content = RetrievedText([
+        (doc.metadata.get("chunk", ("rank", rank)), doc.page_content)
+        for rank, doc in enumerate(docs)
+    ], document)
     return content
 
 
-def _clean_and_parse_json(text: str):
-    # Remove Markdown code block markers (triple backticks)
-    text = re.sub(r'^```(?:json)?\s*', '', text.strip(), flags=re.IGNORECASE)
-    text = re.sub(r'```\s*$', '', text, flags=re.IGNORECASE)
+def extract_profile(entry: CachedDocument, profile: str):
+    """
+    Like extract_info, for a named extraction profile: the chunk ranking was
+    computed at ingestion, so this is a lookup. Unregistered names are
+    treated as ad-hoc queries.
+    """
+    if profile not in profile_registry:
+        profile_registry.fallbacks += 1
+        return extract_info(entry.db, profile, entry.text)
+
+    profile_registry.lookups += 1
+    if entry.vectors is None:
+        # Passthrough documents return every chunk for any query
+        return extract_info(entry.db, profile, entry.text)
+    with metrics.span("retrieval"):
+        _rank_profiles(entry)
+        return RetrievedText([(i, entry.chunks[i]) for i in entry.profile_hits[profile]], entry.text)
+
+
+def _pack_context(name: str, resume_content, jd_content):
+    with metrics.span("pack_context"):
+        return context_packer.pack_pair(name, resume_content, jd_content, CONTEXT_BUDGETS[name])
+
+
+# Fixes one fragment the scanner couldn't decode, so a slightly broken
+# completion costs a few hundred tokens instead of a full regeneration.
+JSON_REPAIR_PROMPT = PromptTemplate(
+    input_variables=["shape", "fragment"],
+    template="""
+        The following {shape} from a JSON document is malformed or cut off. Fix its JSON syntax without changing its content; if it was cut off, close it right where it stops.
+
+        {fragment}
+
+        Guidelines:
+        - Output only the fixed JSON, nothing else.
+        - Output an object member ("key": value) wrapped in braces, as {{"key": value}}.
+        - Do NOT wrap the JSON in markdown code blocks (no ```json or ```).
+        """
+)
 
-    # Replace smart quotes and dashes (optional, for robustness)
-    text = text.replace(""", '"').replace(""", '"')
-    text = text.replace("'", "'").replace("'", "'")
-    text = text.replace("–", "-").replace("—", "-")
-    # Remove non-printable control characters
-    text = re.sub(r"[\x00-\x1F\x7F]", "", text)
 
-    # Try to parse as JSON array or object
+def _repair_inputs(scanner: schemas.JsonScanner) -> list:
+    # Inputs for JSON_REPAIR_PROMPT, one per broken fragment; empty when
+    # repair is off or the damage is too widespread to be worth patching
+    if schemas.JSON_REPAIR_MODE != "llm" or not scanner.broken:
+        return []
+    if len(scanner.broken) > schemas.JSON_REPAIR_MAX_FRAGMENTS:
+        return []
+    if any(len(fragment) > schemas.JSON_REPAIR_MAX_CHARS for _, fragment in scanner.broken):
+        return []
+    shape = "object member" if scanner.root == "{" else "array element"
+    return [{"shape": shape, "fragment": fragment} for _, fragment in scanner.broken]
+
+
+def _repair_fragment(inputs: dict):
     try:
-        return json.loads(text)
-    except Exception:
-        # Fallback: extract the first {...} or [...] block
-        match = re.search(r"(\[.*\]|\{.*\})", text, re.DOTALL)
-        if match:
-            return json.loads(match.group(0))
+        return (JSON_REPAIR_PROMPT | _request_llm("json_repair")).invoke(inputs).content
+    except Exception as e:
+        print(f"[LLM Chain] JSON repair failed: {e}")
         return None
 
 
+async def _arepair_fragment(inputs: dict):
+    try:
+        return (await (JSON_REPAIR_PROMPT | _request_llm("json_repair")).ainvoke(inputs)).content
+    except Exception as e:
+        print(f"[LLM Chain] JSON repair failed: {e}")
+        return None
+
+
+def _repair_tokens(repairs: list, fixes: list) -> int:
+    return sum(
+        context_packer.count_tokens(JSON_REPAIR_PROMPT.format(**inputs)) + context_packer.count_tokens(fix or "")
+        for inputs, fix in zip(repairs, fixes)
+    )
+
+
+def _finish_output(scanner: schemas.JsonScanner, text: str, endpoint: str, prompt_template: PromptTemplate,
+                   input_data: dict, fixed: int = 0, repair_tokens: int = 0):
+    """Validate the scanned completion against the endpoint's schema and record how it went."""
+    value = scanner.value() if scanner.root is not None else None
+    schema = schemas.schema_for(endpoint)
+    dropped, error = [], None
+    if value is None:
+        error = "no JSON found"
+    elif schema is not None:
+        value, dropped, error = schema.validate(value)
+    if error:
+        schemas.record(endpoint, "failed", repair_tokens=repair_tokens)
+        print(f"[LLM Chain] JSON decode error ({error}). Raw output: {text}")
+        return {"error": "Invalid JSON response from model", "raw_output": text}
+
+    if fixed:
+        outcome = "llm_repair"
+    elif scanner.repaired or scanner.truncated or scanner.broken or dropped:
+        outcome = "local_repair"
+    else:
+        outcome = "clean"
+    saved = 0
+    if outcome != "clean":
+        # The retry this salvage avoided: the full prompt and completion again
+        full = context_packer.count_tokens(prompt_template.format(**input_data)) + context_packer.count_tokens(text)
+        saved = max(full - repair_tokens, 0)
+        print(f"[LLM Chain] {endpoint}: {outcome} (dropped={dropped or '-'}, "
+              f"unfixed fragments={len(scanner.broken)}, ~{saved} tokens saved)")
+    schemas.record(endpoint, outcome, dropped=len(dropped), repair_tokens=repair_tokens, tokens_saved=saved)
+    return value
+
+
+def _parse_llm_output(text: str, endpoint: str, prompt_template: PromptTemplate, input_data: dict,
+                      scanner: schemas.JsonScanner = None):
+    # Streaming callers pass the scanner they fed chunk by chunk
+    if scanner is None:
+        scanner = schemas.JsonScanner()
+        scanner.feed(text)
+    scanner.finish()
+    repairs = _repair_inputs(scanner)
+    if not repairs:
+        return _finish_output(scanner, text, endpoint, prompt_template, input_data)
+    fixes = [_repair_fragment(inputs) for inputs in repairs]
+    fixed = scanner.apply_fixes(fixes)
+    return _finish_output(scanner, text, endpoint, prompt_template, input_data, fixed, _repair_tokens(repairs, fixes))
+
+
+async def _aparse_llm_output(text: str, endpoint: str, prompt_template: PromptTemplate, input_data: dict,
+                             scanner: schemas.JsonScanner = None):
+    if scanner is None:
+        scanner = schemas.JsonScanner()
+        scanner.feed(text)
+    scanner.finish()
+    repairs = _repair_inputs(scanner)
+    if not repairs:
+        return _finish_output(scanner, text, endpoint, prompt_template, input_data)
+    fixes = await asyncio.gather(*(_arepair_fragment(inputs) for inputs in repairs))
+    fixed = scanner.apply_fixes(fixes)
+    return _finish_output(scanner, text, endpoint, prompt_template, input_data, fixed, _repair_tokens(repairs, fixes))
+
+
+def _cache_key(endpoint: str, prompt_template: PromptTemplate, input_data: dict):
+    if endpoint is None or not response_cache.enabled_for(endpoint):
+        return None
+    model_params = {"model": llm.model_name, "temperature": llm.temperature}
+    return llm_cache.make_key(prompt_template.template, input_data, model_params)
+
+
+def _semantic_key(endpoint: str, semantic_parts, user_id, input_data: dict):
+    # (bucket, part vectors) for the semantic cache, or None. The packed
+    # documents the response is personalised against must match exactly.
+    if semantic_parts is None:
+        return None
+    context = tuple(input_data.get(name, "") for name in SEMANTIC_CONTEXT_INPUTS)
+    bucket = semantic_cache.scope_key(endpoint, user_id, context)
+    if bucket is None:
+        return None
+    return bucket, semantic_cache.embed(semantic_parts)
+
+
+# Raised to the routes rather than turned into error payloads: the LLM
+# refused the call up front (llm_limiter's queue is full, or llm_client's
+# circuit is open or its rate limit reached), so they answer 503 with
+# Retry-After. Fan-outs raise one only when every call was refused.
+LLM_RETRY_LATER_ERRORS = (LLMOverloadedError, LLMUnavailableError)
+
+
+def _is_error(result) -> bool:
+    return isinstance(result, dict) and "error" in result
+
+
+def _lookup_cached(prompt_template: PromptTemplate, input_data: dict, endpoint: str, semantic_parts, user_id):
+    """
+    Check the exact-match cache, then the semantic cache.
+    Returns (cached result or None, exact key, semantic key) so the caller
+    can store a fresh result under both keys.
+    """
+    key = _cache_key(endpoint, prompt_template, input_data)
+    if key is not None:
+        cached = response_cache.get(endpoint, key)
+        if cached is not None:
+            return cached, key, None
+    semantic = _semantic_key(endpoint, semantic_parts, user_id, input_data)
+    if semantic is not None:
+        cached = semantic_cache.get(*semantic)
+        if cached is not None:
+            return cached, key, semantic
+    return None, key, semantic
+
+
+async def _alookup_cached(prompt_template: PromptTemplate, input_data: dict, endpoint: str, semantic_parts, user_id):
+    if semantic_parts is None:
+        return _lookup_cached(prompt_template, input_data, endpoint, None, user_id)
+    # Embedding is CPU-bound; keep it off the event loop
+    return await asyncio.get_running_loop().run_in_executor(
+        None, _lookup_cached, prompt_template, input_data, endpoint, semantic_parts, user_id
+    )
+
+
+def _remember(key, semantic, result, started: float):
+    # Error payloads are never cached
+    if _is_error(result):
+        return
+    if key is not None:
+        response_cache.put(key, result, time.perf_counter() - started)
+    if semantic is not None:
+        semantic_cache.put(*semantic, result)
+
+
+def _record_tokens(endpoint: str, prompt_template: PromptTemplate, input_data: dict, text: str, usage=None):
+    # Groq reports usage; estimate (see context_packer) when it doesn't
+    usage = usage or {}
+    prompt = usage.get("input_tokens") or context_packer.count_tokens(prompt_template.format(**input_data))
+    completion = usage.get("output_tokens") or context_packer.count_tokens(text)
+    metrics.record_tokens(endpoint, prompt, completion)
+
+
+def _llm_error(e: Exception) -> dict:
+    print(f"[LLM Chain] Invocation error: {e}")
+    error = {"error": f"An error occurred during LLM invocation: {str(e)}", "raw_output": ""}
+    # A stream that failed fast (LLM_RETRY_LATER_ERRORS) after its response started
+    if getattr(e, "retry_after", None):
+        error["retry_after"] = e.retry_after
+    return error
+
+
+def _request_llm(endpoint: str = None):
+    # Bounded by what is left of the request's deadline, so an abandoned
+    # request stops waiting on Groq; `endpoint` keys llm_client's latency
+    # history for hedging
+    options = {"endpoint": endpoint} if endpoint else {}
+    timeout = deadlines.llm_timeout()
+    if timeout is not None:
+        options["timeout"] = timeout
+    return llm.bind(**options) if options else llm
+
+
+def _stream_error(e: Exception) -> dict:
+    try:
+        deadlines.check("llm")
+    except deadlines.DeadlineExceeded as exceeded:
+        return {"error": str(exceeded)}
+    return _llm_error(e)
+
+
 # Initializes the LLM, creates a chain, invokes it, and handles JSON parsing.
-def _invoke_llm_chain(prompt_template: PromptTemplate, input_data: dict):
-    chain: Runnable = prompt_template | llm
+# `endpoint` names the calling helper for the response caches; helpers that
+# use the semantic cache also pass the texts it is keyed on.
+def _invoke_llm_chain(prompt_template: PromptTemplate, input_data: dict, endpoint: str = None,
+                      semantic_parts: tuple = None, user_id: str = None):
+    with metrics.span("cache_lookup", endpoint):
+        cached, key, semantic = _lookup_cached(prompt_template, input_data, endpoint, semantic_parts, user_id)
+    if cached is not None:
+        return cached
+
+    deadlines.check("llm")
+    chain: Runnable = prompt_template | _request_llm(endpoint)
+    started = time.perf_counter()
     try:
-        response = chain.invoke(input_data)
-        text = response.content.strip()
-        parsed_json = _clean_and_parse_json(text)
-        if parsed_json is None:
-            print(f"[LLM Chain] JSON decode error. Raw output: {text}")
-            return {"error": "Invalid JSON response from model", "raw_output": text}
-        return parsed_json
+        with metrics.span("llm", endpoint):
+            response = chain.invoke(input_data)
+        _record_tokens(endpoint, prompt_template, input_data, response.content, response.usage_metadata)
+        with metrics.span("parse_output", endpoint):
+            result = _parse_llm_output(response.content.strip(), endpoint, prompt_template, input_data)
+    except LLMUnavailableError:
+        raise
     except Exception as e:
-        print(f"[LLM Chain] Invocation error: {e}")
-        return {"error": f"An error occurred during LLM invocation: {str(e)}", "raw_output": ""}
+        # A timeout set by the request's deadline is raised as such
+        deadlines.check("llm")
+        return _llm_error(e)
+    _remember(key, semantic, result, started)
+    return result
 
 
-def resume_analysis(resume_content: str, jd_content: str):
-    prompt = PromptTemplate(
-        input_variables=["resume_content", "jd_content"],
-        template="""
+# Async variant used by the async serving mode. Waits for a slot from
+# llm_limiter first; like LLMUnavailableError, LLMOverloadedError is raised
+# to the caller so the route can answer 503. Cache hits skip the limiter.
+async def _ainvoke_llm_chain(prompt_template: PromptTemplate, input_data: dict, endpoint: str = None,
+                             semantic_parts: tuple = None, user_id: str = None):
+    with metrics.span("cache_lookup", endpoint):
+        cached, key, semantic = await _alookup_cached(prompt_template, input_data, endpoint, semantic_parts, user_id)
+    if cached is not None:
+        return cached
+
+    async with llm_limiter.slot():
+        deadlines.check("llm")
+        chain: Runnable = prompt_template | _request_llm(endpoint)
+        started = time.perf_counter()
+        try:
+            with metrics.span("llm", endpoint):
+                response = await chain.ainvoke(input_data)
+            _record_tokens(endpoint, prompt_template, input_data, response.content, response.usage_metadata)
+            with metrics.span("parse_output", endpoint):
+                result = await _aparse_llm_output(response.content.strip(), endpoint, prompt_template, input_data)
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            deadlines.check("llm")
+            return _llm_error(e)
+    _remember(key, semantic, result, started)
+    return result
+
+
+_fanout_executor = None
+_fanout_lock = threading.Lock()
+
+
+def _get_fanout_executor() -> ThreadPoolExecutor:
+    # Runs the concurrent LLM calls of one request (analysis branches, question
+    # batches) in the sync app. Created lazily so gunicorn workers don't
+    # inherit the master's threads.
+    global _fanout_executor
+    with _fanout_lock:
+        if _fanout_executor is None:
+            _fanout_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("LLM_FANOUT_WORKERS", "16")), thread_name_prefix="llm-fanout"
+            )
+        return _fanout_executor
+
+
+def _gather(futures) -> list:
+    # Like asyncio.gather(..., return_exceptions=True) for the refusals only
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except LLM_RETRY_LATER_ERRORS as e:
+            results.append(e)
+    return results
+
+
+def _raise_if_all_refused(results: list):
+    if results and all(isinstance(result, LLM_RETRY_LATER_ERRORS) for result in results):
+        raise results[0]
+
+
+# Streaming variants for the SSE endpoints. They yield (event, data) pairs:
+# previews produced by `events` (a streaming.* parser adapter) as the
+# completion arrives, then ("result", payload) parsed from the full text,
+# or ("error", payload). Cache hits yield the result straight away.
+def _stream_llm_chain(prompt_template: PromptTemplate, input_data: dict, endpoint: str, events,
+                      semantic_parts: tuple = None, user_id: str = None):
+    timer = streaming.StreamTimer(endpoint)
+    with metrics.span("cache_lookup", endpoint):
+        cached, key, semantic = _lookup_cached(prompt_template, input_data, endpoint, semantic_parts, user_id)
+    if cached is not None:
+        timer.content()
+        yield "result", cached
+        timer.finish()
+        return
+
+    started = time.perf_counter()
+    text = ""
+    usage = None
+    scanner = schemas.JsonScanner()
+    try:
+        deadlines.check("llm")
+        chain: Runnable = prompt_template | _request_llm(endpoint)
+        with metrics.span("llm", endpoint):
+            for chunk in chain.stream(input_data):
+                deadlines.check("llm")
+                text += chunk.content
+                usage = chunk.usage_metadata or usage
+                scanner.feed(chunk.content)
+                for event in events(chunk.content):
+                    timer.content()
+                    yield event
+    except Exception as e:
+        yield "error", _stream_error(e)
+        timer.finish()
+        return
+
+    _record_tokens(endpoint, prompt_template, input_data, text, usage)
+    with metrics.span("parse_output", endpoint):
+        result = _parse_llm_output(text.strip(), endpoint, prompt_template, input_data, scanner)
+    _remember(key, semantic, result, started)
+    yield ("error" if _is_error(result) else "result"), result
+    timer.finish()
+
+
+async def _astream_llm_chain(prompt_template: PromptTemplate, input_data: dict, endpoint: str, events,
+                             semantic_parts: tuple = None, user_id: str = None):
+    timer = streaming.StreamTimer(endpoint)
+    with metrics.span("cache_lookup", endpoint):
+        cached, key, semantic = await _alookup_cached(prompt_template, input_data, endpoint, semantic_parts, user_id)
+    if cached is not None:
+        timer.content()
+        yield "result", cached
+        timer.finish()
+        return
+
+    text = ""
+    usage = None
+    scanner = schemas.JsonScanner()
+    try:
+        async with llm_limiter.slot():
+            deadlines.check("llm")
+            chain: Runnable = prompt_template | _request_llm(endpoint)
+            started = time.perf_counter()
+            with metrics.span("llm", endpoint):
+                async for chunk in chain.astream(input_data):
+                    deadlines.check("llm")
+                    text += chunk.content
+                    usage = chunk.usage_metadata or usage
+                    scanner.feed(chunk.content)
+                    for event in events(chunk.content):
+                        timer.content()
+                        yield event
+            _record_tokens(endpoint, prompt_template, input_data, text, usage)
+            with metrics.span("parse_output", endpoint):
+                result = await _aparse_llm_output(text.strip(), endpoint, prompt_template, input_data, scanner)
+    except LLM_RETRY_LATER_ERRORS as e:
+        # The response has already started, so this can't become a 503
+        yield "error", {"error": str(e), "retry_after": e.retry_after}
+        timer.finish()
+        return
+    except Exception as e:
+        yield "error", _stream_error(e)
+        timer.finish()
+        return
+
+    _remember(key, semantic, result, started)
+    yield ("error" if _is_error(result) else "result"), result
+    timer.finish()
+
+
+def _question_events():
+    parser = streaming.ArrayItemStream()
+    return lambda text: [("question", item) for item in parser.feed(text)]
+
+
+def _bullet_events():
+    parser = streaming.StringFieldStream(("ideal_answer", "explanation"))
+    return lambda text: [("bullet", {"field": field, "text": bullet}) for field, bullet in parser.feed(text)]
+
+
+RESUME_ANALYSIS_PROMPT = PromptTemplate(
+    input_variables=["resume_content", "jd_content"],
+    template="""
         You are an expert technical recruiter and resume analyst. Your goal is to go beyond simple keyword matching and provide a deep, insightful analysis of the candidate's suitability for the role. Evaluate the substance, impact, and narrative of the resume, not just the presence of keywords.
 
         Given the candidate's **resume** and the **job description**, provide a comprehensive, structured analysis to help the candidate understand their fit and how to improve their resume for this job.
@@ -117,8 +702,6 @@ def resume_analysis(resume_content: str, jd_content: str):
           "jd_summary": "<short summary>",
           "ats_score": {{
             "total_score": <int>,
-            "skills_match": <int>,
-            "keyword_match": <int>,
             "format_penalty": <int>,
             "final_assessment": "<short assessment>"
           }},
@@ -200,41 +783,304 @@ def resume_analysis(resume_content: str, jd_content: str):
         - If a section is missing, use an empty string, empty list, or empty object as appropriate.
         - Ensure the JSON is valid and parsable by Python's json.loads().
         """
+)
+
+
+# Fan-out mode: the same analysis as four independent, shorter prompts run
+# concurrently and merged into the RESUME_ANALYSIS_PROMPT schema.
+_RESUME_ANALYSIS_INTRO = """
+        You are an expert technical recruiter and resume analyst. Your goal is to go beyond simple keyword matching and provide a deep, insightful analysis of the candidate's suitability for the role. Evaluate the substance, impact, and narrative of the resume, not just the presence of keywords.
+
+        Resume:
+        {resume_content}
+
+        Job Description:
+        {jd_content}
+"""
+
+_RESUME_ANALYSIS_RULES = """
+        Guidelines:
+        - Output only the JSON object, nothing else.
+        - Do NOT wrap the JSON in markdown code blocks (no ```json or ```).
+        - If a section is missing, use an empty string, empty list, or empty object as appropriate.
+        - Ensure the JSON is valid and parsable by Python's json.loads().
+        """
+
+
+def _resume_analysis_branch(task: str, schema: str) -> PromptTemplate:
+    return PromptTemplate(
+        input_variables=["resume_content", "jd_content"],
+        template=_RESUME_ANALYSIS_INTRO + task + schema + _RESUME_ANALYSIS_RULES,
     )
 
-    return _invoke_llm_chain(
-        prompt,
-        {
-            "resume_content": resume_content,
-            "jd_content": jd_content,
+
+# Branch name -> (prompt, top-level keys it fills in)
+RESUME_ANALYSIS_BRANCHES = {
+    "sections": (_resume_analysis_branch(
+        """
+        Summarize the resume and the job description and extract the resume's sections.
+        Your output MUST be a valid JSON object with exactly this structure:
+""",
+        """
+        {{
+          "resume_summary": "<short summary>",
+          "jd_summary": "<short summary>",
+          "sections": {{
+            "basic_info": {{
+              "name": "<name>",
+              "email": "<email>",
+              "phone": "<phone>"
+            }},
+            "education": [
+              {{
+                "degree": "<degree>",
+                "institute": "<institute>",
+                "cgpa": "<cgpa>",
+                "years": "<years>"
+              }}
+            ],
+            "work_experience": [
+              {{
+                "title": "<title>",
+                "company": "<company>",
+                "duration": "<duration>",
+                "tech_stack": ["<tech>"]
+              }}
+            ],
+            "projects": [
+              {{
+                "name": "<name>",
+                "description": "<description>",
+                "tech_stack": ["<tech>", ...],
+                "impact": "<impact>"
+              }}
+            ],
+            "skills": ["<skill>", ...],
+            "certifications": ["<certification>"]
+          }},
+          "suggested_resume_title": "<title>"
+        }}
+"""), ("resume_summary", "jd_summary", "sections", "suggested_resume_title")),
+    "scoring": (_resume_analysis_branch(
+        """
+        Score how well the resume fits the job description as an ATS would, and list any red flags.
+        The total_score (out of 100) should be a result of your holistic AI analysis.
+        Your output MUST be a valid JSON object with exactly this structure:
+""",
+        """
+        {{
+          "ats_score": {{
+            "total_score": <int>,
+            "format_penalty": <int>,
+            "final_assessment": "<short assessment>"
+          }},
+          "red_flags": ["<flag>", ...]
+        }}
+"""), ("ats_score", "red_flags")),
+    "assessment": (_resume_analysis_branch(
+        """
+        Assess the resume's strengths and weaknesses for this job.
+        Your output MUST be a valid JSON object with exactly this structure:
+""",
+        """
+        {{
+          "strengths": {{
+            "technical": ["<point>", ...],
+            "resume_quality": ["<point>", ...],
+            "alignment_with_jd": ["<point>", ...]
+          }},
+          "weaknesses": {{
+            "missing_skills": ["<skill>", ...],
+            "weak_phrasing": {{
+              "verbs": ["<verb>", ...],
+              "examples": ["<example>", ...]
+            }},
+            "format_issues": {{
+              "layout": ["<issue>", ...],
+              "technical": ["<issue>", ...]
+            }},
+            "content_gaps": ["<gap>", ...]
+          }}
+        }}
+"""), ("strengths", "weaknesses")),
+    "suggestions": (_resume_analysis_branch(
+        """
+        Suggest concrete improvements that would make the resume a better fit for this job, including rewrites of weak lines.
+        Your output MUST be a valid JSON object with exactly this structure:
+""",
+        """
+        {{
+          "suggestions": {{
+            "formatting": {{
+              "high_priority": ["<tip>", ...],
+              "low_priority": ["<tip>", ...]
+            }},
+            "keyword_optimization": {{
+              "missing_keywords": ["<keyword>", ...],
+              "overused_words": ["<word>", ...]
+            }},
+            "content_improvements": ["<suggestion>", ...],
+            "rewrite_examples": [
+              {{
+                "current": "<current>",
+                "suggested": "<suggested>"
+              }}
+            ]
+          }}
+        }}
+"""), ("suggestions",)),
+}
+
+_EMPTY_ANALYSIS = {
+    "resume_summary": "",
+    "jd_summary": "",
+    "ats_score": {},
+    "sections": {},
+    "strengths": {},
+    "weaknesses": {},
+    "suggestions": {},
+    "red_flags": [],
+    "suggested_resume_title": "",
+}
+
+_analysis_stats_lock = threading.Lock()
+_analysis_stats = {}
+
+
+def _merge_resume_analysis(results: dict) -> dict:
+    """
+    Combine branch outputs into one analysis. Failed branches leave their
+    keys empty and are listed under "errors" (with "partial": true); if
+    every branch failed the result is an error payload.
+    """
+    analysis = json.loads(json.dumps(_EMPTY_ANALYSIS))
+    errors = {}
+    for name, result in results.items():
+        keys = RESUME_ANALYSIS_BRANCHES[name][1]
+        if isinstance(result, BaseException):
+            errors[name] = f"An error occurred during LLM invocation: {result}"
+        elif not isinstance(result, dict) or "error" in result:
+            errors[name] = result.get("error") if isinstance(result, dict) else "Unexpected output from model"
+        else:
+            analysis.update({key: result[key] for key in keys if key in result})
+    if len(errors) == len(results):
+        return {"error": "All resume analysis branches failed", "errors": errors, "raw_output": ""}
+    if errors:
+        analysis["partial"] = True
+        analysis["errors"] = errors
+    return analysis
+
+
+def _apply_ats_scores(analysis: dict, ats: dict):
+    # Slot the locally computed scores into the LLM's ats_score block
+    if "error" in analysis:
+        return
+    llm_scores = analysis.get("ats_score") if isinstance(analysis.get("ats_score"), dict) else {}
+    analysis["ats_score"] = {
+        "total_score": llm_scores.get("total_score"),
+        **llm_scores,
+        "skills_match": ats["skills_match"],
+        "keyword_match": ats["keyword_match"],
+    }
+
+
+def _record_analysis(mode: str, started: float, analysis: dict):
+    elapsed = time.perf_counter() - started
+    failed = "error" in analysis
+    with _analysis_stats_lock:
+        stats = _analysis_stats.setdefault(mode, {"calls": 0, "seconds": 0.0, "partial": 0, "failed": 0})
+        stats["calls"] += 1
+        stats["seconds"] += elapsed
+        stats["partial"] += int(bool(analysis.get("partial")))
+        stats["failed"] += int(failed)
+    print(f"[ResumeAnalysis] mode={mode} total={elapsed:.2f}s{' (partial)' if analysis.get('partial') else ''}")
+
+
+def analysis_stats() -> dict:
+    """Latency of resume_analysis per mode, for comparing single vs fanout."""
+    with _analysis_stats_lock:
+        return {
+            mode: {**values, "seconds": round(values["seconds"], 2),
+                   "avg_seconds": round(values["seconds"] / values["calls"], 3)}
+            for mode, values in _analysis_stats.items()
         }
-    )
 
 
-def generate_interview_questions(
-    resume_content: str,
-    jd_content: str,
-    question_difficulty: str,
-    question_type: str,
-    experience_level: str,
-    round_type: str,
-    target_job_role: str,
-    skill_focus: str,
-    num_questions: int
-    ):
-    num_questions = int(num_questions)
-    print(num_questions)
+def _ats_scores(resume_content, jd_content) -> dict:
+    # Score the whole documents, as /resume/ats-score does, not just the
+    # retrieved chunks the prompt gets: a skill outside them isn't missing
+    with metrics.span("ats_score"):
+        return ats_scorer.score(
+            getattr(resume_content, "document", None) or str(resume_content),
+            getattr(jd_content, "document", None) or str(jd_content),
+        )
 
-    # If question_type is a string, split it into a list
-    if isinstance(question_type, list):
-      question_type = ", ".join(question_type)
 
-    prompt = PromptTemplate(
-        input_variables=[
-            "resume_content", "jd_content", "question_difficulty", "question_type", 
-            "experience_level", "round_type", "target_job_role", "skill_focus", "num_questions"
-        ],
-        template="""
+# mode is "single" (one RESUME_ANALYSIS_PROMPT call) or "fanout"; defaults
+# to RESUME_ANALYSIS_MODE. Retrieved content (RetrievedText) is scored
+# against its full documents.
+def resume_analysis(resume_content: str, jd_content: str, mode: str = None):
+    mode = mode or RESUME_ANALYSIS_MODE
+    ats = _ats_scores(resume_content, jd_content)
+    resume_content, jd_content = _pack_context("resume_analysis", resume_content, jd_content)
+    inputs = {
+        "resume_content": resume_content,
+        "jd_content": jd_content,
+    }
+    started = time.perf_counter()
+    if mode == "fanout":
+        executor = _get_fanout_executor()
+        futures = {
+            name: executor.submit(
+                metrics.bind(_invoke_llm_chain), prompt, inputs, endpoint=f"resume_analysis.{name}"
+            )
+            for name, (prompt, _) in RESUME_ANALYSIS_BRANCHES.items()
+        }
+        results = _gather(futures.values())
+        # Only a 503 if no branch got through at all
+        _raise_if_all_refused(results)
+        analysis = _merge_resume_analysis(dict(zip(futures, results)))
+    else:
+        analysis = _invoke_llm_chain(RESUME_ANALYSIS_PROMPT, inputs, endpoint="resume_analysis")
+    _apply_ats_scores(analysis, ats)
+    _record_analysis(mode, started, analysis)
+    return analysis
+
+
+async def aresume_analysis(resume_content: str, jd_content: str, mode: str = None):
+    mode = mode or RESUME_ANALYSIS_MODE
+    ats = _ats_scores(resume_content, jd_content)
+    resume_content, jd_content = _pack_context("resume_analysis", resume_content, jd_content)
+    inputs = {
+        "resume_content": resume_content,
+        "jd_content": jd_content,
+    }
+    started = time.perf_counter()
+    if mode == "fanout":
+        names = list(RESUME_ANALYSIS_BRANCHES)
+        results = await asyncio.gather(
+            *(
+                _ainvoke_llm_chain(RESUME_ANALYSIS_BRANCHES[name][0], inputs, endpoint=f"resume_analysis.{name}")
+                for name in names
+            ),
+            return_exceptions=True,
+        )
+        # Only a 503 if no branch got through at all
+        _raise_if_all_refused(results)
+        analysis = _merge_resume_analysis(dict(zip(names, results)))
+    else:
+        analysis = await _ainvoke_llm_chain(RESUME_ANALYSIS_PROMPT, inputs, endpoint="resume_analysis")
+    _apply_ats_scores(analysis, ats)
+    _record_analysis(mode, started, analysis)
+    return analysis
+
+
+INTERVIEW_QUESTIONS_PROMPT = PromptTemplate(
+    input_variables=[
+        "resume_content", "jd_content", "question_difficulty", "question_type", 
+        "experience_level", "round_type", "target_job_role", "skill_focus", "num_questions"
+    ],
+    template="""
         You are an expert technical interviewer.
 
         Given the following inputs, generate {num_questions} highly personalized, high-quality mock interview questions. Each question should be tailored to the candidate's background, the job description, and the requirements below. Output a JSON array, where each element is an object with these keys: question_type, question_difficulty, question_num, question.
@@ -261,33 +1107,281 @@ def generate_interview_questions(
         - Output ONLY the JSON array. Do not include any other text, titles, or markdown.
         - Ensure the output is valid JSON.
         """
-    )
+)
 
-    return _invoke_llm_chain(
-        prompt,
-        {
-            "resume_content": resume_content,
-            "jd_content": jd_content,
-            "question_difficulty": question_difficulty,
+
+def _interview_question_inputs(
+    resume_content: str,
+    jd_content: str,
+    question_difficulty: str,
+    question_type: str,
+    experience_level: str,
+    round_type: str,
+    target_job_role: str,
+    skill_focus: str,
+    num_questions: int
+    ):
+    num_questions = int(num_questions)
+
+    # If question_type is a string, split it into a list
+    if isinstance(question_type, list):
+      question_type = ", ".join(question_type)
+
+    resume_content, jd_content = _pack_context("generate_interview_questions", resume_content, jd_content)
+
+    return {
+        "resume_content": resume_content,
+        "jd_content": jd_content,
+        "question_difficulty": question_difficulty,
+        "question_type": question_type,
+        "experience_level": experience_level,
+        "round_type": round_type,
+        "target_job_role": target_job_role,
+        "skill_focus": skill_focus,
+        "num_questions": num_questions
+    }
+
+
+# Large num_questions requests are split into batches of QUESTION_BATCH_SIZE
+# generated concurrently, each assigned its own question type / angle, then
+# merged, de-duplicated by embedding similarity and renumbered.
+QUESTION_BATCH_SIZE = int(os.getenv("QUESTION_BATCH_SIZE", "5"))
+QUESTION_DEDUP_THRESHOLD = float(os.getenv("QUESTION_DEDUP_THRESHOLD", "0.9"))
+QUESTION_TOPUP_ROUNDS = int(os.getenv("QUESTION_TOPUP_ROUNDS", "2"))
+
+INTERVIEW_QUESTIONS_BATCH_PROMPT = PromptTemplate(
+    input_variables=INTERVIEW_QUESTIONS_PROMPT.input_variables + ["batch_instructions"],
+    template=INTERVIEW_QUESTIONS_PROMPT.template.replace(
+        "        Guidelines:",
+        "        This request is one part of a larger question set:\n        {batch_instructions}\n\n        Guidelines:",
+    ),
+)
+
+# Different angles for batches that share a question type
+QUESTION_ANGLES = [
+    "the candidate's projects",
+    "the core requirements of the job description",
+    "fundamentals and problem solving",
+    "the candidate's work experience",
+    "the tools and technologies in the skill focus",
+    "practical scenarios and trade-offs",
+]
+
+_question_stats_lock = threading.Lock()
+_question_stats = {"calls": 0, "batched_calls": 0, "batches": 0, "duplicates_removed": 0, "topups": 0,
+                   "short": 0, "seconds": 0.0}
+
+
+def _question_batches(inputs: dict) -> list:
+    """Split one request into per-batch inputs with disjoint assignments."""
+    total = inputs["num_questions"]
+    count = -(-total // QUESTION_BATCH_SIZE)
+    types = [t.strip() for t in str(inputs["question_type"]).split(",") if t.strip()] or [inputs["question_type"]]
+    batches = []
+    for i in range(count):
+        # Spread the total evenly; one spare per batch absorbs duplicates
+        size = total // count + (1 if i < total % count else 0)
+        question_type = types[i % len(types)]
+        angle = QUESTION_ANGLES[(i // len(types)) % len(QUESTION_ANGLES)]
+        batches.append({
+            **inputs,
             "question_type": question_type,
-            "experience_level": experience_level,
-            "round_type": round_type,
-            "target_job_role": target_job_role,
-            "skill_focus": skill_focus,
-            "num_questions": num_questions
+            "num_questions": size + 1,
+            "batch_instructions": f"- Generate only {question_type} questions, focusing on {angle}.",
+        })
+    return batches
+
+
+def _topup_inputs(inputs: dict, kept: list, missing: int) -> dict:
+    asked = "\n".join(f"        - {q['question']}" for q in kept)
+    return {
+        **inputs,
+        "num_questions": missing + 1,
+        "batch_instructions": f"- These questions were already generated; ask different ones:\n{asked}",
+    }
+
+
+def _valid_questions(result) -> list:
+    if not isinstance(result, list):
+        return []
+    return [q for q in result if isinstance(q, dict) and isinstance(q.get("question"), str) and q["question"].strip()]
+
+
+def _dedupe_questions(kept: list, candidates: list, kept_vectors):
+    """
+    Greedily add candidates whose embedding isn't within
+    QUESTION_DEDUP_THRESHOLD cosine of any kept question.
+    Returns (kept, kept vectors, number of duplicates dropped).
+    """
+    if not candidates:
+        return kept, kept_vectors, 0
+    vectors = np.asarray(embeddings.embed_documents([q["question"] for q in candidates]), dtype=np.float32)
+    vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    dropped = 0
+    for question, vector in zip(candidates, vectors):
+        if kept_vectors is not None and float((kept_vectors @ vector).max()) >= QUESTION_DEDUP_THRESHOLD:
+            dropped += 1
+            continue
+        kept.append(question)
+        kept_vectors = vector[None, :] if kept_vectors is None else np.vstack([kept_vectors, vector])
+    return kept, kept_vectors, dropped
+
+
+def _finish_questions(kept: list, total: int, started: float, batches: int, dropped: int, topups: int,
+                      first_error):
+    questions = kept[:total]
+    if not questions:
+        return first_error or {"error": "No questions were generated", "raw_output": ""}
+    for number, question in enumerate(questions, start=1):
+        question["question_num"] = number
+    elapsed = time.perf_counter() - started
+    with _question_stats_lock:
+        _question_stats["batched_calls"] += 1
+        _question_stats["batches"] += batches
+        _question_stats["duplicates_removed"] += dropped
+        _question_stats["topups"] += topups
+        _question_stats["short"] += int(len(questions) < total)
+    print(f"[Questions] requested={total} batches={batches} returned={len(questions)} "
+          f"duplicates={dropped} topups={topups} total={elapsed:.2f}s")
+    return questions
+
+
+def _record_questions(started: float):
+    with _question_stats_lock:
+        _question_stats["calls"] += 1
+        _question_stats["seconds"] += time.perf_counter() - started
+
+
+def question_stats() -> dict:
+    with _question_stats_lock:
+        calls = _question_stats["calls"]
+        return {
+            **_question_stats,
+            "seconds": round(_question_stats["seconds"], 2),
+            "avg_seconds": round(_question_stats["seconds"] / calls, 3) if calls else 0.0,
         }
+
+
+def _first_error(results: list):
+    return next((r for r in results if isinstance(r, dict) and "error" in r), None)
+
+
+def _generate_questions_batched(inputs: dict):
+    total = inputs["num_questions"]
+    started = time.perf_counter()
+    executor = _get_fanout_executor()
+    batches = _question_batches(inputs)
+    futures = [
+        executor.submit(
+            metrics.bind(_invoke_llm_chain), INTERVIEW_QUESTIONS_BATCH_PROMPT, batch,
+            endpoint="generate_interview_questions",
+        )
+        for batch in batches
+    ]
+    results = _gather(futures)
+    _raise_if_all_refused(results)
+    candidates = [q for result in results for q in _valid_questions(result)]
+    kept, vectors, dropped = _dedupe_questions([], candidates, None)
+
+    topups = 0
+    while len(kept) < total and topups < QUESTION_TOPUP_ROUNDS:
+        topups += 1
+        result = _invoke_llm_chain(
+            INTERVIEW_QUESTIONS_BATCH_PROMPT, _topup_inputs(inputs, kept, total - len(kept)),
+            endpoint="generate_interview_questions",
+        )
+        kept, vectors, more = _dedupe_questions(kept, _valid_questions(result), vectors)
+        dropped += more
+    return _finish_questions(kept, total, started, len(batches), dropped, topups, _first_error(results))
+
+
+async def _agenerate_questions_batched(inputs: dict):
+    total = inputs["num_questions"]
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    batches = _question_batches(inputs)
+    results = await asyncio.gather(
+        *(
+            _ainvoke_llm_chain(INTERVIEW_QUESTIONS_BATCH_PROMPT, batch, endpoint="generate_interview_questions")
+            for batch in batches
+        ),
+        return_exceptions=True,
     )
+    _raise_if_all_refused(results)
+    candidates = [q for result in results for q in _valid_questions(result)]
+    kept, vectors, dropped = await loop.run_in_executor(None, _dedupe_questions, [], candidates, None)
 
+    topups = 0
+    while len(kept) < total and topups < QUESTION_TOPUP_ROUNDS:
+        topups += 1
+        result = await _ainvoke_llm_chain(
+            INTERVIEW_QUESTIONS_BATCH_PROMPT, _topup_inputs(inputs, kept, total - len(kept)),
+            endpoint="generate_interview_questions",
+        )
+        kept, vectors, more = await loop.run_in_executor(
+            None, _dedupe_questions, kept, _valid_questions(result), vectors
+        )
+        dropped += more
+    return _finish_questions(kept, total, started, len(batches), dropped, topups, _first_error(results))
 
-def answer_feedback(
+
+def generate_interview_questions(
     resume_content: str,
     jd_content: str,
-    question: str,
-    answer: str
+    question_difficulty: str,
+    question_type: str,
+    experience_level: str,
+    round_type: str,
+    target_job_role: str,
+    skill_focus: str,
+    num_questions: int
     ):
-    prompt = PromptTemplate(
-        input_variables=["resume_content", "jd_content", "question", "answer"],
-        template="""
+    inputs = _interview_question_inputs(
+        resume_content, jd_content, question_difficulty, question_type,
+        experience_level, round_type, target_job_role, skill_focus, num_questions
+    )
+    started = time.perf_counter()
+    if inputs["num_questions"] > QUESTION_BATCH_SIZE:
+        questions = _generate_questions_batched(inputs)
+    else:
+        questions = _invoke_llm_chain(INTERVIEW_QUESTIONS_PROMPT, inputs, endpoint="generate_interview_questions")
+    _record_questions(started)
+    return questions
+
+
+# Takes the same keyword arguments as generate_interview_questions.
+async def agenerate_interview_questions(**kwargs):
+    inputs = _interview_question_inputs(**kwargs)
+    started = time.perf_counter()
+    if inputs["num_questions"] > QUESTION_BATCH_SIZE:
+        questions = await _agenerate_questions_batched(inputs)
+    else:
+        questions = await _ainvoke_llm_chain(
+            INTERVIEW_QUESTIONS_PROMPT, inputs, endpoint="generate_interview_questions"
+        )
+    _record_questions(started)
+    return questions
+
+
+# Streaming variants: yield a ("question", {...}) event per finished question,
+# then ("result", [...]). Same keyword arguments as generate_interview_questions.
+def stream_interview_questions(**kwargs):
+    return _stream_llm_chain(
+        INTERVIEW_QUESTIONS_PROMPT, _interview_question_inputs(**kwargs),
+        endpoint="generate_interview_questions", events=_question_events(),
+    )
+
+
+def astream_interview_questions(**kwargs):
+    return _astream_llm_chain(
+        INTERVIEW_QUESTIONS_PROMPT, _interview_question_inputs(**kwargs),
+        endpoint="generate_interview_questions", events=_question_events(),
+    )
+
+
+ANSWER_FEEDBACK_PROMPT = PromptTemplate(
+    input_variables=["resume_content", "jd_content", "question", "answer"],
+    template="""
         You are an expert technical interviewer.
 
         Given the candidate's resume, job description, interview question, and the candidate's answer, provide a comprehensive, structured feedback to help the candidate understand their performance and how to improve.
@@ -321,27 +1415,161 @@ def answer_feedback(
         - Do NOT wrap the JSON in markdown code blocks (no ```json or ```).
         - Ensure the JSON is valid and parsable by Python's json.loads().
         """
-    )
+)
+
 
+def answer_feedback(
+    resume_content: str,
+    jd_content: str,
+    question: str,
+    answer: str,
+    user_id: str = None
+    ):
+    resume_content, jd_content = _pack_context("answer_feedback", resume_content, jd_content)
     return _invoke_llm_chain(
-        prompt,
+        ANSWER_FEEDBACK_PROMPT,
         {
             "resume_content": resume_content,
             "jd_content": jd_content,
             "question": question,
             "answer": answer,
-        }
+        },
+        endpoint="answer_feedback",
+        semantic_parts=(question, answer),
+        user_id=user_id,
     )
 
 
-def generate_ideal_answer(
+async def aanswer_feedback(
     resume_content: str,
     jd_content: str,
-    question: str
+    question: str,
+    answer: str,
+    user_id: str = None
     ):
-    prompt = PromptTemplate(
-        input_variables=["resume_content", "jd_content", "question"],
-        template="""
+    resume_content, jd_content = _pack_context("answer_feedback", resume_content, jd_content)
+    return await _ainvoke_llm_chain(
+        ANSWER_FEEDBACK_PROMPT,
+        {
+            "resume_content": resume_content,
+            "jd_content": jd_content,
+            "question": question,
+            "answer": answer,
+        },
+        endpoint="answer_feedback",
+        semantic_parts=(question, answer),
+        user_id=user_id,
+    )
+
+
+# Feedback on a whole interview: the documents are packed once and the
+# answers evaluated concurrently, at most ANSWER_FEEDBACK_BATCH_CONCURRENCY
+# at a time. A failed item doesn't fail the batch.
+ANSWER_FEEDBACK_BATCH_CONCURRENCY = int(os.getenv("ANSWER_FEEDBACK_BATCH_CONCURRENCY", "4"))
+
+
+def _feedback_item(index: int, question: str, result) -> dict:
+    if isinstance(result, LLM_RETRY_LATER_ERRORS):
+        return {"index": index, "question": question, "error": str(result), "retry_after": result.retry_after}
+    if isinstance(result, BaseException):
+        return {"index": index, "question": question, "error": f"An error occurred during LLM invocation: {result}"}
+    if not isinstance(result, dict) or "error" in result:
+        error = result.get("error") if isinstance(result, dict) else "Unexpected output from model"
+        return {"index": index, "question": question, "error": error}
+    return {"index": index, "question": question, "feedback": result}
+
+
+def _aggregate_feedback(results: list) -> dict:
+    scores = []
+    for item in results:
+        score = item.get("feedback", {}).get("score_out_of_10")
+        try:
+            scores.append(float(score))
+        except (TypeError, ValueError):
+            continue
+    failed = sum(1 for item in results if "error" in item)
+    return {
+        "results": results,
+        "aggregate": {
+            "total": len(results),
+            "scored": len(scores),
+            "failed": failed,
+            "average_score": round(sum(scores) / len(scores), 1) if scores else None,
+        },
+    }
+
+
+def _feedback_batch_inputs(resume_content, jd_content, items: list) -> list:
+    resume_content, jd_content = _pack_context("answer_feedback", resume_content, jd_content)
+    return [
+        {
+            "resume_content": resume_content,
+            "jd_content": jd_content,
+            "question": item["question"],
+            "answer": item["answer"],
+        }
+        for item in items
+    ]
+
+
+def answer_feedback_batch(resume_content: str, jd_content: str, items: list, user_id: str = None):
+    """items: [{"question", "answer"}, ...]. Returns {"results": [...], "aggregate": {...}}."""
+    executor = _get_fanout_executor()
+    pending, results = {}, [None] * len(items)
+    for index, inputs in enumerate(_feedback_batch_inputs(resume_content, jd_content, items)):
+        if len(pending) >= ANSWER_FEEDBACK_BATCH_CONCURRENCY:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future
+        future = executor.submit(
+            metrics.bind(_invoke_llm_chain), ANSWER_FEEDBACK_PROMPT, inputs, endpoint="answer_feedback",
+            semantic_parts=(inputs["question"], inputs["answer"]), user_id=user_id,
+        )
+        pending[future] = index
+    for future, index in pending.items():
+        results[index] = future
+
+    outcomes = []
+    for future in results:
+        try:
+            outcomes.append(future.result())
+        except Exception as e:
+            outcomes.append(e)
+    # Items cut short by the deadline mean the caller has gone
+    deadlines.check("answer_feedback")
+    # Only a 503 if no answer got through at all
+    _raise_if_all_refused(outcomes)
+    return _aggregate_feedback([
+        _feedback_item(index, item["question"], result)
+        for index, (item, result) in enumerate(zip(items, outcomes))
+    ])
+
+
+async def aanswer_feedback_batch(resume_content: str, jd_content: str, items: list, user_id: str = None):
+    semaphore = asyncio.Semaphore(ANSWER_FEEDBACK_BATCH_CONCURRENCY)
+
+    async def evaluate(inputs):
+        async with semaphore:
+            return await _ainvoke_llm_chain(
+                ANSWER_FEEDBACK_PROMPT, inputs, endpoint="answer_feedback",
+                semantic_parts=(inputs["question"], inputs["answer"]), user_id=user_id,
+            )
+
+    results = await asyncio.gather(
+        *(evaluate(inputs) for inputs in _feedback_batch_inputs(resume_content, jd_content, items)),
+        return_exceptions=True,
+    )
+    # Only a 503 if no answer got through at all
+    _raise_if_all_refused(results)
+    return _aggregate_feedback([
+        _feedback_item(index, item["question"], result)
+        for index, (item, result) in enumerate(zip(items, results))
+    ])
+
+
+IDEAL_ANSWER_PROMPT = PromptTemplate(
+    input_variables=["resume_content", "jd_content", "question"],
+    template="""
         You are an expert technical interviewer and career coach.
 
         Given the candidate's resume, the job description, and an interview question, generate an ideal answer for the candidate. The answer should:
@@ -378,13 +1606,88 @@ def generate_ideal_answer(
         - Do NOT wrap the JSON in markdown code blocks (no ```json or ```).
         - Ensure the JSON is valid and parsable by Python's json.loads().
         """
-    )
+)
+
 
+def generate_ideal_answer(
+    resume_content: str,
+    jd_content: str,
+    question: str,
+    user_id: str = None
+    ):
+    resume_content, jd_content = _pack_context("generate_ideal_answer", resume_content, jd_content)
     return _invoke_llm_chain(
-        prompt,
+        IDEAL_ANSWER_PROMPT,
         {
             "resume_content": resume_content,
             "jd_content": jd_content,
             "question": question,
-        }
-    )
\ No newline at end of file
+        },
+        endpoint="generate_ideal_answer",
+        semantic_parts=(question,),
+        user_id=user_id,
+    )
+
+
+async def agenerate_ideal_answer(
+    resume_content: str,
+    jd_content: str,
+    question: str,
+    user_id: str = None
+    ):
+    resume_content, jd_content = _pack_context("generate_ideal_answer", resume_content, jd_content)
+    return await _ainvoke_llm_chain(
+        IDEAL_ANSWER_PROMPT,
+        {
+            "resume_content": resume_content,
+            "jd_content": jd_content,
+            "question": question,
+        },
+        endpoint="generate_ideal_answer",
+        semantic_parts=(question,),
+        user_id=user_id,
+    )
+
+
+# Streaming variants: yield ("bullet", {"field", "text"}) per finished bullet of
+# ideal_answer / explanation, then ("result", {...}).
+def stream_ideal_answer(
+    resume_content: str,
+    jd_content: str,
+    question: str,
+    user_id: str = None
+    ):
+    resume_content, jd_content = _pack_context("generate_ideal_answer", resume_content, jd_content)
+    return _stream_llm_chain(
+        IDEAL_ANSWER_PROMPT,
+        {
+            "resume_content": resume_content,
+            "jd_content": jd_content,
+            "question": question,
+        },
+        endpoint="generate_ideal_answer",
+        events=_bullet_events(),
+        semantic_parts=(question,),
+        user_id=user_id,
+    )
+
+
+def astream_ideal_answer(
+    resume_content: str,
+    jd_content: str,
+    question: str,
+    user_id: str = None
+    ):
+    resume_content, jd_content = _pack_context("generate_ideal_answer", resume_content, jd_content)
+    return _astream_llm_chain(
+        IDEAL_ANSWER_PROMPT,
+        {
+            "resume_content": resume_content,
+            "jd_content": jd_content,
+            "question": question,
+        },
+        endpoint="generate_ideal_answer",
+        events=_bullet_events(),
+        semantic_parts=(question,),
+        user_id=user_id,
+    )
@@ -0,0 +1,205 @@
+"""
+Exact-match cache for LLM responses.
+
+Responses are keyed by a hash of the prompt template, the normalized input
+dict and the model parameters, so a byte-for-byte repeat of a prompt we
+already answered (the same ideal-answer request, a retried question set)
+skips Groq. Entries expire after a TTL and the cache is an LRU bounded by
+entry count.
+
+Backends:
+  memory  per-process OrderedDict (default)
+  sqlite  a SQLite file at LLM_CACHE_PATH, shared by all workers on a host
+
+Only endpoints listed in LLM_CACHE_ENDPOINTS are cached.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def _normalize(value):
+    # Whitespace differences don't change the answer we'd get back
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+def make_key(template: str, input_data: dict, model_params: dict) -> str:
+    payload = json.dumps(
+        {"template": template, "inputs": _normalize(input_data), "model": model_params},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, ttl: float):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, latency, created = item
+            if time.time() - created > ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return json.loads(value), latency
+
+    def put(self, key: str, value, latency: float):
+        # Stored serialized, like the sqlite backend: callers mutate both the
+        # value they cached and the copies they get back
+        value = json.dumps(value)
+        with self._lock:
+            self._entries[key] = (value, latency, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, latency REAL NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed)")
+
+    def _connect(self):
+        # One connection per thread (and per process: workers fork after preload)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str, ttl: float):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, latency, created FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[2] > ttl:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE llm_cache SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0]), row[1]
+
+    def put(self, key: str, value, latency: float):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, latency, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value), latency, now, now),
+            )
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def size(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+
+class LLMResponseCache:
+    def __init__(self, backend, ttl_seconds: float, endpoints):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.endpoints = set(endpoints)
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def enabled_for(self, endpoint: str) -> bool:
+        return endpoint in self.endpoints
+
+    def get(self, endpoint: str, key: str):
+        try:
+            item = self.backend.get(key, self.ttl_seconds)
+        except sqlite3.Error as e:
+            print(f"[LLMCache] Lookup failed: {e}")
+            item = None
+        with self._lock:
+            stats = self._endpoint_stats(endpoint)
+            if item is None:
+                stats["misses"] += 1
+                return None
+            value, latency = item
+            stats["hits"] += 1
+            stats["saved_seconds"] += latency
+        print(f"[LLMCache] {endpoint}: hit, saved {latency:.2f}s")
+        return value
+
+    def put(self, key: str, value, latency: float):
+        try:
+            self.backend.put(key, value, latency)
+        except sqlite3.Error as e:
+            print(f"[LLMCache] Store failed: {e}")
+
+    def _endpoint_stats(self, endpoint: str) -> dict:
+        return self._stats.setdefault(endpoint, {"hits": 0, "misses": 0, "saved_seconds": 0.0})
+
+    def stats(self) -> dict:
+        with self._lock:
+            endpoints = {}
+            for name, values in self._stats.items():
+                lookups = values["hits"] + values["misses"]
+                endpoints[name] = {
+                    **values,
+                    "saved_seconds": round(values["saved_seconds"], 2),
+                    "hit_ratio": round(values["hits"] / lookups, 4) if lookups else 0.0,
+                }
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "ttl_seconds": self.ttl_seconds,
+            "endpoints": endpoints,
+        }
+
+
+def create_cache(backend: str, path: str, max_entries: int, ttl_seconds: float, endpoints) -> LLMResponseCache:
+    if backend == "sqlite":
+        store = SQLiteBackend(path, max_entries)
+    elif backend == "memory":
+        store = MemoryBackend(max_entries)
+    else:
+        raise ValueError(f"Unknown LLM_CACHE_BACKEND {backend!r} (expected memory or sqlite)")
+    return LLMResponseCache(store, ttl_seconds, endpoints)
@@ -0,0 +1,547 @@
+"""
+Resilience for calls to the LLM provider.
+
+ResilientChatModel wraps langchain_helper's ChatGroq (and optionally a
+smaller fallback model) and stands in for it, so every `prompt | llm`
+chain, stream and JSON repair goes through it:
+
+- token buckets pace calls under the provider's request and token rate
+  limits (LLM_RATE_LIMIT_RPM / _TPM) instead of discovering them by 429;
+- transient failures (429, 5xx, timeouts, connection errors) are retried
+  with full-jitter exponential backoff, never sooner than Retry-After;
+- a call still running past the endpoint's recent p95 latency (or the
+  LLM_HEDGE_PERCENTILE chosen) is hedged with a second identical call, and
+  the first answer wins;
+- a circuit breaker opens after consecutive failures other than 429s;
+  while it is open calls fail fast with LLMUnavailableError, or go to the
+  fallback model;
+- the fallback model also answers once the primary is out of retries.
+
+Every wait is bounded by the call's `timeout`, which langchain_helper sets
+from the request deadline. Streams are retried only until their first
+chunk, and are never hedged. The sync path cannot cancel the losing half
+of a hedge; it finishes in the background and is ignored.
+"""
+import asyncio
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Optional
+
+import groq
+from langchain_core.language_models.chat_models import BaseChatModel
+from prometheus_client import Counter
+
+import context_packer
+
+EVENTS = Counter(
+    "prepmate_llm_client_events", "Retries, hedges, fallbacks and fast failures of LLM calls", ["event"]
+)
+
+# Recent latencies kept per endpoint, and how many are needed before hedging
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+
+class LLMUnavailableError(Exception):
+    """The provider is failing or rate limited and there is no fallback."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_transient(error: Exception) -> bool:
+    """Worth retrying: rate limits, server errors, timeouts and dropped connections."""
+    if isinstance(error, (groq.APIConnectionError, TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    return status in (408, 409, 429) or (status is not None and status >= 500)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait, from retry-after-ms or retry-after."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return float(headers[name]) * scale
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+def _describe(error: Exception) -> str:
+    status = getattr(error, "status_code", None)
+    return f"{type(error).__name__}{f' {status}' if status else ''}: {str(error)[:200]}"
+
+
+class TokenBucket:
+    """`per_minute` units refilled evenly, bursting to one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self._tokens = per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, cost: float, max_wait: float = None) -> Optional[float]:
+        """
+        Take `cost` units and return how long to wait before using them, or
+        None (taking nothing) if that would be longer than max_wait. The
+        balance may go negative, so later callers queue behind this one.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            delay = max(min(cost, self.capacity) - self._tokens, 0) / self.rate
+            if max_wait is not None and delay > max_wait:
+                return None
+            self._tokens -= min(cost, self.capacity)
+            return delay
+
+    def wait_time(self, cost: float) -> float:
+        with self._lock:
+            tokens = min(self.capacity, self._tokens + (time.monotonic() - self._updated) * self.rate)
+            return max(min(cost, self.capacity) - tokens, 0) / self.rate
+
+    def refund(self, cost: float):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + min(cost, self.capacity))
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures (0 = never).
+    After `reset_seconds` one probe call is let through (half_open); its
+    outcome closes the breaker or opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.times_opened = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    return False
+                self.state = "half_open"
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def retry_after(self) -> int:
+        remaining = self.reset_seconds - (time.monotonic() - self._opened_at)
+        return max(1, math.ceil(remaining))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                print("[LLM Client] Circuit closed")
+            self.state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == "half_open" or (
+                self.state == "closed" and self.failure_threshold and self._failures >= self.failure_threshold
+            ):
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self.times_opened += 1
+                print(f"[LLM Client] Circuit open after {self._failures} failures; "
+                      f"retrying the provider in {self.reset_seconds:.0f}s")
+
+    def release(self):
+        # The call ended without telling us anything about the provider
+        with self._lock:
+            self._probing = False
+
+
+class LatencyTracker:
+    """Recent successful call durations per endpoint, for the hedge delay."""
+
+    def __init__(self):
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(endpoint, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def percentile(self, endpoint: str, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(endpoint, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * q / 100))]
+
+    def summary(self, q: float) -> dict:
+        with self._lock:
+            endpoints = list(self._samples)
+        return {endpoint: self.percentile(endpoint, q) for endpoint in endpoints}
+
+
+_hedge_executor = None
+_hedge_lock = threading.Lock()
+_counts_lock = threading.Lock()
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    # Created lazily so gunicorn workers don't inherit the master's threads
+    global _hedge_executor
+    with _hedge_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+        return _hedge_executor
+
+
+def _call_kwargs(kwargs: dict, timeout):
+    # `None` would mean "no timeout" to the Groq client, not "its default"
+    kwargs = {key: value for key, value in kwargs.items() if key not in ("timeout", "endpoint")}
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    return kwargs
+
+
+class ResilientChatModel(BaseChatModel):
+    """Calls `primary` (or `fallback`) with the policies above; see the module docstring."""
+
+    primary: BaseChatModel
+    fallback: Optional[BaseChatModel] = None
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    requests_per_minute: float = 0
+    tokens_per_minute: float = 0
+    # 0 disables hedging
+    hedge_percentile: float = 0
+    breaker_threshold: int = 5
+    breaker_reset_seconds: float = 30
+    breaker: Any = None
+    latency: Any = None
+    request_bucket: Any = None
+    token_bucket: Any = None
+    counts: Any = None
+
+    def model_post_init(self, __context):
+        self.breaker = CircuitBreaker(self.breaker_threshold, self.breaker_reset_seconds)
+        self.latency = LatencyTracker()
+        self.request_bucket = TokenBucket(self.requests_per_minute) if self.requests_per_minute else None
+        self.token_bucket = TokenBucket(self.tokens_per_minute) if self.tokens_per_minute else None
+        self.counts = {
+            "calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "fallbacks": 0,
+            "fast_failures": 0, "rate_limited": 0, "rate_limit_wait_seconds": 0.0,
+        }
+
+    @property
+    def _llm_type(self) -> str:
+        return f"resilient-{self.primary._llm_type}"
+
+    @property
+    def model_name(self) -> str:
+        return self.primary.model_name
+
+    @property
+    def temperature(self) -> float:
+        return self.primary.temperature
+
+    def _count(self, event: str, amount: float = 1):
+        with _counts_lock:
+            self.counts[event] += amount
+        if event != "rate_limit_wait_seconds":
+            EVENTS.labels(event).inc(amount)
+
+    @staticmethod
+    def _remaining(started: float, timeout):
+        return None if timeout is None else timeout - (time.monotonic() - started)
+
+    def _cost(self, messages) -> int:
+        if self.token_bucket is None:
+            return 0
+        return sum(context_packer.count_tokens(str(message.content)) for message in messages)
+
+
+    def _reserve(self, cost: int, max_wait) -> Optional[float]:
+        # Seconds to wait for a request slot and `cost` prompt tokens, or None
+        # (taking neither) if that is longer than max_wait
+        taken, delay = [], 0.0
+        for bucket, units in ((self.request_bucket, 1), (self.token_bucket, cost)):
+            if bucket is None:
+                continue
+            bucket_delay = bucket.reserve(units, max_wait)
+            if bucket_delay is None:
+                for other, other_units in taken:
+                    other.refund(other_units)
+                return None
+            taken.append((bucket, units))
+            delay = max(delay, bucket_delay)
+        if delay:
+            self._count("rate_limited")
+            self._count("rate_limit_wait_seconds", delay)
+        return delay
+
+    def _rate_limited(self, cost: int) -> LLMUnavailableError:
+        waits = [
+            bucket.wait_time(units)
+            for bucket, units in ((self.request_bucket, 1), (self.token_bucket, cost))
+            if bucket is not None
+        ]
+        return LLMUnavailableError("LLM rate limit reached, please retry later", max(1, math.ceil(max(waits))))
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after(error) or 0)
+
+    def _hedge_delay(self, endpoint: str, timeout):
+        if not self.hedge_percentile:
+            return None
+        delay = self.latency.percentile(endpoint, self.hedge_percentile)
+        if delay is None or (timeout is not None and delay >= timeout):
+            return None
+        return delay
+
+    def _failed(self, error: Exception, attempt: int, started: float, timeout):
+        """Backoff before the next attempt, or None to stop retrying (raising if the error isn't the provider's)."""
+        remaining = self._remaining(started, timeout)
+        if not is_transient(error) or (remaining is not None and remaining <= 0):
+            # A bad request, or the request's own deadline running out: not the provider's fault
+            self.breaker.release()
+            raise error
+        if getattr(error, "status_code", None) == 429:
+            # Throttled, not degraded: pacing and Retry-After deal with it
+            self.breaker.release()
+        else:
+            self.breaker.record_failure()
+        backoff = self._backoff(attempt, error)
+        if attempt == self.max_retries or (remaining is not None and backoff >= remaining):
+            print(f"[LLM Client] {_describe(error)}; giving up after {attempt + 1} attempt(s)")
+            return None
+        self._count("retries")
+        print(f"[LLM Client] {_describe(error)}; retry {attempt + 1} in {backoff:.2f}s")
+        return backoff
+
+    def _unavailable(self, error: Exception):
+        if error is None:
+            self._count("fast_failures")
+            return LLMUnavailableError("LLM provider unavailable, please retry later", self.breaker.retry_after())
+        return error
+
+    def _can_fall_back(self, started: float, timeout) -> bool:
+        remaining = self._remaining(started, timeout)
+        if self.fallback is None or (remaining is not None and remaining <= 0):
+            return False
+        self._count("fallbacks")
+        print(f"[LLM Client] Falling back to {getattr(self.fallback, 'model_name', 'the fallback model')}")
+        return True
+
+    # -- sync
+
+    def _timed(self, run, endpoint: str, timeout, record: bool):
+        started = time.monotonic()
+        result = run(self.primary, timeout)
+        if record:
+            self.latency.record(endpoint, time.monotonic() - started)
+        return result
+
+    def _attempt(self, run, endpoint: str, cost: int, timeout, generate: bool):
+        # One call to the primary, hedged once it runs past the endpoint's usual latency
+        delay = self._hedge_delay(endpoint, timeout) if generate else None
+        if delay is None:
+            return self._timed(run, endpoint, timeout, generate)
+        started = time.monotonic()
+        executor = _get_hedge_executor()
+        first = executor.submit(self._timed, run, endpoint, timeout, True)
+        done, _ = wait([first], timeout=delay)
+        remaining = self._remaining(started, timeout)
+        if done or (remaining is not None and remaining <= 0) or self._reserve(cost, 0) is None:
+            return first.result()
+        self._count("hedges")
+        second = executor.submit(self._timed, run, endpoint, remaining, True)
+        pending, error = {first, second}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _call(self, run, messages, kwargs: dict, generate: bool):
+        """run(model, timeout) with pacing, retries, hedging and the fallback."""
+        timeout, endpoint = kwargs.get("timeout"), kwargs.get("endpoint") or "default"
+        started = time.monotonic()
+        cost = self._cost(messages)
+        self._count("calls")
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                break
+            delay = self._reserve(cost, self._remaining(started, timeout))
+            if delay is None:
+                self.breaker.release()
+                error = self._rate_limited(cost)
+                break
+            time.sleep(delay)
+            try:
+                result = self._attempt(run, endpoint, cost, self._remaining(started, timeout), generate)
+            except Exception as e:
+                backoff = self._failed(e, attempt, started, timeout)
+                error = e
+                if backoff is None:
+                    break
+                time.sleep(backoff)
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+        if self._can_fall_back(started, timeout):
+            return run(self.fallback, self._remaining(started, timeout))
+        raise self._unavailable(error)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        def run(model, timeout):
+            return model._generate(messages, stop=stop, **_call_kwargs(kwargs, timeout))
+        return self._call(run, messages, kwargs, generate=True)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        def run(model, timeout):
+            chunks = model._stream(messages, stop=stop, run_manager=run_manager, **_call_kwargs(kwargs, timeout))
+            return next(chunks, None), chunks
+
+        first, chunks = self._call(run, messages, kwargs, generate=False)
+        try:
+            if first is not None:
+                yield first
+                yield from chunks
+        finally:
+            chunks.close()
+
+    # -- async
+
+    async def _atimed(self, run, endpoint: str, timeout, record: bool):
+        started = time.monotonic()
+        result = await run(self.primary, timeout)
+        if record:
+            self.latency.record(endpoint, time.monotonic() - started)
+        return result
+
+    async def _aattempt(self, run, endpoint: str, cost: int, timeout, generate: bool):
+        delay = self._hedge_delay(endpoint, timeout) if generate else None
+        if delay is None:
+            return await self._atimed(run, endpoint, timeout, generate)
+        started = time.monotonic()
+        first = asyncio.ensure_future(self._atimed(run, endpoint, timeout, True))
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            remaining = self._remaining(started, timeout)
+            if done or (remaining is not None and remaining <= 0) or self._reserve(cost, 0) is None:
+                return await first
+            self._count("hedges")
+            second = asyncio.ensure_future(self._atimed(run, endpoint, remaining, True))
+            pending, error = {first, second}, None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The loser, or both if the request itself was cancelled
+            for task in pending:
+                task.cancel()
+
+    async def _acall(self, run, messages, kwargs: dict, generate: bool):
+        timeout, endpoint = kwargs.get("timeout"), kwargs.get("endpoint") or "default"
+        started = time.monotonic()
+        cost = self._cost(messages)
+        self._count("calls")
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                break
+            delay = self._reserve(cost, self._remaining(started, timeout))
+            if delay is None:
+                self.breaker.release()
+                error = self._rate_limited(cost)
+                break
+            try:
+                await asyncio.sleep(delay)
+                result = await self._aattempt(run, endpoint, cost, self._remaining(started, timeout), generate)
+            except Exception as e:
+                backoff = self._failed(e, attempt, started, timeout)
+                error = e
+                if backoff is None:
+                    break
+                await asyncio.sleep(backoff)
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+        if self._can_fall_back(started, timeout):
+            return await run(self.fallback, self._remaining(started, timeout))
+        raise self._unavailable(error)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        async def run(model, timeout):
+            return await model._agenerate(messages, stop=stop, **_call_kwargs(kwargs, timeout))
+        return await self._acall(run, messages, kwargs, generate=True)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        async def run(model, timeout):
+            chunks = model._astream(messages, stop=stop, run_manager=run_manager, **_call_kwargs(kwargs, timeout))
+            try:
+                return await chunks.__anext__(), chunks
+            except StopAsyncIteration:
+                return None, chunks
+
+        first, chunks = await self._acall(run, messages, kwargs, generate=False)
+        try:
+            if first is not None:
+                yield first
+                async for chunk in chunks:
+                    yield chunk
+        finally:
+            await chunks.aclose()
+
+    def stats(self) -> dict:
+        hedge_q = self.hedge_percentile or 95
+        return {
+            "primary_model": self.model_name,
+            "fallback_model": getattr(self.fallback, "model_name", None),
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.times_opened,
+            **{key: round(value, 2) if isinstance(value, float) else value for key, value in dict(self.counts).items()},
+            f"p{hedge_q:g}_latency_ms": {
+                endpoint: round(seconds * 1000) for endpoint, seconds in self.latency.summary(hedge_q).items()
+                if seconds is not None
+            },
+        }
@@ -0,0 +1,64 @@
+"""
+Admission control for LLM calls in the async serving mode.
+
+At most `max_concurrent` calls run at once. Further callers wait in a queue
+of at most `max_queue`; once that is full, new callers fail fast with
+LLMOverloadedError, which the routes turn into a 503 with Retry-After.
+"""
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+
+
+class LLMOverloadedError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("LLM capacity exhausted, please retry later")
+        self.retry_after = retry_after
+
+
+class LLMLimiter:
+    def __init__(self, max_concurrent: int, max_queue: int):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._in_flight = 0
+        self._waiting = 0
+        self._rejected = 0
+        # Moving average of call duration, used to estimate Retry-After
+        self._avg_seconds = 5.0
+
+    def retry_after(self) -> int:
+        backlog = self._in_flight + self._waiting
+        return max(1, math.ceil(self._avg_seconds * backlog / self.max_concurrent))
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self._rejected += 1
+            raise LLMOverloadedError(self.retry_after())
+
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+            self._avg_seconds = 0.9 * self._avg_seconds + 0.1 * (time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "rejected": self._rejected,
+            "avg_call_seconds": round(self._avg_seconds, 2),
+        }
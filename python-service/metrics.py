@@ -0,0 +1,209 @@
+"""
+Per-request stage timings, LLM token counts, payload sizes and memory.
+
+Code marks its stages with `with metrics.span("embed"):`. Every span is
+observed in a Prometheus histogram (served on /metrics); inside a request
+it is also collected on that request's RequestMetrics, which both apps
+turn into a Server-Timing header and, for requests slower than
+METRICS_SLOW_REQUEST_SECONDS (sampled at METRICS_SLOW_SAMPLE_RATE), a log
+line with the full breakdown.
+
+  documents     reading and processing the resume and JD (both apps)
+  pdf_parse     pypdf text extraction
+  split         text splitting
+  embed         chunk embedding
+  index         vector store build and profile ranking
+  retrieval     extract_info / extract_profile
+  pack_context  token-aware context packing
+  ats_score     local ATS scoring
+  cache_lookup  exact and semantic response cache lookups
+  llm           one LLM call or stream (labelled with the endpoint)
+  parse_output  JSON parsing, validation and repair
+
+The current request travels in a contextvar. Work handed to a thread pool
+keeps it only when submitted through bind(). Peak memory is the highest
+RSS sampled at the request's span boundaries.
+
+With several gunicorn workers, point PROMETHEUS_MULTIPROC_DIR at an empty
+directory so /metrics aggregates all of them (see gunicorn.conf.py).
+"""
+import contextvars
+import functools
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+
+SLOW_REQUEST_SECONDS = float(os.getenv("METRICS_SLOW_REQUEST_SECONDS", "5"))
+SLOW_SAMPLE_RATE = float(os.getenv("METRICS_SLOW_SAMPLE_RATE", "1.0"))
+
+REQUEST_SECONDS = Histogram(
+    "prepmate_request_seconds", "End-to-end request latency", ["route", "method", "status"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120),
+)
+STAGE_SECONDS = Histogram(
+    "prepmate_stage_seconds", "Latency of one pipeline stage", ["stage", "endpoint"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+LLM_TOKENS = Histogram(
+    "prepmate_llm_tokens", "Prompt and completion tokens per LLM call", ["endpoint", "kind"],
+    buckets=(50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000),
+)
+PAYLOAD_BYTES = Histogram(
+    "prepmate_payload_bytes", "Request and response body sizes", ["route", "direction"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+)
+PEAK_RSS_BYTES = Histogram(
+    "prepmate_request_peak_rss_bytes", "Highest process RSS sampled during a request", ["route"],
+    buckets=tuple(mb * 1024 * 1024 for mb in (128, 256, 384, 512, 768, 1024, 1536, 2048, 3072, 4096)),
+)
+SLOW_REQUESTS = Counter("prepmate_slow_requests", "Requests over METRICS_SLOW_REQUEST_SECONDS", ["route"])
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_current = contextvars.ContextVar("prepmate_request_metrics", default=None)
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        # No procfs: fall back to the process high-water mark (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RequestMetrics:
+    def __init__(self, method: str, route: str, request_bytes: int):
+        self.method = method
+        self.route = route
+        self.request_bytes = request_bytes
+        self.response_bytes = 0
+        self.started = time.perf_counter()
+        self.spans = []
+        self.tokens = {"prompt": 0, "completion": 0}
+        self.peak_rss = _rss_bytes()
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def add_span(self, stage: str, endpoint: str, seconds: float):
+        rss = _rss_bytes()
+        with self._lock:
+            self.spans.append((stage, endpoint, seconds))
+            self.peak_rss = max(self.peak_rss, rss)
+
+    def add_tokens(self, prompt: int, completion: int):
+        with self._lock:
+            self.tokens["prompt"] += prompt
+            self.tokens["completion"] += completion
+
+    def stages(self) -> dict:
+        """stage -> {"ms", "count"}; concurrent spans (resume and JD) both count."""
+        with self._lock:
+            spans = list(self.spans)
+        totals = {}
+        for stage, _, seconds in spans:
+            entry = totals.setdefault(stage, {"ms": 0.0, "count": 0})
+            entry["ms"] += seconds * 1000
+            entry["count"] += 1
+        return totals
+
+    def server_timing(self) -> str:
+        parts = [
+            f'{stage};dur={values["ms"]:.1f}' + (f';desc="{values["count"]} calls"' if values["count"] > 1 else "")
+            for stage, values in self.stages().items()
+        ]
+        if self.tokens["prompt"] or self.tokens["completion"]:
+            parts.append(f'tokens;desc="prompt={self.tokens["prompt"]} completion={self.tokens["completion"]}"')
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+    def summary(self, status: int, elapsed: float) -> dict:
+        with self._lock:
+            spans = [
+                {"stage": stage, **({"endpoint": endpoint} if endpoint else {}), "ms": round(seconds * 1000, 1)}
+                for stage, endpoint, seconds in self.spans
+            ]
+        return {
+            "method": self.method,
+            "route": self.route,
+            "status": status,
+            "seconds": round(elapsed, 3),
+            "stages": {stage: round(values["ms"], 1) for stage, values in self.stages().items()},
+            "spans": spans,
+            "tokens": dict(self.tokens),
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "peak_rss_mb": round(self.peak_rss / (1024 * 1024), 1),
+        }
+
+
+def start_request(method: str, route: str, request_bytes: int) -> RequestMetrics:
+    request = RequestMetrics(method, route, request_bytes)
+    _current.set(request)
+    return request
+
+
+def current() -> RequestMetrics:
+    return _current.get()
+
+
+def finish_request(request: RequestMetrics, status: int):
+    if request.finished:
+        return
+    request.finished = True
+    elapsed = time.perf_counter() - request.started
+    REQUEST_SECONDS.labels(request.route, request.method, str(status)).observe(elapsed)
+    PAYLOAD_BYTES.labels(request.route, "request").observe(request.request_bytes)
+    PAYLOAD_BYTES.labels(request.route, "response").observe(request.response_bytes)
+    PEAK_RSS_BYTES.labels(request.route).observe(request.peak_rss)
+    if elapsed >= SLOW_REQUEST_SECONDS:
+        SLOW_REQUESTS.labels(request.route).inc()
+        if random.random() < SLOW_SAMPLE_RATE:
+            print(f"[Metrics] Slow request {json.dumps(request.summary(status, elapsed))}")
+    if _current.get() is request:
+        _current.set(None)
+
+
+@contextmanager
+def span(stage: str, endpoint: str = None):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage, endpoint or "").observe(elapsed)
+        request = _current.get()
+        if request is not None:
+            request.add_span(stage, endpoint, elapsed)
+
+
+def record_tokens(endpoint: str, prompt: int, completion: int):
+    LLM_TOKENS.labels(endpoint or "other", "prompt").observe(prompt)
+    LLM_TOKENS.labels(endpoint or "other", "completion").observe(completion)
+    request = _current.get()
+    if request is not None:
+        request.add_tokens(prompt, completion)
+
+
+def bind(fn):
+    """fn, run in a copy of the current context: submit this to thread pools."""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+def render():
+    """The /metrics body and its content type."""
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
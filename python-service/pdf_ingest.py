@@ -0,0 +1,86 @@
+"""
+In-memory PDF ingestion.
+
+Uploaded PDFs are read straight from the request stream and parsed with
+pypdf, so nothing touches the disk and concurrent requests can't clobber
+each other's files. Large PDFs have their pages extracted in parallel
+on a small thread pool, and limits on bytes, pages and characters keep
+a single oversized upload from stalling a worker.
+"""
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pypdf import PdfReader
+
+
+MAX_PDF_BYTES = int(os.getenv("MAX_PDF_BYTES", str(10 * 1024 * 1024)))
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "40"))
+# Also bounds the chunks per document; keep MAX_DOC_CHARS / CHUNK_SIZE above
+# retrieval.FAISS_MIN_CHUNKS so the largest documents use the FAISS store.
+MAX_DOC_CHARS = int(os.getenv("MAX_DOC_CHARS", "150000"))
+PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", "8"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class DocumentTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured byte or page limits."""
+
+
+def _get_executor():
+    # Created lazily so worker threads are never forked along with a preloaded app.
+    # Threads, not processes: a spawned or forkserver worker re-imports the
+    # parent's __main__ (app.py under `python app.py`) and with it the models.
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PDF_WORKERS, thread_name_prefix="pdf-pages")
+        return _executor
+
+
+def read_pdf_bytes(source) -> bytes:
+    """Read a PDF from bytes or a file-like object, enforcing MAX_PDF_BYTES."""
+    if isinstance(source, (bytes, bytearray)):
+        data = bytes(source)
+    else:
+        data = source.read(MAX_PDF_BYTES + 1)
+    if len(data) > MAX_PDF_BYTES:
+        raise DocumentTooLargeError(f"PDF exceeds the {MAX_PDF_BYTES // (1024 * 1024)} MB limit")
+    return data
+
+
+def _extract_page_range(data: bytes, start: int, end: int) -> list:
+    reader = PdfReader(io.BytesIO(data))
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def extract_pages(data: bytes) -> list:
+    """Return the text of each page, truncated once MAX_DOC_CHARS is reached."""
+    reader = PdfReader(io.BytesIO(data))
+    num_pages = len(reader.pages)
+    if num_pages > MAX_PDF_PAGES:
+        raise DocumentTooLargeError(f"PDF has {num_pages} pages; the limit is {MAX_PDF_PAGES}")
+
+    if num_pages >= PARALLEL_PAGE_THRESHOLD and PDF_WORKERS > 1:
+        step = -(-num_pages // PDF_WORKERS)
+        futures = [
+            _get_executor().submit(_extract_page_range, data, start, min(start + step, num_pages))
+            for start in range(0, num_pages, step)
+        ]
+        pages = [text for future in futures for text in future.result()]
+    else:
+        pages = [page.extract_text() or "" for page in reader.pages]
+
+    # Enforce the character budget across pages
+    kept, total = [], 0
+    for text in pages:
+        if total + len(text) > MAX_DOC_CHARS:
+            kept.append(text[:MAX_DOC_CHARS - total])
+            break
+        kept.append(text)
+        total += len(text)
+    return kept
@@ -0,0 +1,336 @@
+"""
+Rank a directory of resume PDFs against one job description, offline.
+
+    python rank_resumes.py --jd jd.pdf --resumes resumes/ --output ranking.jsonl [--top 25]
+
+The job description is parsed and embedded once. Resumes then flow through
+three overlapping stages, so PDF parsing, embedding and LLM calls all stay
+busy:
+
+  parse    pypdf text extraction in a process pool (--parse-workers)
+  embed    chunking, embedding and a local pre-score in a thread pool
+           (--embed-workers; the embedding batcher coalesces its calls).
+           The pre-score weighs the ATS skill and keyword scores and the
+           cosine similarity of the resume and JD embeddings (PRESCORE_WEIGHTS).
+  analyze  the full LLM resume analysis (lch.resume_analysis) for the
+           resumes the pre-score selects (--llm-workers)
+
+--top N analyzes the N best pre-scored resumes, which waits until every
+resume has been pre-scored; --min-prescore S analyzes each resume scoring
+at least S as soon as it is scored. With neither, every resume is
+analyzed; --prescreen-only skips the LLM altogether.
+
+Every resume gets one row in the output (.jsonl or .csv, by extension or
+--format), written as soon as its result is known, with status "analyzed",
+"prescreened" (not selected for analysis) or "error". Rows are keyed by
+the SHA-256 of the PDF: re-running with the same --output skips resumes
+that already have a row (errors are retried) and appends the rest. In
+--top mode, resumes analyzed by earlier runs count toward N.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import numpy as np
+
+import pdf_ingest
+
+
+PRESCORE_WEIGHTS = {"skills_match": 0.5, "keyword_match": 0.3, "similarity": 0.2}
+
+CSV_FIELDS = [
+    "file", "sha256", "status", "prescore", "skills_match", "keyword_match", "similarity",
+    "total_score", "final_assessment", "missing_skills", "error",
+]
+
+
+def _init_parse_worker():
+    # The pool is the parallelism; don't nest pdf_ingest's page pool in every worker
+    pdf_ingest.PDF_WORKERS = 1
+
+
+def parse_pdf(path: str) -> str:
+    with open(path, "rb") as f:
+        data = pdf_ingest.read_pdf_bytes(f)
+    return "\n".join(pdf_ingest.extract_pages(data))
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ResultWriter:
+    """Appends one row per resume to a JSONL or CSV file, flushed as it is written."""
+
+    def __init__(self, path: str, fmt: str):
+        self.path = path
+        self.format = fmt
+        # sha256 -> row, for every finished (non-error) row so far
+        self.rows = self._read_existing()
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", encoding="utf-8", newline="")
+        self._csv = None
+        if fmt == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            if new_file:
+                self._csv.writeheader()
+                self._file.flush()
+
+    def _existing_rows(self, f):
+        if self.format == "csv":
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A run killed mid-write can leave a truncated last line
+                continue
+
+    def _read_existing(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        rows = {}
+        with open(self.path, encoding="utf-8", newline="") as f:
+            for row in self._existing_rows(f):
+                if isinstance(row, dict) and row.get("sha256") and row.get("status") != "error":
+                    rows[row["sha256"]] = row
+        return rows
+
+    def write(self, row: dict):
+        if self._csv is not None:
+            self._csv.writerow({
+                key: "; ".join(value) if isinstance(value, list) else value for key, value in row.items()
+            })
+        else:
+            self._file.write(json.dumps(row) + "\n")
+        self._file.flush()
+        if row["status"] != "error":
+            self.rows[row["sha256"]] = row
+
+    def close(self):
+        self._file.close()
+
+
+class Ranker:
+    """Scores resumes against one job description, ingested once."""
+
+    def __init__(self, lch, jd_text: str, mode: str = None):
+        self.lch = lch
+        self.jd_text = jd_text
+        self.mode = mode
+        jd_entry = lch.ingest_text(jd_text)
+        self.jd_info = lch.extract_profile(jd_entry, "resume_analysis.jd")
+        self.jd_centroid = self._centroid(jd_entry)
+
+    def _centroid(self, entry):
+        vectors = entry.vectors
+        if vectors is None:
+            # Passthrough documents skip embedding at ingestion
+            vectors = np.asarray(self.lch.embeddings.embed_documents(entry.chunks), dtype=np.float32)
+        centroid = vectors.mean(axis=0)
+        return centroid / max(float(np.linalg.norm(centroid)), 1e-12)
+
+    def prescore(self, text: str):
+        """Return (scores, retrieved resume content for the analysis prompt)."""
+        if not text.strip():
+            raise ValueError("no extractable text (scanned PDF?)")
+        entry = self.lch.ingest_text(text)
+        ats = self.lch.ats_scorer.score(text, self.jd_text)
+        similarity = float(self._centroid(entry) @ self.jd_centroid)
+        scores = {
+            "skills_match": ats["skills_match"],
+            "keyword_match": ats["keyword_match"],
+            "similarity": int(round(100 * max(similarity, 0.0))),
+        }
+        scores["prescore"] = round(sum(weight * scores[key] for key, weight in PRESCORE_WEIGHTS.items()), 1)
+        scores["missing_skills"] = ats["missing_skills"]
+        return scores, self.lch.extract_profile(entry, "resume_analysis.resume")
+
+    def analyze(self, resume_info):
+        return self.lch.resume_analysis(resume_info, self.jd_info, mode=self.mode)
+
+
+def _row(task: dict, status: str, analysis: dict = None, error: str = None) -> dict:
+    row = {"file": task["file"], "sha256": task["sha256"], "status": status}
+    row.update(task.get("scores") or {})
+    if analysis is not None and "error" not in analysis:
+        ats = analysis.get("ats_score") or {}
+        row["total_score"] = ats.get("total_score")
+        row["final_assessment"] = ats.get("final_assessment")
+        row["analysis"] = analysis
+    if error:
+        row["error"] = error
+    return row
+
+
+def load_jd(args) -> str:
+    if args.jd_text:
+        return args.jd_text
+    if args.jd.lower().endswith(".pdf"):
+        return parse_pdf(args.jd)
+    with open(args.jd, encoding="utf-8") as f:
+        return f.read()
+
+
+def find_resumes(directory: str) -> list:
+    return sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(directory)
+        for name in names
+        if name.lower().endswith(".pdf")
+    )
+
+
+def run(args):
+    started = time.perf_counter()
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    writer = ResultWriter(args.output, fmt)
+
+    tasks, seen = [], set()
+    for path in find_resumes(args.resumes):
+        digest = file_digest(path)
+        if digest in writer.rows or digest in seen:
+            continue
+        seen.add(digest)
+        tasks.append({"file": os.path.relpath(path, args.resumes), "path": path, "sha256": digest})
+    print(f"[Rank] {len(tasks)} resumes to process, {len(writer.rows)} already in {args.output}")
+    if not tasks:
+        writer.close()
+        return
+
+    # Spawned workers import only this module and pdf_ingest, never the models
+    parse_pool = ProcessPoolExecutor(
+        max_workers=args.parse_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_parse_worker,
+    )
+    # Parsing starts right away, while the models load below
+    stages = {parse_pool.submit(parse_pdf, task["path"]): ("parse", task) for task in tasks}
+
+    import langchain_helper as lch
+
+    lch.warm_up()
+    ranker = Ranker(lch, load_jd(args), mode=args.mode)
+    embed_pool = ThreadPoolExecutor(max_workers=args.embed_workers, thread_name_prefix="rank-embed")
+    llm_pool = ThreadPoolExecutor(max_workers=args.llm_workers, thread_name_prefix="rank-llm")
+
+    held = [] if args.top is not None else None
+    analyzed_before = sum(row.get("status") == "analyzed" for row in writer.rows.values())
+    written = 0
+
+    def emit(row):
+        nonlocal written
+        written += 1
+        writer.write(row)
+        detail = f" prescore={row['prescore']}" if "prescore" in row else ""
+        if row.get("total_score") is not None:
+            detail += f" total_score={row['total_score']}"
+        if row.get("error"):
+            detail += f" error={row['error']}"
+        print(f"[Rank] {written}/{len(tasks)} {row['status']} {row['file']}{detail}")
+
+    def analyze(task):
+        stages[llm_pool.submit(ranker.analyze, task["info"])] = ("analyze", task)
+
+    try:
+        while stages:
+            done, _ = wait(stages, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, task = stages.pop(future)
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    emit(_row(task, "error", error=f"{stage} failed: {exc}"))
+                    continue
+
+                if stage == "parse":
+                    stages[embed_pool.submit(ranker.prescore, result)] = ("embed", task)
+                elif stage == "embed":
+                    task["scores"], task["info"] = result
+                    below = args.min_prescore is not None and task["scores"]["prescore"] < args.min_prescore
+                    if args.prescreen_only or below:
+                        emit(_row(task, "prescreened"))
+                    elif held is not None:
+                        held.append(task)
+                    else:
+                        analyze(task)
+                else:
+                    error = result.get("error") if isinstance(result, dict) else "Unexpected output from model"
+                    emit(_row(task, "error" if error else "analyzed", analysis=result, error=error))
+
+            if held is not None and not any(stage != "analyze" for stage, _ in stages.values()):
+                # Every resume is pre-scored: analyze the best, release the rest
+                held.sort(key=lambda task: task["scores"]["prescore"], reverse=True)
+                slots = max(args.top - analyzed_before, 0)
+                for task in held[:slots]:
+                    analyze(task)
+                for task in held[slots:]:
+                    emit(_row(task, "prescreened"))
+                held = None
+    except KeyboardInterrupt:
+        print("[Rank] Interrupted; rerun with the same --output to resume")
+        raise
+    finally:
+        for pool in (parse_pool, embed_pool, llm_pool):
+            pool.shutdown(wait=False, cancel_futures=True)
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"[Rank] {written} resumes in {elapsed:.1f}s ({60 * written / elapsed:.1f}/min)")
+    print_ranking(writer.rows.values(), args.show)
+
+
+def print_ranking(rows, limit: int):
+    def sort_key(row):
+        total = _number(row.get("total_score"))
+        return (total is not None, total or 0.0, _number(row.get("prescore")) or 0.0)
+
+    ranked = sorted(rows, key=sort_key, reverse=True)[:limit]
+    if not ranked:
+        return
+    print(f"\n{'rank':>4}  {'total':>5}  {'pre':>5}  file")
+    for position, row in enumerate(ranked, 1):
+        total = _number(row.get("total_score"))
+        prescore = _number(row.get("prescore"))
+        print(f"{position:>4}  {'-' if total is None else f'{total:.0f}':>5}  "
+              f"{'-' if prescore is None else f'{prescore:.1f}':>5}  {row['file']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    jd = parser.add_mutually_exclusive_group(required=True)
+    jd.add_argument("--jd", help="job description file (.pdf, otherwise read as text)")
+    jd.add_argument("--jd-text", help="job description text")
+    parser.add_argument("--resumes", required=True, help="directory searched recursively for PDFs")
+    parser.add_argument("--output", required=True, help="results file; appended to and resumed from")
+    parser.add_argument("--format", choices=["jsonl", "csv"])
+    parser.add_argument("--top", type=int, help="analyze only the N best pre-scored resumes")
+    parser.add_argument("--min-prescore", type=float, help="analyze only resumes pre-scoring at least this")
+    parser.add_argument("--prescreen-only", action="store_true", help="skip the LLM analysis")
+    parser.add_argument("--mode", choices=["single", "fanout"], help="resume analysis mode")
+    parser.add_argument("--parse-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--embed-workers", type=int, default=4)
+    parser.add_argument("--llm-workers", type=int, default=4)
+    parser.add_argument("--show", type=int, default=10, help="rows of the final ranking to print")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Size-aware vector stores for extract_info.
+
+  passthrough  the document fits in the retrieval top-k (or the token
+               budget), so every chunk is returned in document order and
+               nothing is embedded
+  numpy        brute-force cosine search over a contiguous float32 matrix,
+               for documents too big to pass through but small enough that
+               building a FAISS index isn't worth it
+  faiss        the original FAISS path, for genuinely large inputs
+
+All three expose similarity_search(query, k) returning Documents.
+"""
+import os
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+
+SMALL_DOC_MAX_TOKENS = int(os.getenv("SMALL_DOC_MAX_TOKENS", "2000"))
+# Must stay below the chunk count of the largest accepted document, or the
+# FAISS tier (and doc_cache's disk tier, which only saves FAISS indexes) is
+# never used: a document at pdf_ingest.MAX_DOC_CHARS splits into at least
+# MAX_DOC_CHARS / CHUNK_SIZE = 150 chunks at the defaults (~220 in practice).
+# 96 sends documents over roughly 60-90k characters to FAISS.
+FAISS_MIN_CHUNKS = int(os.getenv("FAISS_MIN_CHUNKS", "96"))
+
+# How many stores of each kind have been built (cache hits excluded)
+build_counts = {"passthrough": 0, "numpy": 0, "faiss": 0}
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose
+    return len(text) // 4
+
+
+class PassthroughStore:
+    kind = "passthrough"
+
+    def __init__(self, chunks: list, metadatas: list):
+        self.chunks = chunks
+        self.metadatas = metadatas
+
+    def similarity_search(self, query: str, k: int = 4) -> list:
+        return [Document(page_content=c, metadata=m) for c, m in zip(self.chunks, self.metadatas)]
+
+
+class NumpyStore:
+    kind = "numpy"
+
+    def __init__(self, chunks: list, metadatas: list, vectors: np.ndarray, embeddings):
+        self.chunks = chunks
+        self.metadatas = metadatas
+        self.embeddings = embeddings
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.matrix = np.ascontiguousarray(vectors / np.clip(norms, 1e-12, None), dtype=np.float32)
+
+    def search_vector(self, query_vector: np.ndarray, k: int) -> list:
+        """Indices of the k chunks most cosine-similar to query_vector, best first."""
+        query_vector = query_vector / max(np.linalg.norm(query_vector), 1e-12)
+        scores = self.matrix @ query_vector
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])].tolist()
+
+    def similarity_search(self, query: str, k: int = 4) -> list:
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        return [
+            Document(page_content=self.chunks[i], metadata=self.metadatas[i])
+            for i in self.search_vector(query_vector, k)
+        ]
+
+
+def choose_store_kind(text: str, num_chunks: int, top_k: int) -> str:
+    if num_chunks <= top_k or estimate_tokens(text) <= SMALL_DOC_MAX_TOKENS:
+        return "passthrough"
+    if num_chunks < FAISS_MIN_CHUNKS:
+        return "numpy"
+    return "faiss"
+
+
+def build_store(kind: str, chunks: list, metadatas: list, vectors, embeddings):
+    build_counts[kind] += 1
+    if kind == "passthrough":
+        return PassthroughStore(chunks, metadatas)
+    if kind == "numpy":
+        return NumpyStore(chunks, metadatas, vectors, embeddings)
+    return FAISS.from_embeddings(list(zip(chunks, vectors.tolist())), embeddings, metadatas=metadatas)
+
+
+def store_kind(store) -> str:
+    return getattr(store, "kind", "faiss")
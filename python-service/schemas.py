@@ -0,0 +1,405 @@
+"""
+Typed output schemas for the LLM helpers and a tolerant parser for the
+completions that should match them.
+
+JsonScanner reads a completion once, incrementally (streamed chunks can
+be fed as they arrive), skipping anything around the JSON value such as
+markdown fences or chatter. Each top-level member (object entry or array
+element) is decoded as soon as it closes, so one malformed member doesn't
+sink the rest:
+
+  - members that don't decode get cheap local fixes (trailing commas,
+    Python literals, unbalanced brackets)
+  - a completion cut off mid-member is closed at the last point that
+    still decodes
+  - what is still broken is kept as a text fragment, which the caller can
+    ask the model to fix on its own (JSON_REPAIR_PROMPT in
+    langchain_helper) instead of regenerating the whole answer
+
+The assembled value is then validated against the endpoint's schema:
+types are coerced where the intent is clear ("8/10" -> 8), invalid
+optional fields fall back to their defaults and invalid list items are
+dropped. Only a missing required field or no JSON at all is an error.
+"""
+import json
+import os
+import re
+import threading
+from typing import Annotated, Any, Dict, List, Optional
+
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, ValidationError
+
+
+JSON_REPAIR_MODE = os.getenv("JSON_REPAIR_MODE", "llm")  # llm | local | off
+JSON_REPAIR_MAX_FRAGMENTS = int(os.getenv("JSON_REPAIR_MAX_FRAGMENTS", "3"))
+JSON_REPAIR_MAX_CHARS = int(os.getenv("JSON_REPAIR_MAX_CHARS", "4000"))
+
+# Cut points tried (from the end) when closing a truncated member
+_MAX_CLOSE_ATTEMPTS = 64
+
+
+def _lenient_int(value):
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(round(value))
+    match = re.search(r"-?\d+(?:\.\d+)?", str(value))
+    return int(round(float(match.group(0)))) if match else None
+
+
+def _lenient_str(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return value
+    return str(value)
+
+
+def _lenient_str_list(value):
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [item if isinstance(item, str) else json.dumps(item) for item in value if item is not None]
+    return value
+
+
+LenientInt = Annotated[Optional[int], BeforeValidator(_lenient_int)]
+LenientStr = Annotated[str, BeforeValidator(_lenient_str)]
+StrList = Annotated[List[str], BeforeValidator(_lenient_str_list)]
+
+
+class _Schema(BaseModel):
+    # Keys the model adds beyond the schema are kept, not rejected
+    model_config = ConfigDict(extra="allow")
+
+
+class AtsScore(_Schema):
+    total_score: LenientInt = None
+    format_penalty: LenientInt = None
+    final_assessment: LenientStr = ""
+
+
+class ResumeAnalysis(_Schema):
+    resume_summary: LenientStr = ""
+    jd_summary: LenientStr = ""
+    ats_score: AtsScore = Field(default_factory=AtsScore)
+    sections: Dict[str, Any] = Field(default_factory=dict)
+    strengths: Dict[str, Any] = Field(default_factory=dict)
+    weaknesses: Dict[str, Any] = Field(default_factory=dict)
+    suggestions: Dict[str, Any] = Field(default_factory=dict)
+    red_flags: StrList = Field(default_factory=list)
+    suggested_resume_title: LenientStr = ""
+
+
+class InterviewQuestion(_Schema):
+    question: str = Field(min_length=1)
+    question_type: LenientStr = ""
+    question_difficulty: LenientStr = ""
+    question_num: LenientInt = None
+
+
+class AnswerFeedback(_Schema):
+    strengths: StrList = Field(default_factory=list)
+    areas_to_improve: StrList = Field(default_factory=list)
+    score_out_of_10: Annotated[Optional[int], BeforeValidator(_lenient_int), Field(ge=0, le=10)] = None
+    improvement_suggestions: StrList = Field(default_factory=list)
+    follow_up_questions: StrList = Field(default_factory=list)
+    overall_feedback: LenientStr = ""
+
+
+class IdealAnswer(_Schema):
+    ideal_answer: str = Field(min_length=1)
+    explanation: LenientStr = ""
+
+
+class OutputSchema:
+    """A schema for one object, or (many=True) for a JSON array of them."""
+
+    def __init__(self, model, many: bool = False):
+        self.model = model
+        self.many = many
+
+    def validate(self, value):
+        """Return (validated value or None, dropped fields/items, error message or None)."""
+        if self.many:
+            if isinstance(value, dict):
+                # {"questions": [...]} instead of the bare array
+                lists = [v for v in value.values() if isinstance(v, list)]
+                value = lists[0] if len(lists) == 1 else [value]
+            if not isinstance(value, list):
+                return None, [], "expected a JSON array"
+            items, dropped = [], []
+            for index, item in enumerate(value):
+                try:
+                    items.append(self.model.model_validate(item).model_dump())
+                except ValidationError:
+                    dropped.append(f"[{index}]")
+            if not items and value:
+                return None, dropped, "no valid items"
+            return items, dropped, None
+
+        if not isinstance(value, dict):
+            return None, [], "expected a JSON object"
+        data, dropped = dict(value), []
+        while True:
+            try:
+                return self.model.model_validate(data).model_dump(), dropped, None
+            except ValidationError as exc:
+                # Drop the invalid top-level fields so their defaults apply
+                bad = {error["loc"][0] for error in exc.errors() if error["loc"]}
+                present = bad & data.keys()
+                if not present:
+                    return None, dropped, f"missing required field(s): {', '.join(sorted(map(str, bad)))}"
+                for key in present:
+                    del data[key]
+                    dropped.append(key)
+
+
+ENDPOINT_SCHEMAS = {
+    "resume_analysis": OutputSchema(ResumeAnalysis),
+    "generate_interview_questions": OutputSchema(InterviewQuestion, many=True),
+    "answer_feedback": OutputSchema(AnswerFeedback),
+    "generate_ideal_answer": OutputSchema(IdealAnswer),
+}
+
+
+def schema_for(endpoint: str):
+    """The schema for an endpoint; "resume_analysis.scoring" uses "resume_analysis"."""
+    if endpoint is None:
+        return None
+    return ENDPOINT_SCHEMAS.get(endpoint) or ENDPOINT_SCHEMAS.get(endpoint.split(".", 1)[0])
+
+
+def _decode(text: str):
+    # strict=False accepts raw newlines and tabs inside strings
+    return json.loads(text, strict=False)
+
+
+def _balance(text: str) -> str:
+    """Close an unterminated string and any brackets left open in text."""
+    stack, in_string, escaped = [], False, False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    return text + ('"' if in_string else "") + "".join(reversed(stack))
+
+
+def _local_fixes(text: str):
+    # Cumulative; each is tried in turn until one decodes
+    fixed = re.sub(r",\s*([}\]])", r"\1", text)
+    yield fixed
+    fixed = re.sub(r"\bTrue\b", "true", re.sub(r"\bFalse\b", "false", re.sub(r"\bNone\b", "null", fixed)))
+    yield fixed
+    yield _balance(fixed)
+
+
+def _close_truncated(text: str):
+    """
+    Decode the longest prefix of a cut-off fragment that can be closed into
+    valid JSON: the whole text first, then back to each earlier comma or
+    opening bracket.
+    """
+    cuts, in_string, escaped = [len(text)], False, False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == ",":
+            cuts.append(i)
+        elif char in "{[":
+            cuts.append(i + 1)
+    for cut in sorted(set(cuts), reverse=True)[:_MAX_CLOSE_ATTEMPTS]:
+        prefix = text[:cut].rstrip()
+        if not prefix:
+            break
+        for candidate in (_balance(prefix), _balance(re.sub(r",\s*$", "", prefix))):
+            try:
+                return _decode(candidate)
+            except ValueError:
+                continue
+    raise ValueError("could not close truncated fragment")
+
+
+_KEY = re.compile(r'^\s*"((?:[^"\\]|\\.)*)"\s*:')
+
+
+class JsonScanner:
+    """
+    Incremental, member-level scanner for the JSON value in a completion.
+    feed() as text arrives, then finish() once it has all arrived.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._root = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member_start = None
+        self._closed = False
+        self.members = []   # decoded members: (key, value) for objects, value for arrays
+        self.broken = []    # (key or index, fragment text) that didn't decode
+        self.repaired = False
+        self.truncated = False
+
+    @property
+    def root(self):
+        return self._root
+
+    def feed(self, text: str):
+        self._buffer += text
+        while self._pos < len(self._buffer) and not self._closed:
+            char = self._buffer[self._pos]
+            if self._root is None:
+                if char in "{[":
+                    self._root = char
+                    self._depth = 1
+                    self._member_start = self._pos + 1
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._end_member(self._buffer[self._member_start:self._pos])
+                    self._closed = True
+            elif char == "," and self._depth == 1:
+                self._end_member(self._buffer[self._member_start:self._pos])
+                self._member_start = self._pos + 1
+            self._pos += 1
+
+    def _wrap(self, text: str) -> str:
+        return "{" + text + "}" if self._root == "{" else text
+
+    def _add(self, value):
+        if self._root == "{":
+            self.members.extend(value.items())
+        else:
+            self.members.append(value)
+
+    def _end_member(self, text: str):
+        if not text.strip():
+            return
+        try:
+            self._add(_decode(self._wrap(text)))
+            return
+        except ValueError:
+            pass
+        for fixed in _local_fixes(text):
+            try:
+                self._add(_decode(self._wrap(fixed)))
+                self.repaired = True
+                return
+            except ValueError:
+                continue
+        self.broken.append((self._slot(text), text.strip()))
+
+    def _slot(self, text: str):
+        if self._root == "{":
+            match = _KEY.match(text)
+            return match.group(1) if match else None
+        return len(self.members) + len(self.broken)
+
+    def finish(self):
+        """Decode whatever is left; returns the assembled value, or None if no JSON was found."""
+        if self._root is None:
+            return None
+        if not self._closed:
+            # Cut off mid-document. An array's last element is dropped (the
+            # rest are whole); an object's last member keeps what can be closed.
+            self.truncated = True
+            text = self._buffer[self._member_start:]
+            if text.strip() and self._root == "{":
+                try:
+                    self._add(_close_truncated("{" + text))
+                    self.repaired = True
+                except ValueError:
+                    self.broken.append((self._slot(text), text.strip()))
+            self._closed = True
+        return self.value()
+
+    def value(self):
+        return dict(self.members) if self._root == "{" else list(self.members)
+
+    def apply_fixes(self, fixes: list) -> int:
+        """
+        Replace broken fragments with the model's corrected versions (None
+        where no fix came back). Returns how many fixes were used.
+        """
+        used, still_broken = 0, []
+        for (slot, fragment), fixed in zip(self.broken, fixes):
+            value = None
+            if fixed is not None:
+                scanner = JsonScanner()
+                scanner.feed(fixed)
+                value = scanner.finish()
+            if self._root == "{" and isinstance(value, dict) and value:
+                self.members.extend(value.items())
+            elif self._root == "[" and value is not None:
+                self.members.append(value)
+            else:
+                still_broken.append((slot, fragment))
+                continue
+            used += 1
+        self.broken = still_broken
+        return used
+
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def record(endpoint: str, outcome: str, dropped: int = 0, repair_tokens: int = 0, tokens_saved: int = 0):
+    """
+    outcome is "clean", "local_repair", "llm_repair" or "failed".
+    tokens_saved estimates the retry a salvaged completion avoided.
+    """
+    with _stats_lock:
+        stats = _stats.setdefault(endpoint or "other", {
+            "parsed": 0, "clean": 0, "local_repair": 0, "llm_repair": 0, "failed": 0,
+            "dropped": 0, "repair_tokens": 0, "tokens_saved": 0,
+        })
+        stats["parsed"] += 1
+        stats[outcome] += 1
+        stats["dropped"] += dropped
+        stats["repair_tokens"] += repair_tokens
+        stats["tokens_saved"] += tokens_saved
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return {
+            endpoint: {
+                **values,
+                "repair_rate": round((values["local_repair"] + values["llm_repair"]) / values["parsed"], 3),
+            }
+            for endpoint, values in _stats.items()
+        }
@@ -0,0 +1,152 @@
+"""
+Embedding-based cache for LLM responses to near-identical requests.
+
+A lookup key is a tuple of texts, e.g. (question, answer) for answer
+feedback or (question,) for ideal answers. Each part is
+embedded (long parts as the mean of ~window_chars windows) and an entry
+matches when every part's cosine similarity clears the threshold; the
+reported similarity is the lowest of the parts.
+
+Entries live in buckets per (endpoint, scope, context). With scope "user"
+each user id gets its own bucket and requests without one are not cached;
+with "global" everyone shares one. `context` is a fingerprint of inputs
+that must match exactly rather than by similarity (the resume and JD a
+response was personalised against), so a hit never crosses documents. The
+cache is an LRU over all buckets, with a TTL.
+"""
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class _Entry:
+    __slots__ = ("bucket", "vectors", "value", "created")
+
+    def __init__(self, bucket, vectors, value):
+        self.bucket = bucket
+        self.vectors = vectors
+        self.value = value
+        self.created = time.time()
+
+
+class SemanticCache:
+    def __init__(self, embeddings, threshold: float, scope: str, max_entries: int, ttl_seconds: float,
+                 endpoints, window_chars: int = 1000):
+        if scope not in ("user", "global"):
+            raise ValueError(f"Unknown semantic cache scope {scope!r} (expected user or global)")
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.scope = scope
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.endpoints = set(endpoints)
+        self.window_chars = window_chars
+        self._entries = OrderedDict()
+        self._buckets = {}  # (endpoint, scope key) -> {"ids": [...], "matrix": ndarray or None}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def scope_key(self, endpoint: str, user_id: str = None, context: tuple = None):
+        """Bucket for this request, or None if it shouldn't be cached."""
+        if endpoint not in self.endpoints:
+            return None
+        if self.scope == "global":
+            scope = "global"
+        elif not user_id:
+            return None
+        else:
+            scope = f"user:{user_id}"
+        if context:
+            digest = hashlib.sha256(json.dumps(context, ensure_ascii=False).encode("utf-8")).hexdigest()
+            scope = f"{scope}|context:{digest[:16]}"
+        return (endpoint, scope)
+
+    def embed(self, parts: tuple) -> np.ndarray:
+        """One L2-normalized row per part, embedded in a single call."""
+        windows, owners = [], []
+        for i, text in enumerate(parts):
+            text = str(text) or " "
+            for start in range(0, len(text), self.window_chars):
+                windows.append(text[start:start + self.window_chars])
+                owners.append(i)
+        vectors = np.asarray(self.embeddings.embed_documents(windows), dtype=np.float32)
+        owners = np.asarray(owners)
+        rows = np.stack([vectors[owners == i].mean(axis=0) for i in range(len(parts))])
+        return rows / np.clip(np.linalg.norm(rows, axis=1, keepdims=True), 1e-12, None)
+
+    def get(self, bucket, vectors: np.ndarray):
+        endpoint = bucket[0]
+        with self._lock:
+            stats = self._endpoint_stats(endpoint)
+            match, similarity = self._best_match(bucket, vectors)
+            if match is None or similarity < self.threshold:
+                stats["misses"] += 1
+                return None
+            self._entries.move_to_end(match)
+            stats["hits"] += 1
+            stats["similarity_sum"] += similarity
+            value = copy.deepcopy(self._entries[match].value)
+        print(f"[SemanticCache] {endpoint}: hit (similarity {similarity:.4f}, {bucket[1]})")
+        return value
+
+    def put(self, bucket, vectors: np.ndarray, value):
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(bucket, vectors, value)
+            slot = self._buckets.setdefault(bucket, {"ids": [], "matrix": None})
+            slot["ids"].append(entry_id)
+            slot["matrix"] = None
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _best_match(self, bucket, vectors: np.ndarray):
+        slot = self._buckets.get(bucket)
+        if slot is None:
+            return None, 0.0
+        now = time.time()
+        for entry_id in [i for i in slot["ids"] if now - self._entries[i].created > self.ttl_seconds]:
+            self._remove(entry_id)
+        if not slot["ids"]:
+            return None, 0.0
+        if slot["matrix"] is None:
+            slot["matrix"] = np.stack([self._entries[i].vectors for i in slot["ids"]])  # entries x parts x dim
+        similarities = np.einsum("npd,pd->np", slot["matrix"], vectors).min(axis=1)
+        best = int(np.argmax(similarities))
+        return slot["ids"][best], float(similarities[best])
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        slot = self._buckets[entry.bucket]
+        slot["ids"].remove(entry_id)
+        slot["matrix"] = None
+        if not slot["ids"]:
+            del self._buckets[entry.bucket]
+
+    def _endpoint_stats(self, endpoint: str) -> dict:
+        return self._stats.setdefault(endpoint, {"hits": 0, "misses": 0, "similarity_sum": 0.0})
+
+    def stats(self) -> dict:
+        with self._lock:
+            endpoints = {}
+            for name, values in self._stats.items():
+                lookups = values["hits"] + values["misses"]
+                endpoints[name] = {
+                    "hits": values["hits"],
+                    "misses": values["misses"],
+                    "hit_ratio": round(values["hits"] / lookups, 4) if lookups else 0.0,
+                    "mean_hit_similarity": round(values["similarity_sum"] / values["hits"], 4) if values["hits"] else None,
+                }
+            return {
+                "scope": self.scope,
+                "threshold": self.threshold,
+                "entries": len(self._entries),
+                "buckets": len(self._buckets),
+                "endpoints": endpoints,
+            }
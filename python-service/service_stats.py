@@ -0,0 +1,34 @@
+"""
+Collects the counters kept by each component for the /stats endpoint.
+"""
+import context_packer
+import deadlines
+import doc_pipeline
+import langchain_helper as lch
+import retrieval
+import schemas
+import streaming
+from extraction_profiles import registry as profile_registry
+from embedding_batcher import BatchingEmbeddings
+
+
+def collect() -> dict:
+    stats = {
+        "document_cache": lch.doc_cache.stats(),
+        "document_pipeline": doc_pipeline.stats(),
+        "llm_limiter": lch.llm_limiter.stats(),
+        "llm_client": lch.llm.stats(),
+        "vector_stores_built": dict(retrieval.build_counts),
+        "extraction_profiles": profile_registry.stats(),
+        "context_packing": context_packer.stats(),
+        "llm_response_cache": lch.response_cache.stats(),
+        "semantic_cache": lch.semantic_cache.stats(),
+        "streaming": streaming.stats(),
+        "resume_analysis": lch.analysis_stats(),
+        "interview_questions": lch.question_stats(),
+        "structured_output": schemas.stats(),
+        "deadlines": deadlines.stats(),
+    }
+    if isinstance(lch.embeddings, BatchingEmbeddings):
+        stats["embedding_batcher"] = lch.embeddings.stats()
+    return stats
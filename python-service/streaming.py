@@ -0,0 +1,176 @@
+"""
+Helpers for the Server-Sent Events endpoints.
+
+The LLM streams its JSON answer token by token. The parsers here pick
+finished pieces out of the partial text so they can be sent before the
+completion ends:
+
+  ArrayItemStream    each complete object of a top-level JSON array
+                     (one interview question)
+  StringFieldStream  each finished bullet of the given string fields
+                     (the ideal answer and its explanation)
+
+Both ignore anything outside the JSON (markdown fences, chatter), and both
+only yield previews. The final "result" event carries the payload parsed
+and validated from the full completion.
+"""
+import json
+import re
+import threading
+import time
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+class ArrayItemStream:
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._item_start = None
+
+    def feed(self, text: str) -> list:
+        self._buffer += text
+        items = []
+        while self._pos < len(self._buffer):
+            char = self._buffer[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"' and self._depth > 0:
+                self._in_string = True
+            elif char in "[{":
+                if self._depth == 1 and char == "{":
+                    self._item_start = self._pos
+                if self._depth > 0 or char == "[":
+                    self._depth += 1
+            elif char in "]}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 1 and char == "}" and self._item_start is not None:
+                    try:
+                        item = json.loads(self._buffer[self._item_start:self._pos + 1])
+                    except ValueError:
+                        # Left for the final parse, which repairs what it can
+                        item = None
+                    if isinstance(item, dict):
+                        items.append(item)
+                    self._item_start = None
+            self._pos += 1
+        return items
+
+
+class StringFieldStream:
+    BULLET_SEPARATOR = re.compile(r"\n\s*\n")
+
+    def __init__(self, fields: tuple):
+        self._pending = list(fields)
+        self._buffer = ""
+        self._field = None
+        self._value = ""
+
+    def feed(self, text: str) -> list:
+        """Return (field, bullet) pairs finished by this chunk of text."""
+        self._buffer += text
+        bullets = []
+        while True:
+            if self._field is None:
+                if not self._start_field():
+                    return bullets
+            ended = self._read_value()
+            bullets.extend(self._take_bullets(final=ended))
+            if not ended:
+                return bullets
+            self._field = None
+
+    def _start_field(self) -> bool:
+        for field in self._pending:
+            match = re.search(r'"%s"\s*:\s*"' % re.escape(field), self._buffer)
+            if match:
+                self._pending.remove(field)
+                self._field = field
+                self._value = ""
+                self._buffer = self._buffer[match.end():]
+                return True
+        return False
+
+    def _read_value(self) -> bool:
+        # Decode the string value as far as it has arrived; True once it ends
+        i = 0
+        while i < len(self._buffer):
+            char = self._buffer[i]
+            if char == '"':
+                self._buffer = self._buffer[i + 1:]
+                return True
+            if char == "\\":
+                size = 6 if self._buffer[i + 1:i + 2] == "u" else 2
+                if i + size > len(self._buffer):
+                    break
+                try:
+                    self._value += json.loads(f'"{self._buffer[i:i + size]}"')
+                except ValueError:
+                    self._value += self._buffer[i + 1:i + size]
+                i += size
+                continue
+            self._value += char
+            i += 1
+        self._buffer = self._buffer[i:]
+        return False
+
+    def _take_bullets(self, final: bool) -> list:
+        parts = self.BULLET_SEPARATOR.split(self._value)
+        done, self._value = (parts, "") if final else (parts[:-1], parts[-1])
+        return [(self._field, part.strip()) for part in done if part.strip()]
+
+
+class StreamTimer:
+    """Time to first content and total latency of one streamed response."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.first_content = None
+
+    def content(self):
+        if self.first_content is None:
+            self.first_content = time.perf_counter() - self.started
+
+    def finish(self):
+        total = time.perf_counter() - self.started
+        record(self.endpoint, self.first_content, total)
+        first = f"{self.first_content:.2f}s" if self.first_content is not None else "n/a"
+        print(f"[Stream] {self.endpoint}: first content {first}, total {total:.2f}s")
+
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def record(endpoint: str, first_content, total: float):
+    with _stats_lock:
+        stats = _stats.setdefault(endpoint, {"streams": 0, "first_content_seconds": 0.0, "total_seconds": 0.0})
+        stats["streams"] += 1
+        stats["first_content_seconds"] += first_content if first_content is not None else total
+        stats["total_seconds"] += total
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return {
+            endpoint: {
+                "streams": values["streams"],
+                "avg_first_content_seconds": round(values["first_content_seconds"] / values["streams"], 3),
+                "avg_total_seconds": round(values["total_seconds"] / values["streams"], 3),
+            }
+            for endpoint, values in _stats.items()
+        }
@@ -0,0 +1,202 @@
+"""
+llm_client's retries, pacing, circuit breaker and fallback, over real HTTP
+against bench/fake_groq.py.
+
+    python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+import time
+
+import groq
+import pytest
+from langchain_groq import ChatGroq
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [SERVICE_DIR, os.path.join(SERVICE_DIR, "bench")]
+
+import fake_groq  # noqa: E402
+from llm_client import CircuitBreaker, LLMUnavailableError, ResilientChatModel, TokenBucket  # noqa: E402
+
+PROMPT = "Generate an ideal answer to: Tell me about a project you are proud of."
+
+
+@pytest.fixture
+def fake():
+    """(base URL, Faults) of a fresh fake Groq API that answers almost at once."""
+    return fake_groq.start(latency=0.01, tokens_per_second=100000, jitter=0, seed=0)
+
+
+def _chat(url: str, model: str) -> ChatGroq:
+    return ChatGroq(api_key="test", model=model, base_url=url, max_retries=0)
+
+
+def make_llm(url: str, fallback: bool = False, **options) -> ResilientChatModel:
+    settings = {"max_retries": 2, "backoff_base": 0.01, "backoff_max": 0.05, "breaker_threshold": 0, **options}
+    return ResilientChatModel(
+        primary=_chat(url, "primary-model"),
+        fallback=_chat(url, "fallback-model") if fallback else None,
+        **settings,
+    )
+
+
+def test_server_errors_are_retried_until_success(fake):
+    url, faults = fake
+    faults.update({"error_rate": 0.5})
+    llm = make_llm(url, max_retries=10)
+    assert llm.invoke(PROMPT).content
+    served = faults.snapshot()["served"]
+    assert served["ok"] == 1
+    assert llm.counts["retries"] == served["server_error"]
+
+
+def test_gives_up_after_max_retries(fake):
+    url, faults = fake
+    faults.update({"error_rate": 1})
+    llm = make_llm(url, max_retries=2)
+    with pytest.raises(groq.InternalServerError):
+        llm.invoke(PROMPT)
+    assert faults.snapshot()["served"]["server_error"] == 3
+    assert llm.counts["retries"] == 2
+
+
+def test_rate_limits_wait_for_retry_after_and_leave_the_breaker_closed(fake):
+    url, faults = fake
+    faults.update({"rate_limit_rate": 1, "retry_after": 0.3})
+    llm = make_llm(url, max_retries=1, breaker_threshold=1)
+    started = time.monotonic()
+    with pytest.raises(groq.RateLimitError):
+        llm.invoke(PROMPT)
+    assert time.monotonic() - started >= 0.3
+    assert faults.snapshot()["served"]["rate_limited"] == 2
+    assert llm.breaker.state == "closed"
+
+
+def test_open_breaker_fails_fast_without_calling_the_provider(fake):
+    url, faults = fake
+    faults.update({"error_rate": 1})
+    llm = make_llm(url, max_retries=1, breaker_threshold=2, breaker_reset_seconds=30)
+    with pytest.raises(groq.InternalServerError):
+        llm.invoke(PROMPT)
+    assert llm.breaker.state == "open"
+
+    with pytest.raises(LLMUnavailableError) as raised:
+        llm.invoke(PROMPT)
+    assert raised.value.retry_after >= 1
+    assert faults.snapshot()["served"]["server_error"] == 2
+    assert llm.counts["fast_failures"] == 1
+
+
+def test_half_open_probe_reopens_on_failure_and_closes_on_success(fake):
+    url, faults = fake
+    faults.update({"error_rate": 1})
+    llm = make_llm(url, max_retries=1, breaker_threshold=2, breaker_reset_seconds=0.2)
+    with pytest.raises(groq.InternalServerError):
+        llm.invoke(PROMPT)
+    assert llm.breaker.state == "open"
+
+    # One probe goes through once the reset time has passed, and fails
+    time.sleep(0.25)
+    with pytest.raises(groq.InternalServerError):
+        llm.invoke(PROMPT)
+    assert faults.snapshot()["served"]["server_error"] == 3
+    assert llm.breaker.state == "open"
+    assert llm.breaker.times_opened == 2
+
+    faults.update({"error_rate": 0})
+    time.sleep(0.25)
+    assert llm.invoke(PROMPT).content
+    assert llm.breaker.state == "closed"
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_fallback_answers_when_the_primary_is_failing(fake):
+    url, faults = fake
+    faults.update({"error_rate": 1, "models": ["primary-model"]})
+    llm = make_llm(url, fallback=True, max_retries=1, breaker_threshold=2, breaker_reset_seconds=30)
+    assert llm.invoke(PROMPT).content
+    assert faults.snapshot()["served"]["server_error"] == 2
+    assert llm.counts["fallbacks"] == 1
+    assert llm.breaker.state == "open"
+
+    # With the circuit open the primary isn't called at all
+    assert llm.invoke(PROMPT).content
+    assert faults.snapshot()["served"]["server_error"] == 2
+    assert llm.counts["fallbacks"] == 2
+
+
+def test_token_bucket_waits_and_refuses_past_max_wait():
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+    assert bucket.reserve(1, max_wait=0.5) is None
+    # The refused reservation took nothing
+    assert bucket.wait_time(1) == pytest.approx(2.0, abs=0.05)
+
+
+def test_request_pacing_waits_then_fails_fast_within_the_timeout(fake):
+    url, faults = fake
+    llm = make_llm(url, requests_per_minute=120)
+    llm.request_bucket.reserve(120)
+
+    started = time.monotonic()
+    assert llm.invoke(PROMPT).content
+    assert time.monotonic() - started >= 0.45
+
+    with pytest.raises(LLMUnavailableError):
+        llm.bind(timeout=0.2).invoke(PROMPT)
+    assert faults.snapshot()["served"]["ok"] == 1
+    assert llm.counts["rate_limited"] == 1
+
+
+def test_streams_are_retried_before_their_first_chunk(fake):
+    url, faults = fake
+    faults.update({"error_rate": 1})
+    llm = make_llm(url, max_retries=2)
+    with pytest.raises(groq.InternalServerError):
+        list(llm.stream(PROMPT))
+    assert faults.snapshot()["served"]["server_error"] == 3
+
+    faults.update({"error_rate": 0})
+    assert "".join(chunk.content for chunk in llm.stream(PROMPT))
+
+
+def test_streams_are_not_retried_after_their_first_chunk(fake):
+    url, faults = fake
+    faults.update({"stream_error_rate": 1})
+    llm = make_llm(url, max_retries=2)
+    chunks = []
+    with pytest.raises(groq.APIError):
+        for chunk in llm.stream(PROMPT):
+            chunks.append(chunk)
+    assert chunks
+    assert faults.snapshot()["served"]["ok"] == 1
+    assert llm.counts["retries"] == 0
+
+
+async def _astream(llm) -> str:
+    return "".join([chunk.content async for chunk in llm.astream(PROMPT)])
+
+
+def test_async_calls_retry_and_fall_back_like_sync_ones(fake):
+    url, faults = fake
+    faults.update({"error_rate": 1, "models": ["primary-model"]})
+    llm = make_llm(url, fallback=True, max_retries=1)
+    assert asyncio.run(llm.ainvoke(PROMPT)).content
+    assert asyncio.run(_astream(llm))
+    assert faults.snapshot()["served"]["server_error"] == 4
+    assert llm.counts["retries"] == 2
+    assert llm.counts["fallbacks"] == 2